@@ -1,9 +1,15 @@
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, request, jsonify, send_file, Response, g
 import os
-from gtts import gTTS
 import logging
-import subprocess
 import io
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+import audio
+import audio_frames
+import engines
+from cache import AudioCache, cache_key
+from metrics import CONTENT_TYPE, REQUEST_ID_HEADER, Registry, request_id
 
 app = Flask(__name__)
 
@@ -11,48 +17,170 @@ app = Flask(__name__)
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-@app.route('/synthesize', methods=['POST'])
-def synthesize():
+# Engine used unless a request names one: "gtts" (online) or "espeak" (offline)
+TTS_ENGINE = os.environ.get("TTS_ENGINE", "gtts")
+TTS_LANG = os.environ.get("TTS_LANG", "en")
+
+# Repeated phrases are served from cache; set TTS_CACHE_DIR= to keep it in memory only
+TTS_CACHE_DIR = os.environ.get("TTS_CACHE_DIR", "/app/shared_tts/cache")
+TTS_CACHE_MEMORY_MB = int(os.environ.get("TTS_CACHE_MEMORY_MB", "32"))
+TTS_CACHE_DISK_MB = int(os.environ.get("TTS_CACHE_DISK_MB", "512"))
+audio_cache = AudioCache(
+    TTS_CACHE_DIR or None,
+    memory_bytes=TTS_CACHE_MEMORY_MB * 1024 * 1024,
+    disk_bytes=TTS_CACHE_DISK_MB * 1024 * 1024
+)
+
+# Sentences of one /synthesize/stream request are synthesized by this pool
+TTS_STREAM_WORKERS = int(os.environ.get("TTS_STREAM_WORKERS", "4"))
+stream_pool = ThreadPoolExecutor(max_workers=TTS_STREAM_WORKERS, thread_name_prefix="tts-stream")
+
+# Served on /metrics for Prometheus to scrape
+registry = Registry()
+request_seconds = registry.histogram(
+    "http_request_duration_seconds", "Time until the response headers were sent",
+    ("method", "endpoint", "status"))
+stage_seconds = registry.histogram(
+    "stage_duration_seconds", "Time to produce one sentence's audio, synthesized or cached",
+    ("stage",))
+
+@app.before_request
+def start_request():
+    g.request_id = request_id(request.headers.get(REQUEST_ID_HEADER))
+    g.started = time.perf_counter()
+
+@app.after_request
+def finish_request(response):
+    endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+    request_seconds.observe(time.perf_counter() - g.started, method=request.method,
+                            endpoint=endpoint, status=response.status_code)
+    response.headers[REQUEST_ID_HEADER] = g.request_id
+    return response
+
+SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+
+def split_sentences(text):
+    return [sentence for sentence in SENTENCE_END.split(text.strip()) if sentence]
+
+def parse_request():
+    """Return (text, engine, lang, voice) from the JSON body, or an error response."""
     data = request.get_json()
     text = data.get('text')
 
     if not text:
-        return jsonify({'error': 'No text provided'}), 400
+        return None, (jsonify({'error': 'No text provided'}), 400)
 
-    # Use gTTS to synthesize speech
     try:
-        shared_tts_dir = '/app/shared_tts'
-        logger.info (f"Checking if the directory, {shared_tts_dir} exists")
-        os.makedirs(shared_tts_dir, exist_ok=True)  # Create directory if it doesn't exist
-        
-        # generate a new file for gtts and ffmpeg to work with
-        temp_mp3_file = os.path.join(shared_tts_dir, 'temp.mp3')
-        output_wav_file = os.path.join(shared_tts_dir, 'output.wav')
-
-        tts = gTTS(text=text, lang='en')
-        tts.save(temp_mp3_file)
-
-        # Convert the audio using ffmpeg
-        ffmpeg_command = [
-            "ffmpeg",
-            "-y", # This is useful as gTTS saves to a temp file
-            "-i", temp_mp3_file,
-            "-acodec", "pcm_s16le",
-            "-ar", "16000",
-            "-ac", "1",
-            output_wav_file
-        ]
-        
-        # Run command then wait
-        subprocess.run(ffmpeg_command, check=True)
-
-        logger.info(f"Returning file: {output_wav_file}")
-        # Return .wav data
-        return send_file(output_wav_file, mimetype="audio/wav")
+        engine = engines.get_engine(data.get('engine', TTS_ENGINE))
+    except KeyError as e:
+        return None, (jsonify({'error': str(e.args[0])}), 400)
+
+    return (text, engine, data.get('lang', TTS_LANG), data.get('voice')), None
+
+def synthesize_wav(text, engine, lang, voice):
+    """Return (wav bytes, "hit"/"miss"), synthesizing only on a cache miss."""
+    started = time.perf_counter()
+    key = cache_key(text, engine.name, lang, voice)
+    wav_data = audio_cache.get(key)
+    if wav_data is not None:
+        stage_seconds.observe(time.perf_counter() - started, stage="cache_hit")
+        return wav_data, "hit"
+
+    # Engines return 16-bit PCM, mono, 16kHz in memory, so concurrent
+    # requests never share files
+    wav_data = audio.pcm_to_wav(engine.synthesize(text, lang=lang, voice=voice))
+    audio_cache.put(key, wav_data)
+    stage_seconds.observe(time.perf_counter() - started, stage="synthesis")
+    return wav_data, "miss"
+
+@app.route('/synthesize', methods=['POST'])
+def synthesize():
+    params, error = parse_request()
+    if error:
+        return error
+    text, engine, lang, voice = params
+
+    try:
+        wav_data, cache_status = synthesize_wav(text, engine, lang, voice)
+
+        logger.info(f"[{g.request_id}] Returning {len(wav_data)} bytes of audio from {engine.name} (cache {cache_status})")
+        response = send_file(io.BytesIO(wav_data), mimetype="audio/wav")
+        response.headers["X-Cache"] = cache_status
+        return response
 
     except Exception as e:
         logger.error(f"Error generating TTS audio: {e}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/synthesize/stream', methods=['POST'])
+def synthesize_stream():
+    """Synthesize sentence by sentence and stream raw PCM back in order.
+
+    Sentences are synthesized in parallel on the stream pool, at most
+    TTS_STREAM_WORKERS ahead of the one being sent, so playback starts as
+    soon as the first sentence is ready. If a sentence fails the
+    connection is dropped mid-body. The body is 16 kHz mono s16le,
+    or audio frames (``"codec"`` in the request: "pcm" or "opus") if the
+    caller accepts ``application/x-audio-frames``.
+    """
+    params, error = parse_request()
+    if error:
+        return error
+    text, engine, lang, voice = params
+    sentences = split_sentences(text)
+
+    encoder = None
+    if request.accept_mimetypes.best == audio_frames.CONTENT_TYPE:
+        try:
+            encoder = audio_frames.FrameEncoder(audio.TARGET_RATE, codec=request.get_json().get("codec", "pcm"))
+        except (audio_frames.FrameError, ImportError) as e:
+            return jsonify({'error': f"Can't send audio frames: {e}"}), 400
+
+    def generate():
+        pending = []
+        remaining = iter(sentences)
+        try:
+            for sentence in remaining:
+                pending.append(stream_pool.submit(synthesize_wav, sentence, engine, lang, voice))
+                if len(pending) >= TTS_STREAM_WORKERS:
+                    break
+            while pending:
+                wav_data, _ = pending.pop(0).result()
+                next_sentence = next(remaining, None)
+                if next_sentence is not None:
+                    pending.append(stream_pool.submit(synthesize_wav, next_sentence, engine, lang, voice))
+                pcm = audio.to_pcm16k(wav_data)
+                if encoder is not None:
+                    pcm = encoder.encode(pcm, final=not pending)
+                yield pcm
+        except Exception as e:
+            # Headers are already sent: re-raise so the server drops the
+            # connection before the final chunk and the caller sees an
+            # error instead of an answer that just stops short
+            logger.error(f"Error streaming TTS audio: {e}")
+            raise
+        finally:
+            # Client went away: don't synthesize sentences nobody will hear
+            for future in pending:
+                future.cancel()
+
+    return Response(
+        generate(),
+        content_type=audio_frames.CONTENT_TYPE if encoder else f"audio/L16; rate={audio.TARGET_RATE}; channels=1",
+        headers={"X-Sentences": str(len(sentences))}
+    )
+
+@app.route('/health', methods=['GET'])
+def health_check():
+    return jsonify({"status": "healthy", "engine": TTS_ENGINE, "engines": list(engines.ENGINES)}), 200
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    return registry.render(), 200, {"Content-Type": CONTENT_TYPE}
+
+@app.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    return jsonify(audio_cache.stats()), 200
+
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0')
\ No newline at end of file
@@ -0,0 +1,147 @@
+import hashlib
+import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+
+
+def cache_key(text, engine, lang, voice, fmt="wav"):
+    """Content address of one synthesized utterance.
+
+    Whitespace and case don't change how a phrase is spoken, so they are
+    normalized away; punctuation is kept because it changes intonation.
+    """
+    normalized = re.sub(r"\s+", " ", text).strip().casefold()
+    material = "\x1f".join([normalized, engine, lang, voice or "", fmt])
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class AudioCache:
+    """Two-tier cache of ready-to-serve audio.
+
+    An in-memory LRU holds up to ``memory_bytes``; behind it an on-disk
+    tier in ``directory`` (shared by all workers) holds up to
+    ``disk_bytes``, evicting the least recently used files first. Pass
+    ``directory=None`` to keep the cache in memory only.
+    """
+
+    def __init__(self, directory=None, memory_bytes=32 * 1024 * 1024, disk_bytes=512 * 1024 * 1024):
+        self.directory = directory
+        self.memory_limit = memory_bytes
+        self.disk_limit = disk_bytes
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self.hits_memory = 0
+        self.hits_disk = 0
+        self.misses = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self._disk_bytes = sum(entry.stat().st_size for entry in self._disk_entries())
+        else:
+            self._disk_bytes = 0
+
+    def get(self, key):
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.hits_memory += 1
+                return self._memory[key]
+
+        data = self._read_disk(key)
+        with self._lock:
+            if data is None:
+                self.misses += 1
+                return None
+            self.hits_disk += 1
+            self._remember(key, data)
+        return data
+
+    def put(self, key, data):
+        with self._lock:
+            self._remember(key, data)
+        if self.directory:
+            self._write_disk(key, data)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits_memory + self.hits_disk + self.misses
+            return {
+                "hits_memory": self.hits_memory,
+                "hits_disk": self.hits_disk,
+                "misses": self.misses,
+                "hit_ratio": (self.hits_memory + self.hits_disk) / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "disk_bytes": self._disk_bytes,
+            }
+
+    def _remember(self, key, data):
+        if len(data) > self.memory_limit:
+            return
+        if key in self._memory:
+            self._memory_bytes -= len(self._memory.pop(key))
+        self._memory[key] = data
+        self._memory_bytes += len(data)
+        while self._memory_bytes > self.memory_limit:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.wav")
+
+    def _read_disk(self, key):
+        if not self.directory:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            # Bump the mtime so disk eviction is least-recently-used
+            os.utime(path)
+            return data
+        except FileNotFoundError:
+            return None
+
+    def _write_disk(self, key, data):
+        # Write-then-rename so other workers never read a partial file
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, self._path(key))
+
+        with self._lock:
+            self._disk_bytes += len(data)
+            if self._disk_bytes <= self.disk_limit:
+                return
+        self._evict_disk()
+
+    def _disk_entries(self):
+        return [entry for entry in os.scandir(self.directory) if entry.name.endswith(".wav")]
+
+    def _evict_disk(self):
+        # Other workers write here too, so recount from the directory itself
+        entries = []
+        for entry in self._disk_entries():
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+        entries.sort()
+
+        total = sum(size for _, size, _ in entries)
+        # Evict down to 90% so we don't rescan on every write
+        target = self.disk_limit * 0.9
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+        with self._lock:
+            self._disk_bytes = total
@@ -0,0 +1,63 @@
+import io
+import subprocess
+from abc import ABC, abstractmethod
+
+import audio
+
+
+class TTSEngine(ABC):
+    """A speech synthesizer producing 16 kHz mono s16le PCM in memory."""
+
+    name = None
+
+    @abstractmethod
+    def synthesize(self, text, lang="en", voice=None):
+        """Return the PCM for ``text``."""
+
+
+class GTTSEngine(TTSEngine):
+    """Google Translate TTS; needs network access for every utterance."""
+
+    name = "gtts"
+
+    def synthesize(self, text, lang="en", voice=None):
+        # Imported here so the service still starts without gTTS installed
+        from gtts import gTTS
+
+        mp3_buffer = io.BytesIO()
+        gTTS(text=text, lang=lang, tld=voice or "com").write_to_fp(mp3_buffer)
+        return audio.to_pcm16k(mp3_buffer.getvalue())
+
+
+class EspeakEngine(TTSEngine):
+    """Offline synthesis with the espeak-ng binary, streamed over pipes."""
+
+    name = "espeak"
+
+    def __init__(self, binary="espeak-ng", words_per_minute=175):
+        self.binary = binary
+        self.words_per_minute = words_per_minute
+
+    def synthesize(self, text, lang="en", voice=None):
+        # Text goes in on stdin so it is never parsed as command-line options
+        result = subprocess.run(
+            [self.binary, "--stdout", "--stdin", "-v", voice or lang, "-s", str(self.words_per_minute)],
+            input=text.encode("utf-8"),
+            capture_output=True,
+            check=True,
+        )
+        # espeak-ng writes 22.05 kHz WAV; resampled in memory
+        return audio.to_pcm16k(result.stdout)
+
+
+ENGINES = {engine.name: engine for engine in (GTTSEngine, EspeakEngine)}
+_instances = {}
+
+
+def get_engine(name):
+    """Return the shared instance of a registered engine."""
+    if name not in ENGINES:
+        raise KeyError(f"Unknown TTS engine {name!r}, choose one of {', '.join(ENGINES)}")
+    if name not in _instances:
+        _instances[name] = ENGINES[name]()
+    return _instances[name]
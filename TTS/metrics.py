@@ -0,0 +1,117 @@
+import bisect
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+# Sent with every request and response so one voice turn can be followed
+# through the logs of all services
+REQUEST_ID_HEADER = "X-Request-ID"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds, from a cache hit up to a long generation
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_VALID_REQUEST_ID = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+
+def request_id(value=None):
+    """The caller's request ID if it sent a sane one, otherwise a new one."""
+    if value and _VALID_REQUEST_ID.match(value):
+        return value
+    return uuid.uuid4().hex
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(pairs):
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Histogram:
+    """Latency distribution per label combination, Prometheus style."""
+
+    def __init__(self, name, help, labels=(), buckets=BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # label values -> [bucket counts, sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels[label]) for label in self.labels)
+        # First bucket whose upper bound holds the value; past the last is +Inf
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((key, list(counts), total, count)
+                            for key, (counts, total, count) in self._series.items())
+        for key, counts, total, count in series:
+            labels = [f'{label}="{_escape(value)}"' for label, value in zip(self.labels, key)]
+            bounds = [f"{bound:g}" for bound in self.buckets] + ["+Inf"]
+            cumulative = 0
+            for le, bucket in zip(bounds, counts):
+                cumulative += bucket
+                bucket_labels = _labels(labels + [f'le="{le}"'])
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(labels)} {total:.6f}")
+            lines.append(f"{self.name}_count{_labels(labels)} {count}")
+        return "\n".join(lines)
+
+
+class Registry:
+    """The metrics of one service, served as text on /metrics."""
+
+    def __init__(self):
+        self._metrics = []
+
+    def histogram(self, name, help, labels=(), buckets=BUCKETS):
+        metric = Histogram(name, help, labels, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        return "\n".join(metric.render() for metric in self._metrics) + "\n"
+
+
+class StageTimer:
+    """Time the stages of one request.
+
+    Each stage is observed in ``histogram`` (labelled ``stage``) and added
+    to ``timings``, milliseconds per stage name, for the response body or
+    a log line. ``elapsed`` is the time since the timer was created.
+    """
+
+    def __init__(self, histogram=None):
+        self.histogram = histogram
+        self.timings = {}
+        self.started = time.perf_counter()
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    @contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def record(self, name, seconds):
+        self.timings[name] = round(self.timings.get(name, 0.0) + seconds * 1000, 1)
+        if self.histogram is not None:
+            self.histogram.observe(seconds, stage=name)
@@ -0,0 +1,220 @@
+"""End-to-end latency and throughput benchmark of the voice pipeline.
+
+By default the orchestrator runs in-process in front of the stand-in
+transcriber, Ollama wrapper and TTS services from tests/stubs.py, whose
+delays and token rate are set on the command line, so it runs on any
+Linux box without a GPU or network. Point ``--orchestrator-url`` at a
+running stack to measure the real thing instead.
+
+    python bench/bench.py --requests 40 --concurrency 4
+    python bench/bench.py --baseline bench/baseline.json            # compare
+    python bench/bench.py --baseline bench/baseline.json --save-baseline
+
+Exits with status 1 when a result is worse than the baseline by more
+than ``--tolerance``.
+"""
+import argparse
+import glob
+import json
+import logging
+import math
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+
+import requests
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "tests"))
+
+from stubs import AsgiServer, ollama_stub, silence_wav, transcriber_stub, tts_stub  # noqa: E402
+
+WAV_HEADER_SIZE = 44
+ANSWER = ("Here is what your day looks like. You have a stand-up at nine and a design review at eleven. "
+          "The afternoon is free, so it is a good time for focused work.")
+
+# Lower is better for these; requests_per_second should not drop
+LATENCY_KEYS = ("latency_ms_p50", "latency_ms_p95", "latency_ms_p99",
+                "ttfa_ms_p50", "ttfa_ms_p95", "ttfa_ms_p99")
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of ``values`` (q in 0-100)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(len(ordered) * q / 100))
+    return ordered[rank - 1]
+
+
+def load_corpus(directory=None):
+    """WAV files to upload: every *.wav in ``directory``, or 1-5 s of silence."""
+    if directory:
+        paths = sorted(glob.glob(os.path.join(directory, "*.wav")))
+        if not paths:
+            raise SystemExit(f"No .wav files in {directory}")
+        return [(os.path.basename(path), Path(path).read_bytes()) for path in paths]
+    return [(f"synthetic_{seconds}s.wav", silence_wav(seconds)) for seconds in (1, 2, 3, 4, 5)]
+
+
+@contextmanager
+def local_stack(stt_delay, llm_ttft, llm_token_delay, tts_delay, tts_seconds_per_char, answer=ANSWER):
+    """Stand-in services with the orchestrator in front; yields its URL."""
+    with ExitStack() as stack:
+        transcriber = stack.enter_context(transcriber_stub(delay=stt_delay))
+        ollama = stack.enter_context(ollama_stub(answer, token_delay=llm_token_delay,
+                                                 first_token_delay=llm_ttft))
+        tts = stack.enter_context(tts_stub(delay=tts_delay, seconds_per_char=tts_seconds_per_char))
+        os.environ.update({
+            "TRANSCRIBER_URL": transcriber.url,
+            "OLLAMA_URL": ollama.url,
+            "TTS_URL": tts.url,
+            "SCRATCH_DIR": stack.enter_context(tempfile.TemporaryDirectory()),
+        })
+        # The orchestrator imports its helpers by bare name, as in its container
+        sys.path.insert(0, str(ROOT / "orchestrator"))
+        import app as orchestrator
+        # Per-request log lines would drown the report
+        logging.getLogger().setLevel(logging.WARNING)
+        server = stack.enter_context(AsgiServer(orchestrator.app))
+        yield server.url
+
+
+def one_turn(session, url, endpoint, name, wav):
+    """Run one voice turn; returns (latency s, time to first audio s)."""
+    files = {"file": (name, wav, "audio/wav")}
+    started = time.perf_counter()
+    if endpoint == "stream":
+        response = session.post(f"{url}/process_audio/stream", files=files, stream=True)
+        response.raise_for_status()
+    else:
+        result = session.post(f"{url}/process_audio", files=files)
+        result.raise_for_status()
+        response = session.get(f"{url}{result.json()['audio_url']}", stream=True)
+        response.raise_for_status()
+
+    first_audio = None
+    received = 0
+    with response:
+        for chunk in response.iter_content(chunk_size=4096):
+            received += len(chunk)
+            if first_audio is None and received > WAV_HEADER_SIZE:
+                first_audio = time.perf_counter() - started
+    latency = time.perf_counter() - started
+    return latency, first_audio if first_audio is not None else latency
+
+
+def run(url, corpus, count=20, concurrency=4, endpoint="process"):
+    """Send ``count`` turns, ``concurrency`` at a time; returns the report."""
+    local = threading.local()
+
+    def turn(i):
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        name, wav = corpus[i % len(corpus)]
+        try:
+            return one_turn(local.session, url, endpoint, name, wav)
+        except Exception as e:
+            print(f"Turn {i} failed: {e}", file=sys.stderr)
+            return None
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(turn, range(count)))
+    elapsed = time.perf_counter() - started
+
+    done = [result for result in results if result is not None]
+    latencies = [latency * 1000 for latency, _ in done]
+    ttfas = [ttfa * 1000 for _, ttfa in done]
+    report = {
+        "endpoint": endpoint,
+        "requests": count,
+        "concurrency": concurrency,
+        "errors": count - len(done),
+        "requests_per_second": round(len(done) / elapsed, 2),
+    }
+    for q in (50, 95, 99):
+        report[f"latency_ms_p{q}"] = round(percentile(latencies, q), 1)
+    for q in (50, 95, 99):
+        report[f"ttfa_ms_p{q}"] = round(percentile(ttfas, q), 1)
+    return report
+
+
+def compare(report, baseline, tolerance=0.2):
+    """Descriptions of every result worse than ``baseline`` by more than ``tolerance``."""
+    regressions = []
+    for key in LATENCY_KEYS:
+        if key in baseline and report[key] > baseline[key] * (1 + tolerance):
+            regressions.append(f"{key}: {report[key]} ms, baseline {baseline[key]} ms")
+    key = "requests_per_second"
+    if key in baseline and report[key] < baseline[key] * (1 - tolerance):
+        regressions.append(f"{key}: {report[key]}, baseline {baseline[key]}")
+    if report["errors"] > baseline.get("errors", 0):
+        regressions.append(f"errors: {report['errors']}, baseline {baseline.get('errors', 0)}")
+    return regressions
+
+
+def print_report(report, baseline=None):
+    for key, value in report.items():
+        line = f"{key:>22}  {value}"
+        if baseline and key in LATENCY_KEYS + ("requests_per_second",) and baseline.get(key):
+            line += f"  ({(value - baseline[key]) / baseline[key]:+.0%} vs baseline)"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the voice pipeline end to end")
+    parser.add_argument("--orchestrator-url", help="Benchmark a running stack instead of local stand-ins")
+    parser.add_argument("--corpus", help="Directory of WAV files to upload (default: 1-5 s of silence)")
+    parser.add_argument("--endpoint", choices=("process", "stream"), default="process",
+                        help="/process_audio then /play_response, or /process_audio/stream")
+    parser.add_argument("--requests", type=int, default=40, help="Number of voice turns")
+    parser.add_argument("--concurrency", type=int, default=4, help="Turns in flight at once")
+    parser.add_argument("--stt-delay", type=float, default=0.1, help="Stand-in transcription time (s)")
+    parser.add_argument("--llm-ttft", type=float, default=0.2, help="Stand-in time to first token (s)")
+    parser.add_argument("--llm-token-rate", type=float, default=50.0, help="Stand-in tokens per second")
+    parser.add_argument("--tts-delay", type=float, default=0.05, help="Stand-in synthesis time per request (s)")
+    parser.add_argument("--baseline", help="Baseline JSON to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="Write this run to --baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Allowed slowdown relative to the baseline (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus)
+    with ExitStack() as stack:
+        url = args.orchestrator_url
+        if url is None:
+            url = stack.enter_context(local_stack(
+                args.stt_delay, args.llm_ttft, 1 / args.llm_token_rate, args.tts_delay,
+                tts_seconds_per_char=0.01))
+        report = run(url, corpus, count=args.requests, concurrency=args.concurrency,
+                     endpoint=args.endpoint)
+
+    if args.save_baseline:
+        if not args.baseline:
+            parser.error("--save-baseline needs --baseline")
+        Path(args.baseline).write_text(json.dumps(report, indent=2) + "\n")
+        print_report(report)
+        print(f"Saved baseline to {args.baseline}")
+        return 0
+
+    baseline = None
+    if args.baseline and os.path.exists(args.baseline):
+        baseline = json.loads(Path(args.baseline).read_text())
+        if (baseline.get("endpoint"), baseline.get("concurrency")) != (report["endpoint"], report["concurrency"]):
+            print("Baseline was taken with a different endpoint or concurrency", file=sys.stderr)
+    print_report(report, baseline)
+
+    regressions = compare(report, baseline, args.tolerance) if baseline else []
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,86 @@
+import threading
+
+WAV_HEADER_SIZE = 44
+
+
+def strip_wav_header(chunks, header_size=WAV_HEADER_SIZE):
+    """Yield the PCM of a streamed WAV body, dropping its fixed-size header."""
+    skip = header_size
+    for chunk in chunks:
+        if skip:
+            dropped = min(skip, len(chunk))
+            chunk = chunk[dropped:]
+            skip -= dropped
+        if chunk:
+            yield chunk
+
+
+class JitterBuffer:
+    """PCM queue between a network stream and the sound card.
+
+    Playback only starts once ``prebuffer_bytes`` have arrived (or the
+    stream has ended), and goes back to buffering if it ever runs dry, so
+    uneven network delivery doesn't turn into crackles. Reads return whole
+    ``frame_bytes`` frames only.
+    """
+
+    def __init__(self, prebuffer_bytes, frame_bytes=2):
+        self.prebuffer_bytes = max(prebuffer_bytes, frame_bytes)
+        self.frame_bytes = frame_bytes
+        self._data = bytearray()
+        self._buffering = True
+        self._finished = False
+        self._cond = threading.Condition()
+        self.underruns = 0
+
+    def put(self, data):
+        with self._cond:
+            self._data += data
+            if self._buffering and len(self._data) >= self.prebuffer_bytes:
+                self._buffering = False
+            self._cond.notify_all()
+
+    def finish(self):
+        """No more data is coming; let the rest play out."""
+        with self._cond:
+            self._finished = True
+            self._cond.notify_all()
+
+    def clear(self):
+        """Drop everything not played yet and end playback."""
+        with self._cond:
+            self._data.clear()
+            self._finished = True
+            self._cond.notify_all()
+
+    def read(self, size, timeout=None):
+        """Up to ``size`` bytes, waiting while buffering; b"" once finished."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._finished or not self._buffering, timeout):
+                return None
+            size = min(size, len(self._data))
+            if not self._finished:
+                size -= size % self.frame_bytes
+            data = bytes(self._data[:size])
+            del self._data[:size]
+            if len(self._data) < self.frame_bytes and not self._finished:
+                self._buffering = True
+                self.underruns += 1
+            return data
+
+
+class Player(threading.Thread):
+    """Plays a JitterBuffer through ``write`` (e.g. an open PyAudio stream)."""
+
+    def __init__(self, buffer, write, chunk_bytes=2048):
+        super().__init__(name="player", daemon=True)
+        self.buffer = buffer
+        self.write = write
+        self.chunk_bytes = chunk_bytes
+
+    def run(self):
+        while True:
+            data = self.buffer.read(self.chunk_bytes)
+            if not data:
+                break
+            self.write(data)
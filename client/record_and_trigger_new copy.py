@@ -2,29 +2,33 @@ import os
 import uuid
 import wave
 import pyaudio
-import requests
 import logging
 import argparse
 import time
-#import threading
-import audioop
-import numpy as np  # Import numpy
+import queue
+import threading
+from service_client import ServiceClient
+from turn import Turn
+from vad import VoiceActivityDetector
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+SYSTEM_PROMPT = "you are a friendly conversation bot that helps people get clarity in the schedule for the day be positive and encouraging"
+
 class TranscriberClient:
     def __init__(self, url="http://localhost:8001"):
         """Initialize with transcriber service URL"""
         self.url = url
+        self.client = ServiceClient(url, name="transcriber", timeout=(3.05, 60))
         logger.info(f"Initialized Transcriber client with URL: {self.url}")
 
     def transcribe_audio(self, audio_file):
         """Transcribe audio using the transcriber API"""
         try:
             files = {"audio": audio_file}
-            response = requests.post(f"{self.url}/transcribe", files=files)
+            response = self.client.post("/transcribe", files=files)
 
             if response.status_code == 200:
                 result = response.json()
@@ -43,29 +47,40 @@ class OllamaClient:
     def __init__(self, url="http://localhost:11434"):
         """Initialize with Ollama API URL"""
         self.url = url
+        self.client = ServiceClient(url, name="ollama", timeout=(3.05, 60))
+        # Context tokens returned by the last turn; sending them back lets
+        # Ollama reuse its KV cache instead of re-reading the conversation
+        self.context = None
         logger.info(f"Initialized Ollama client with URL: {self.url}")
 
-    def generate_text(self, prompt, model="llama2", stream=False, context=None):
-        """Generate text using the Ollama API"""
+    def reset(self):
+        """Start a new conversation"""
+        self.context = None
+
+    def generate_text(self, prompt, model="llama2", stream=False, context=None, system=None, keep_alive="30m"):
+        """Generate text using the Ollama API, continuing the conversation"""
         try:
             payload = {
                 "model": model,
                 "prompt": prompt,
-                "stream": stream
+                "stream": stream,
+                "keep_alive": keep_alive
             }
 
+            context = context if context is not None else self.context
             if context:
                 payload["context"] = context
+            elif system:
+                # Only the first turn needs it, later turns carry it in the context
+                payload["system"] = system
 
             logger.info(f"Sending prompt to Ollama API")
 
-            response = requests.post(
-                f"{self.url}/api/generate",
-                json=payload,
-                timeout=60)
+            response = self.client.post("/api/generate", json=payload)
     
             if response.status_code == 200:
                 result = response.json()
+                self.context = result.pop("context", None)
                 logger.info("Ollama processing successful")
                 return result
             else:
@@ -77,6 +92,24 @@ class OllamaClient:
             logger.error(f"Error sending text to Ollama: {e}")
             return None
 
+class ConversationClient:
+    def __init__(self, url="http://localhost:8000"):
+        """Initialize with orchestrator URL"""
+        self.url = url
+        self.client = ServiceClient(url, name="orchestrator", timeout=(3.05, 120))
+        self.session_id = None
+        logger.info(f"Initialized Conversation client with URL: {self.url}")
+
+    def stream_turn(self, chunks, rate=16000):
+        """Upload PCM chunks as they are recorded; returns the streamed spoken answer"""
+        headers = {"Content-Type": f"audio/L16; rate={rate}; channels=1"}
+        if self.session_id:
+            headers["X-Session-ID"] = self.session_id
+        # A generator body is sent with chunked encoding while it is produced
+        response = self.client.post("/process_audio/stream", data=chunks, headers=headers, stream=True)
+        self.session_id = response.headers.get("X-Session-ID", self.session_id)
+        return response
+
 class VoiceRecorder:
     def __init__(self,
                  rate=16000,
@@ -87,8 +120,8 @@ class VoiceRecorder:
                  ollama_url="http://localhost:11434",
                  tts_url="http://localhost:8003",
                  shared_dir="./shared",
-                 silence_threshold=500,
-                 silence_duration=10,
+                 vad_margin_db=10.0,
+                 silence_duration=0.3,
                  recording_timeout=300):  # Maximum recording time in seconds
         """Initialize voice recorder with audio parameters and service URLs"""
         self.rate = rate
@@ -102,42 +135,44 @@ class VoiceRecorder:
         temp_file = os.path.join(self.shared_dir, "temp_recording.wav")
         self.temp_wav_file = temp_file.replace("\\", "/")
         self.is_recording = False
-        self.last_audio_time = None
-        self.SILENCE_THRESHOLD = silence_threshold  # Adjust based on your microphone and environment
         self.SILENCE_DURATION = silence_duration  # Seconds of silence to trigger end of recording
         self.RECORDING_TIMEOUT = recording_timeout # Set the Time
         self.start_time=time.time()
-        logger.info (f"Silence threshold is {self.SILENCE_DURATION} time {self.RECORDING_TIMEOUT}") #Log checks
+        # Speech must be vad_margin_db louder than the room; the utterance
+        # ends SILENCE_DURATION after the speaker stops
+        self.vad = VoiceActivityDetector(sample_rate=rate, margin_db=vad_margin_db,
+                                         hangover_ms=int(silence_duration * 1000))
+        self.utterance_done = threading.Event()
+        logger.info (f"Silence duration is {self.SILENCE_DURATION} time {self.RECORDING_TIMEOUT}") #Log checks
 
         # Initialize service clients
         self.transcriber = TranscriberClient(url=transcriber_url)
         self.ollama = OllamaClient(url=ollama_url)
         self.tts_url = tts_url
-    def is_silent(self, data):
-        """Determines if the audio chunk is silence based on threshold."""
-        audio_data = np.frombuffer(data, dtype=np.int16)
-        return np.abs(audio_data).mean() < self.SILENCE_THRESHOLD
+        self.tts = ServiceClient(tts_url, name="tts", timeout=(3.05, 60))
+    def _pyaudio(self):
+        """One PyAudio instance for the whole session"""
+        if self.audio is None:
+            self.audio = pyaudio.PyAudio()
+        return self.audio
 
     def _audio_callback(self, in_data, frame_count, time_info, status):
         """Audio callback function for PyAudio stream."""
-        # Calculate the volume (RMS) of the audio chunk
-        rms = audioop.rms(in_data, 2)  # Assuming 2 bytes per sample (paInt16)
-
-        # See and trigger base information if there are any
-        if rms > self.SILENCE_THRESHOLD: #Set RMS
-            self.last_audio_time = time.time() #Set to last time.
-            self.frames.append(in_data) #Then add
-
-        #See if no last audiotime
-        elif self.last_audio_time is None: #If there is new message, make it to zero to be ready
-            self. last_audio_time = time.time()
-
-        #Otherwise check and do nothing
-        
-        elif (time.time() - self.last_audio_time) > self.SILENCE_DURATION:
-            print("Silence detected, stopping recording.")
-            return (in_data, pyaudio.paComplete)
-        return (in_data, pyaudio.paContinue)
+        for event, audio in self.vad.feed(in_data):
+            if event == "start":
+                print("Speech detected")
+            if event == "end":
+                print("Silence detected, stopping recording.")
+                self.utterance_done.set()
+                return (None, pyaudio.paComplete)
+            # Everything from the pre-roll to the end is kept, quiet frames too
+            self.frames.append(audio)
+
+        if (time.time() - self.start_time) > self.RECORDING_TIMEOUT:
+            print("Recording timeout reached, stopping recording.")
+            self.utterance_done.set()
+            return (None, pyaudio.paComplete)
+        return (None, pyaudio.paContinue)
 
     def start_recording(self):
         """Start recording audio from microphone."""
@@ -148,12 +183,13 @@ class VoiceRecorder:
         print("Starting recording... Speak now.")
         self.is_recording = True
         self.frames = []
-        self.last_audio_time = 0
+        self.vad.reset()
+        self.utterance_done.clear()
+        self.start_time = time.time()
 
         # Open audio stream
         try:
-            self.audio = pyaudio.PyAudio()
-            self.stream = self.audio.open(
+            self.stream = self._pyaudio().open(
                 format=self.format,
                 channels=self.channels,
                 rate=self.rate,
@@ -200,8 +236,68 @@ class VoiceRecorder:
         """Clean up resources."""
         if self.stream:
             self.stream.close()
+            self.stream = None
         if self.audio:
             self.audio.terminate()
+            self.audio = None
+
+    def converse(self, conversation, jitter_ms=200, barge_in=True, barge_in_margin_db=10.0):
+        """Talk continuously: upload while recording, play while receiving.
+
+        The microphone and speaker stay open for the whole session. Audio
+        is streamed to the orchestrator from the moment the VAD hears
+        speech, and the answer plays as soon as jitter_ms of it arrived.
+        The microphone keeps listening while the answer plays; speaking
+        over it (barge_in_margin_db louder than normal, so the speaker's
+        own sound doesn't count) stops the answer and its generation and
+        starts the next turn right away.
+        """
+        audio = self._pyaudio()
+        speaker = audio.open(format=self.format, channels=self.channels, rate=self.rate, output=True)
+        captured = queue.Queue()
+
+        def capture(in_data, frame_count, time_info, status):
+            captured.put(in_data)
+            return (None, pyaudio.paContinue)
+
+        self.stream = audio.open(format=self.format, channels=self.channels, rate=self.rate, input=True,
+                                 frames_per_buffer=self.chunk, stream_callback=capture)
+        self.stream.start_stream()
+        jitter_bytes = int(self.rate * jitter_ms / 1000) * 2
+        margin_db = self.vad.margin_db
+        turn = None
+        print("Listening... Speak now.")
+
+        try:
+            while True:
+                data = captured.get()
+                answering = turn is not None and turn.answering
+                if answering and not barge_in:
+                    continue  # don't listen to ourselves
+                self.vad.margin_db = margin_db + barge_in_margin_db if answering else margin_db
+
+                for event, pcm in self.vad.feed(data):
+                    if event == "start":
+                        if turn is not None and turn.is_alive():
+                            print("Interrupted, stopping the answer")
+                            turn.cancel()
+                        print("Speech detected, streaming to the assistant")
+                        self.start_time = time.time()
+                        turn = Turn(conversation, speaker.write, rate=self.rate, jitter_bytes=jitter_bytes)
+                        turn.start()
+                    if event == "end":
+                        turn.end_of_speech()
+                        continue
+                    turn.send(pcm)
+
+                if turn is not None and turn.uploading and (time.time() - self.start_time) > self.RECORDING_TIMEOUT:
+                    print("Recording timeout reached")
+                    turn.end_of_speech()
+                    self.vad.reset()
+        finally:
+            if turn is not None:
+                turn.cancel()
+            speaker.close()
 
     def process_audio(self, model="llama2"):
         """Process audio through transcription and LLM"""
@@ -210,36 +306,17 @@ class VoiceRecorder:
 
         result = {} #For results
 
-        # 1: Start process here
-        try: #Open audio stream
-            print ("Starting to record if has access to the system")
-            self.audio = pyaudio.PyAudio()
-            print ("Started the audio")
-            self.stream = self.audio.open(
-                format=self.format,
-                channels=self.channels,
-                rate=self.rate,
-                input=True,
-                frames_per_buffer=self.chunk,
-                stream_callback=self._audio_callback
-    )
-            self.stream.start_stream()
-            print ("Started the streams")
-        except Exception as e:
-            logger.error(f"Error starting the stream {e}")
-            result["error"] = f"Error during stream creation {e}"
+        # 1: Record until the VAD sees the end of the utterance
+        if not self.is_recording:
+            self.start_recording()
+        if not self.stream:
+            result["error"] = "Error during stream creation"
             return result #It cannot be created to cannot proceed further
 
-        #Loop to run and see what happens. There needs to be two breaks, and for the call.  You have to say or terminate via keyboard interrup
-        try: #Check to ensure it continues run unless there is some interuption
-            while self.is_recording:
-                if (time.time() - self.start_time) > 5:
-                    break
-                time.sleep (1) #Let it breathe and pass on to next action
+        try: #Wait for the speaker to finish, or stop on keyboard interrupt
+            self.utterance_done.wait(self.RECORDING_TIMEOUT)
         except KeyboardInterrupt:
             print ("Keyboard Interupted")
-        except Exception as e:
-            logger.exception ("Error happened in process audio")
         # Stop recording and save audio file
         print ("Stopping and saving")
         audio_file = self.stop_recording()
@@ -264,13 +341,13 @@ class VoiceRecorder:
 
         result["transcription"] = transcription_result
 
-        prompt = f"you are a friendly conversation bot that helps people get clarity in the schedule for the day be positive and encouraging {transcription_result.get('text', '')}"
+        prompt = transcription_result.get('text', '')
         logger.info(f"Generated Prompt: {prompt}")
 
         try:
             # Get LLM response
             print ("Calling LLM")
-            llm_response = self.ollama.generate_text(prompt, model=model)
+            llm_response = self.ollama.generate_text(prompt, model=model, system=SYSTEM_PROMPT)
             print ("Called LLM")
 
             if llm_response is None:
@@ -285,8 +362,8 @@ class VoiceRecorder:
             # Synthesize speech using the TTS service
             try:
                 print ("Calling TTS")
-                tts_response = requests.post(
-                    self.tts_url + "/synthesize",
+                tts_response = self.tts.post(
+                    "/synthesize",
                     json={"text": llm_text},
                     stream=True)
                 print ("Called TTS")
@@ -296,13 +373,14 @@ class VoiceRecorder:
                 if tts_response.status_code == 200:
                     # Save the audio to a local file
                     print ("Saving to audio file")
-                    audio_data = tts_response.raw.read()  # Read all audio data
                     local_audio_dir = "./llm_audio" # local audio dir
                     os.makedirs(local_audio_dir, exist_ok=True) # Make the directory if it does not exist
                     audio_filename = os.path.join(local_audio_dir, f"llm_audio_{uuid.uuid4()}.wav") # Unique audio file
 
-                    with open(audio_filename, "wb") as f:
-                        f.write(audio_data)
+                    # Written as it arrives, so long answers never sit in memory whole
+                    with tts_response, open(audio_filename, "wb") as f:
+                        for chunk in tts_response.iter_content(chunk_size=64 * 1024):
+                            f.write(chunk)
                     print ("Saved to audio file")
 
                     logger.info(f"Audio saved to {audio_filename}")
@@ -311,7 +389,7 @@ class VoiceRecorder:
                     # Play the audio from local using stream:
                     try:
                         wf = wave.open(audio_filename, 'rb')
-                        p = pyaudio.PyAudio()
+                        p = self._pyaudio()
                         # Get the audio format from the wave file
                         format = p.get_format_from_width(wf.getsampwidth())
                         channels = wf.getnchannels()
@@ -332,7 +410,6 @@ class VoiceRecorder:
 
                         stream.stop_stream()
                         stream.close()
-                        p.terminate()
                         wf.close()
                         print ("Played with stream")
 
@@ -359,8 +436,15 @@ def main():
     parser.add_argument("--tts-url", default="http://localhost:8003", help="TTS service URL")
     parser.add_argument("--model", default="llama3.2", help="Ollama model to use")
     parser.add_argument("--shared-dir", default="./shared", help="Shared directory")
-    parser.add_argument("--silence-threshold", type=int, default=100, help="Silence threshold")
-    parser.add_argument("--silence-duration", type=float, default=5.0, help="Silence timeout in seconds")
+    parser.add_argument("--vad-margin-db", type=float, default=10.0, help="How much louder than the room speech must be (dB)")
+    parser.add_argument("--silence-duration", type=float, default=0.3, help="Silence that ends an utterance, in seconds")
+    parser.add_argument("--orchestrator-url", default="http://localhost:8000", help="Orchestrator URL")
+    parser.add_argument("--jitter-ms", type=int, default=200, help="Answer audio buffered before playback starts")
+    parser.add_argument("--no-barge-in", action="store_true", help="Don't let speech interrupt the answer")
+    parser.add_argument("--barge-in-margin-db", type=float, default=10.0,
+                        help="How much louder speech must be to interrupt the answer than to start a turn (dB)")
+    parser.add_argument("--sequential", action="store_true",
+                        help="Record, transcribe, generate and speak one step after another instead of streaming")
     args = parser.parse_args()
 
     print("=== Voice Interview Bot ===")
@@ -371,19 +455,27 @@ def main():
         ollama_url=args.ollama_url,
         tts_url=args.tts_url,
         shared_dir=args.shared_dir,
-        silence_threshold=args.silence_threshold,
+        vad_margin_db=args.vad_margin_db,
         silence_duration=args.silence_duration
     )
 
+    if not args.sequential:
+        try:
+            recorder.converse(ConversationClient(url=args.orchestrator_url), jitter_ms=args.jitter_ms,
+                              barge_in=not args.no_barge_in, barge_in_margin_db=args.barge_in_margin_db)
+        except KeyboardInterrupt:
+            print("Bye!")
+        finally:
+            recorder.cleanup()
+        return
+
     # Main loop
     while True:
         print("Listening for initial speech... Speak now.")
 
         recorder.start_recording()
 
-        # Wait for recording to complete in callback
-        time.sleep(recorder.SILENCE_DURATION + 1)
-        # Process the audio
+        # Process the audio once the VAD has seen the end of the utterance
         result = recorder.process_audio(model=args.model)
 
         if result and "error" not in result:
@@ -406,10 +498,6 @@ def main():
         #Clean values to reset values
         #These valuees cause the issue.
         recorder.frames = []
-        recorder.last_audio_time = None
-
-        #Recorder end is now over
-        recorder.cleanup()
 if __name__ == "__main__":
     main()
 
@@ -0,0 +1,95 @@
+import logging
+import queue
+import threading
+from urllib.parse import unquote
+
+from playback import JitterBuffer, Player, strip_wav_header
+
+logger = logging.getLogger(__name__)
+
+
+class Turn(threading.Thread):
+    """One utterance streamed to the orchestrator and its answer played back.
+
+    Captured PCM is handed over with ``send`` while the user speaks and
+    ``end_of_speech`` closes the upload. The answer plays through
+    ``write`` as it streams in. ``cancel`` stops playback at once and
+    closes the connection, which makes the backend stop generating too.
+    """
+
+    def __init__(self, conversation, write, rate=16000, jitter_bytes=6400):
+        super().__init__(name="turn", daemon=True)
+        self.conversation = conversation
+        self.write = write
+        self.rate = rate
+        self.buffer = JitterBuffer(jitter_bytes)
+        self.transcript = None
+        self.cancelled = threading.Event()
+        self.uploading = True
+        self._upload = queue.Queue()
+        self._response = None
+        self._lock = threading.Lock()
+
+    def send(self, pcm):
+        self._upload.put(pcm)
+
+    def end_of_speech(self):
+        self.uploading = False
+        self._upload.put(None)
+
+    @property
+    def answering(self):
+        """Upload finished, answer still coming in or playing."""
+        return not self.uploading and self.is_alive()
+
+    def cancel(self):
+        self.cancelled.set()
+        self.end_of_speech()
+        self.buffer.clear()
+        with self._lock:
+            if self._response is not None:
+                self._response.close()
+
+    def _chunks(self):
+        while True:
+            pcm = self._upload.get()
+            if pcm is None:
+                return
+            yield pcm
+
+    def run(self):
+        try:
+            response = self.conversation.stream_turn(self._chunks(), rate=self.rate)
+        except Exception as e:
+            if not self.cancelled.is_set():
+                logger.error(f"Error streaming to the orchestrator: {e}")
+            return
+
+        with self._lock:
+            self._response = response
+        if self.cancelled.is_set():
+            response.close()
+            return
+
+        with response:
+            if response.status_code != 200:
+                logger.error(f"Turn failed with status code {response.status_code}: {response.text}")
+                return
+            self.transcript = unquote(response.headers.get("X-Transcript", ""))
+            print(f"You said: {self.transcript}")
+
+            player = Player(self.buffer, self.write)
+            player.start()
+            try:
+                for pcm in strip_wav_header(response.iter_content(chunk_size=4096)):
+                    if self.cancelled.is_set():
+                        break
+                    self.buffer.put(pcm)
+            except Exception as e:
+                if not self.cancelled.is_set():
+                    logger.error(f"Answer stream broke off: {e}")
+            finally:
+                self.buffer.finish()
+            player.join()
+            if self.buffer.underruns > 1:
+                logger.info(f"Playback ran dry {self.buffer.underruns - 1} times")
@@ -0,0 +1,113 @@
+import collections
+
+import numpy as np
+
+
+def frame_features(samples, frame_length):
+    """Energy (dBFS) and zero-crossing rate of consecutive frames.
+
+    ``samples`` is int16 PCM; trailing samples that don't fill a frame are
+    ignored. Both features are computed for all frames at once.
+    """
+    count = len(samples) // frame_length
+    frames = samples[:count * frame_length].reshape(count, frame_length).astype(np.float32) / 32768.0
+    power = np.mean(frames * frames, axis=1)
+    energy_db = 10 * np.log10(np.maximum(power, 1e-9))
+    signs = np.signbit(frames)
+    zcr = np.mean(signs[:, 1:] != signs[:, :-1], axis=1)
+    return energy_db, zcr
+
+
+class VoiceActivityDetector:
+    """Find utterances in a stream of 16-bit mono PCM.
+
+    Audio is cut into ``frame_ms`` frames. A frame counts as speech when
+    its energy is ``margin_db`` above the noise floor (and above
+    ``min_speech_db``) and its zero-crossing rate is below ``max_zcr``,
+    which rejects hiss. The noise floor is the quietest frame of the last
+    ``floor_window_ms``, so it follows the room up and down on its own;
+    speech always has gaps quieter than its words. ``start_ms`` of consecutive speech
+    starts an utterance, including the ``pre_roll_ms`` of audio before it
+    so the first syllable isn't clipped. The utterance ends after
+    ``hangover_ms`` without speech; pauses shorter than that stay part of
+    it, quiet frames included.
+
+    ``feed`` returns a list of ``(event, pcm)`` pairs: ``("start", pcm)``
+    with the pre-roll and the frames that triggered it, ``("audio", pcm)``
+    for the rest of the utterance, and ``("end", b"")``.
+    """
+
+    def __init__(self, sample_rate=16000, frame_ms=20, margin_db=10.0, min_speech_db=-50.0,
+                 max_zcr=0.4, start_ms=60, hangover_ms=300, pre_roll_ms=300, floor_window_ms=3000):
+        self.frame_length = sample_rate * frame_ms // 1000
+        self.margin_db = margin_db
+        self.min_speech_db = min_speech_db
+        self.max_zcr = max_zcr
+        self.start_frames = max(1, start_ms // frame_ms)
+        self.hangover_frames = max(1, hangover_ms // frame_ms)
+        self.floor_frames = max(1, floor_window_ms // frame_ms)
+        self.noise_floor = None
+        self._energies = np.zeros(0, dtype=np.float32)  # most recent frames, for the floor
+        self.in_speech = False
+        self._pending = b""
+        self._pre_roll = collections.deque(maxlen=max(1, pre_roll_ms // frame_ms) + self.start_frames)
+        self._speech_run = 0
+        self._silence_run = 0
+
+    def reset(self):
+        """Forget the current utterance; the noise floor is kept."""
+        self.in_speech = False
+        self._pending = b""
+        self._pre_roll.clear()
+        self._speech_run = 0
+        self._silence_run = 0
+
+    def feed(self, data):
+        data = self._pending + data
+        frame_bytes = self.frame_length * 2
+        usable = len(data) - len(data) % frame_bytes
+        self._pending = data[usable:]
+        if not usable:
+            return []
+
+        energy_db, zcr = frame_features(np.frombuffer(data[:usable], dtype=np.int16), self.frame_length)
+        events = []
+        audio = []
+        for i, speech in enumerate(self._classify(energy_db, zcr)):
+            frame = data[i * frame_bytes:(i + 1) * frame_bytes]
+
+            if not self.in_speech:
+                self._pre_roll.append(frame)
+                self._speech_run = self._speech_run + 1 if speech else 0
+                if self._speech_run >= self.start_frames:
+                    self.in_speech = True
+                    self._silence_run = 0
+                    events.append(("start", b"".join(self._pre_roll)))
+                    self._pre_roll.clear()
+                continue
+
+            audio.append(frame)
+            self._silence_run = 0 if speech else self._silence_run + 1
+            if self._silence_run >= self.hangover_frames:
+                events.append(("audio", b"".join(audio)))
+                events.append(("end", b""))
+                audio = []
+                self.in_speech = False
+                self._speech_run = 0
+
+        if audio:
+            events.append(("audio", b"".join(audio)))
+        return events
+
+    def _classify(self, energy_db, zcr):
+        """Speech/non-speech decision for every frame of a chunk at once."""
+        history = np.concatenate([self._energies, energy_db])
+        # Running minimum over the window ending at each new frame
+        padded = np.concatenate([np.full(self.floor_frames - 1, np.inf, dtype=np.float32), history])
+        windows = np.lib.stride_tricks.sliding_window_view(padded, self.floor_frames)
+        floor = windows.min(axis=1)[len(self._energies):]
+        self._energies = history[-(self.floor_frames - 1):] if self.floor_frames > 1 else history[:0]
+        self.noise_floor = float(floor[-1])
+
+        threshold = np.maximum(floor + self.margin_db, self.min_speech_db)
+        return (energy_db > threshold) & (zcr < self.max_zcr)
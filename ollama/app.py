@@ -1,23 +1,111 @@
-from flask import Flask, request, jsonify
-import requests
+from flask import Flask, request, jsonify, Response, stream_with_context, g
+import json
+import logging
 import os
+import requests
+import threading
+import time
+from backends import BackendPool, NoBackendError
+from generations import Generations
+from metrics import CONTENT_TYPE, REQUEST_ID_HEADER, Registry, request_id
+from response_cache import ResponseCache
+from scheduler import PRIORITIES, QueueFullError, QueueTimeoutError, Scheduler
+from service_client import ServiceClient
+from sessions import ConversationSessions
+from streaming import GenerationStats, sse_event
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 
 OLLAMA_HOST = os.environ.get("OLLAMA_HOST", "http://localhost:11434")
+# Comma-separated Ollama servers to balance over; defaults to OLLAMA_HOST
+OLLAMA_HOSTS = [host.strip() for host in os.environ.get("OLLAMA_HOSTS", OLLAMA_HOST).split(",") if host.strip()]
 DEFAULT_MODEL = os.environ.get("DEFAULT_MODEL", "llama2")
+# Non-streamed answers arrive in one piece, so allow for long generations
+GENERATE_TIMEOUT = float(os.environ.get("GENERATE_TIMEOUT", "120"))
+
+# How long Ollama keeps the model (and its KV cache) loaded between turns
+KEEP_ALIVE = os.environ.get("OLLAMA_KEEP_ALIVE", "30m")
+
+# A backend failing BACKEND_EJECT_AFTER times in a row is skipped until a
+# probe after BACKEND_EJECT_SECONDS succeeds
+pool = BackendPool([
+    ServiceClient(host, name=f"ollama@{host}", timeout=(5, GENERATE_TIMEOUT),
+                  failure_threshold=int(os.environ.get("BACKEND_EJECT_AFTER", "3")),
+                  reset_timeout=int(os.environ.get("BACKEND_EJECT_SECONDS", "30")))
+    for host in OLLAMA_HOSTS
+])
+BACKEND_REFRESH_SECONDS = int(os.environ.get("BACKEND_REFRESH_SECONDS", "30"))
+if BACKEND_REFRESH_SECONDS > 0:
+    pool.start_refresh(BACKEND_REFRESH_SECONDS)
+sessions = ConversationSessions(
+    ttl=int(os.environ.get("SESSION_TTL_SECONDS", "900")),
+    max_tokens=int(os.environ.get("SESSION_MAX_TOKENS", "500000"))
+)
+# Streamed generations can be cancelled by ID; speculative answers wait up
+# to SPECULATION_TTL_SECONDS to be committed to their conversation
+generations = Generations(sessions, ttl=int(os.environ.get("SPECULATION_TTL_SECONDS", "60")))
+
+# Generations allowed to run on Ollama at once (match OLLAMA_NUM_PARALLEL);
+# the rest wait in a bounded priority queue for at most QUEUE_DEADLINE_SECONDS
+scheduler = Scheduler(
+    concurrency=int(os.environ.get("GENERATE_CONCURRENCY", str(2 * len(OLLAMA_HOSTS)))),
+    max_queue=int(os.environ.get("GENERATE_QUEUE_SIZE", "32")),
+    deadline=float(os.environ.get("QUEUE_DEADLINE_SECONDS", "10"))
+)
+
+# Optional cache of answers to repeated (or nearly repeated) questions
+response_cache = None
+if os.environ.get("RESPONSE_CACHE", "0") == "1":
+    response_cache = ResponseCache(
+        threshold=float(os.environ.get("RESPONSE_CACHE_THRESHOLD", "0.75")),
+        ttl=int(os.environ.get("RESPONSE_CACHE_TTL", "3600")),
+        max_entries=int(os.environ.get("RESPONSE_CACHE_SIZE", "1024"))
+    )
+
+# Served on /metrics for Prometheus to scrape
+registry = Registry()
+request_seconds = registry.histogram(
+    "http_request_duration_seconds", "Time until the response headers were sent",
+    ("method", "endpoint", "status"))
+stage_seconds = registry.histogram(
+    "stage_duration_seconds", "Queue wait, time to first token and generation time", ("stage",))
+
+@app.before_request
+def start_request():
+    g.request_id = request_id(request.headers.get(REQUEST_ID_HEADER))
+    g.started = time.perf_counter()
+
+@app.after_request
+def finish_request(response):
+    endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+    request_seconds.observe(time.perf_counter() - g.started, method=request.method,
+                            endpoint=endpoint, status=response.status_code)
+    response.headers[REQUEST_ID_HEADER] = g.request_id
+    return response
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    return registry.render(), 200, {"Content-Type": CONTENT_TYPE}
 
 @app.route('/health', methods=['GET'])
 def health_check():
     try:
-        # Check if Ollama server is accessible
-        response = requests.get(f"{OLLAMA_HOST}/api/tags", timeout=5)
-        ollama_healthy = response.status_code == 200
+        # Check which Ollama servers are accessible and what they serve
+        tags = [result for result in pool.refresh() if result is not None]
+        ollama_healthy = bool(tags)
+        models = {model["name"]: model for result in tags for model in result.get("models", [])}
         
         return jsonify({
             "status": "healthy",
             "ollama_connection": ollama_healthy,
-            "available_models": response.json() if ollama_healthy else None
+            "available_models": {"models": list(models.values())} if ollama_healthy else None,
+            "backends": pool.stats(),
+            "sessions": sessions.stats(),
+            "generations": generations.stats(),
+            "queue": scheduler.stats()
         }), 200
     except Exception as e:
         return jsonify({
@@ -35,32 +123,280 @@ def generate_response():
     model = data.get('model', DEFAULT_MODEL)
     prompt = data['prompt']
     system_prompt = data.get('system_prompt', "You are a helpful voice assistant.")
+    stream = bool(data.get('stream', False))
+    session_id = data.get('session_id')
+    # Voice turns are interactive; batch jobs should ask for "background"
+    priority = PRIORITIES.get(data.get('priority', 'interactive'))
+    if priority is None:
+        return jsonify({"error": f"priority must be one of {', '.join(PRIORITIES)}"}), 400
+    # Cancel with DELETE /generate/<id>; speculative answers only continue
+    # the conversation once committed
+    generation_id = str(data.get('generation_id') or g.request_id)
+    speculative_id = generation_id if data.get('speculative') else None
     
     try:
-        # Call Ollama API
-        response = requests.post(
-            f"{OLLAMA_HOST}/api/generate",
-            json={
-                "model": model,
-                "prompt": prompt,
-                "system": system_prompt,
-                "stream": False
-            },
-            timeout=30
-        )
+        payload = ollama_payload(model, prompt, system_prompt, session_id)
+        sse = request.accept_mimetypes.best == "text/event-stream"
+        # Only fresh conversations are cached, later turns depend on what was said
+        cache_as = None
+        if response_cache is not None and data.get('cache', True) and "context" not in payload:
+            cache_as = (model, system_prompt, prompt)
+            cached, kind = response_cache.get(*cache_as)
+            if cached is not None:
+                # A similar question's context would make the conversation
+                # remember words the user never said
+                if kind == "exact" and session_id and cached["context"]:
+                    remember_context(session_id, {"context": cached["context"]}, speculative_id)
+                return cached_reply(model, cached["response"], session_id, kind, stream, sse)
+
+        try:
+            queue_seconds = scheduler.acquire(priority, deadline=data.get('max_queue_seconds'))
+        except QueueFullError as e:
+            return jsonify({"error": str(e)}), 429, {"Retry-After": "1"}
+        except QueueTimeoutError as e:
+            return jsonify({"error": str(e)}), 503, {"Retry-After": "1"}
+        stage_seconds.observe(queue_seconds, stage="queue")
+        extra = {"session_id": session_id, "queue_ms": round(queue_seconds * 1000, 1)}
+
+        if stream:
+            # The slot is held until the last token has been sent
+            try:
+                return stream_response(model, payload, extra, sse=sse, cache_as=cache_as,
+                                       on_done=scheduler.release, generation_id=generation_id,
+                                       speculative=speculative_id is not None)
+            except NoBackendError as e:
+                scheduler.release()
+                return jsonify({"error": str(e)}), 503, {"Retry-After": "5"}
+            except Exception:
+                scheduler.release()
+                raise
+
+        try:
+            stats = GenerationStats(streamed=False)
+            # Call Ollama API
+            backend, response = post_generate(model, session_id, json={**payload, "stream": False})
+            pool.release(backend)
+        except NoBackendError as e:
+            return jsonify({"error": str(e)}), 503, {"Retry-After": "5"}
+        finally:
+            scheduler.release()
         
         if response.status_code != 200:
             return jsonify({"error": f"Ollama API error: {response.text}"}), response.status_code
         
         result = response.json()
-        return jsonify({
+        context = remember_context(session_id, result, speculative_id)
+        if cache_as:
+            response_cache.put(*cache_as, {"response": result.get("response", ""), "context": context})
+        stats.observe(result)
+        summary = stats.summary()
+        log_stats(model, summary)
+        reply = jsonify({
             "response": result.get("response", ""),
             "model": model,
-            "total_duration": result.get("total_duration", 0)
+            **extra,
+            **summary
         })
+        if cache_as:
+            reply.headers["X-Cache"] = "miss"
+        return reply
     
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/generate/<generation_id>', methods=['DELETE'])
+def cancel_generation(generation_id):
+    """Stop a streamed generation, or drop a speculative answer's context."""
+    return jsonify({"generation_id": generation_id, "cancelled": generations.cancel(generation_id)})
+
+@app.route('/generate/<generation_id>/commit', methods=['POST'])
+def commit_generation(generation_id):
+    """Make a speculative answer part of its conversation, now or once it's done."""
+    generations.commit(generation_id)
+    return jsonify({"generation_id": generation_id, "committed": True})
+
+@app.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    if response_cache is None:
+        return jsonify({"enabled": False})
+    return jsonify({"enabled": True, **response_cache.stats()})
+
+@app.route('/queue/stats', methods=['GET'])
+def queue_stats():
+    return jsonify(scheduler.stats())
+
+@app.route('/sessions/<session_id>', methods=['DELETE'])
+def end_session(session_id):
+    """Forget a conversation so its next turn starts from scratch."""
+    pool.forget(session_id)
+    return jsonify({"session_id": session_id, "deleted": sessions.drop(session_id)})
+
+def post_generate(model, session_id, **kwargs):
+    """POST /api/generate to a backend picked by the pool.
+
+    Returns (backend, response); the caller must ``pool.release(backend)``.
+    A backend that can't be reached is skipped in favour of the next one.
+    """
+    unreachable = []
+    while True:
+        backend = pool.acquire(model, session_id, exclude=unreachable)
+        try:
+            return backend, backend.client.post("/api/generate", **kwargs)
+        except requests.exceptions.ConnectionError:
+            pool.release(backend)
+            unreachable.append(backend)
+            logger.warning(f"Ollama backend {backend.url} is unreachable")
+            if len(unreachable) == len(pool.backends):
+                raise
+        except Exception:
+            pool.release(backend)
+            raise
+
+def ollama_payload(model, prompt, system_prompt, session_id):
+    """Ollama request body, continuing the session's conversation if any."""
+    payload = {"model": model, "prompt": prompt, "keep_alive": KEEP_ALIVE}
+    context = sessions.get(session_id) if session_id else None
+    if context:
+        # The system prompt and earlier turns are already in the context
+        payload["context"] = context
+    else:
+        payload["system"] = system_prompt
+    return payload
+
+def remember_context(session_id, result, speculative_id=None):
+    """Store the context Ollama returned; it's never sent back to callers.
+
+    A speculative answer's context is held until it's committed.
+    """
+    context = result.pop("context", None)
+    if session_id and context:
+        if speculative_id:
+            generations.hold(speculative_id, session_id, context)
+        else:
+            sessions.update(session_id, context)
+    return context
+
+def cached_reply(model, text, session_id, kind, stream, sse=False):
+    """Answer from the response cache without calling the LLM."""
+    stats = GenerationStats()
+    stats.observe({"response": text, "done": True})
+    summary = {**stats.summary(), "session_id": session_id}
+    logger.info(f"[{g.request_id}] {model}: answered from cache ({kind})")
+    headers = {"X-Cache": kind}
+    if not stream:
+        return jsonify({"response": text, "model": model, **summary}), 200, headers
+
+    chunks = [{"model": model, "response": text, "done": False},
+              {"model": model, "response": "", "done": True, **summary}]
+    if sse:
+        body = sse_event(chunks[0]) + sse_event(chunks[1], "done")
+        return Response(body, mimetype="text/event-stream", headers=headers)
+    body = b"".join(json.dumps(chunk).encode("utf-8") + b"\n" for chunk in chunks)
+    return Response(body, mimetype="application/x-ndjson", headers=headers)
+
+def log_stats(model, summary):
+    stage_seconds.observe(summary["ttft_ms"] / 1000, stage="ttft")
+    stage_seconds.observe(summary["total_duration"] / 1e9, stage="generation")
+    logger.info(f"[{g.request_id}] {model}: first token after {summary['ttft_ms']:.0f} ms, "
+                f"{summary['eval_count']} tokens at {summary['tokens_per_second']:.1f} tokens/s")
+
+def stream_response(model, payload, extra, sse=False, cache_as=None, on_done=None,
+                    generation_id=None, speculative=False):
+    """Proxy Ollama's NDJSON token stream to the caller line by line.
+
+    The final ``done`` chunk is extended with time-to-first-token, tokens/s
+    and the fields in ``extra``; its context stays on the server. A
+    complete answer is stored in the response cache under ``cache_as``.
+    ``on_done`` is called once the stream is over. With ``sse`` the same
+    chunks are sent as server-sent events, the last one as a ``done`` event.
+    Cancelling ``generation_id`` ends the stream with a ``done`` chunk whose
+    ``done_reason`` is "cancelled".
+    """
+    # Only the connect phase is bounded; tokens may take a while to arrive
+    backend, response = post_generate(
+        model,
+        extra["session_id"],
+        json={**payload, "stream": True},
+        stream=True,
+        timeout=(5, None)
+    )
+
+    finished = threading.Lock()
+    cancelled = threading.Event()
+
+    def finish():
+        # After the last chunk, when the client goes away or on cancel,
+        # whichever is first
+        if finished.acquire(blocking=False):
+            response.close()
+            pool.release(backend)
+            generations.end(generation_id)
+            if on_done:
+                on_done()
+
+    def stop():
+        cancelled.set()
+        finish()
+
+    if response.status_code != 200:
+        error = jsonify({"error": f"Ollama API error: {response.text}"})
+        error.status_code = response.status_code
+        finish()
+        return error
+    if generation_id and not generations.start(generation_id, stop, speculative):
+        finish()
+        return jsonify({"error": f"Generation {generation_id} was cancelled"}), 409
+
+    session_id = extra["session_id"]
+    stats = GenerationStats()
+
+    def generate():
+        tokens = []
+        done = False
+        try:
+            try:
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    stats.observe(chunk)
+                    tokens.append(chunk.get("response", ""))
+                    if chunk.get("done"):
+                        done = True
+                        context = remember_context(session_id, chunk, generation_id if speculative else None)
+                        if cache_as:
+                            response_cache.put(*cache_as, {"response": "".join(tokens), "context": context})
+                        summary = stats.summary()
+                        log_stats(model, summary)
+                        chunk.update(summary, **extra)
+                        line = json.dumps(chunk).encode("utf-8")
+                    if sse:
+                        event = "error" if "error" in chunk else "done" if chunk.get("done") else None
+                        yield sse_event(chunk, event)
+                    else:
+                        # Token lines pass through untouched
+                        yield line + b"\n"
+            except Exception:
+                # Reading from the closed Ollama response fails once cancelled
+                if not cancelled.is_set():
+                    raise
+            if cancelled.is_set() and not done:
+                logger.info(f"[{g.request_id}] {model}: generation {generation_id} cancelled")
+                chunk = {"model": model, "response": "", "done": True, "done_reason": "cancelled", **extra}
+                yield sse_event(chunk, "done") if sse else json.dumps(chunk).encode("utf-8") + b"\n"
+        finally:
+            finish()
+
+    headers = {"X-Cache": "miss"} if cache_as else {}
+    if generation_id:
+        headers["X-Generation-ID"] = generation_id
+    if sse:
+        headers.update({"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+        reply = Response(stream_with_context(generate()), mimetype="text/event-stream", headers=headers)
+    else:
+        reply = Response(stream_with_context(generate()), mimetype="application/x-ndjson", headers=headers)
+    reply.call_on_close(finish)
+    return reply
+
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=8002)
\ No newline at end of file
@@ -0,0 +1,114 @@
+import threading
+from collections import OrderedDict
+
+
+class NoBackendError(Exception):
+    """Every backend is ejected."""
+
+
+def model_tag(name):
+    """Ollama's full name for a model, ``llama3.2`` -> ``llama3.2:latest``."""
+    return name if ":" in name else f"{name}:latest"
+
+
+class Backend:
+    """One Ollama server, reached through its own ServiceClient."""
+
+    def __init__(self, client):
+        self.client = client
+        self.models = None  # unknown until the first refresh
+        self.outstanding = 0
+        self.assigned = 0
+
+    @property
+    def url(self):
+        return self.client.base_url
+
+    @property
+    def available(self):
+        # Backends that keep failing are ejected by their circuit breaker
+        # and let back in once a probe after ``reset_timeout`` succeeds
+        return not self.client.breaker.is_open
+
+    def serves(self, model):
+        return self.models is None or model_tag(model) in self.models
+
+
+class BackendPool:
+    """Spread generations over several Ollama servers.
+
+    ``acquire`` picks, among the backends that aren't ejected and have the
+    model, the one with the fewest requests in flight. A conversation stays
+    on the backend that served its previous turn while that backend is
+    usable, so Ollama can reuse the KV cache it holds for it. ``refresh``
+    polls ``/api/tags`` to learn which backend has which model, which also
+    serves as the health probe that lets ejected backends back in.
+    """
+
+    def __init__(self, clients, max_sessions=10000):
+        self.backends = [Backend(client) for client in clients]
+        self.max_sessions = max_sessions
+        self._affinity = OrderedDict()  # session_id -> Backend
+        self._lock = threading.Lock()
+
+    def acquire(self, model, session_id=None, exclude=()):
+        with self._lock:
+            candidates = [b for b in self.backends if b.available and b not in exclude]
+            if not candidates:
+                raise NoBackendError("No Ollama backend available")
+            # If nobody lists the model, let a backend answer with its own error
+            candidates = [b for b in candidates if b.serves(model)] or candidates
+
+            backend = self._affinity.get(session_id) if session_id else None
+            if backend not in candidates:
+                backend = min(candidates, key=lambda b: (b.outstanding, b.assigned))
+            if session_id:
+                self._affinity[session_id] = backend
+                self._affinity.move_to_end(session_id)
+                while len(self._affinity) > self.max_sessions:
+                    self._affinity.popitem(last=False)
+
+            backend.outstanding += 1
+            backend.assigned += 1
+            return backend
+
+    def release(self, backend):
+        with self._lock:
+            backend.outstanding -= 1
+
+    def forget(self, session_id):
+        with self._lock:
+            self._affinity.pop(session_id, None)
+
+    def refresh(self, timeout=5):
+        """Update every backend's model list; returns each one's /api/tags."""
+        results = []
+        for backend in self.backends:
+            try:
+                response = backend.client.get("/api/tags", timeout=timeout)
+                tags = response.json() if response.status_code == 200 else None
+            except Exception:
+                tags = None
+            if tags is not None:
+                backend.models = {model_tag(model["name"]) for model in tags.get("models", [])}
+            results.append(tags)
+        return results
+
+    def start_refresh(self, interval):
+        def loop():
+            while not stop.wait(interval):
+                self.refresh()
+
+        stop = threading.Event()
+        threading.Thread(target=loop, name="ollama-backend-refresh", daemon=True).start()
+        return stop
+
+    def stats(self):
+        with self._lock:
+            return [{
+                "url": backend.url,
+                "available": backend.available,
+                "outstanding": backend.outstanding,
+                "assigned": backend.assigned,
+                "models": sorted(backend.models) if backend.models is not None else None,
+            } for backend in self.backends]
@@ -0,0 +1,96 @@
+import threading
+import time
+
+
+class Generations:
+    """Streamed generations in flight, by generation ID.
+
+    ``cancel`` stops one from outside the request serving it, which frees
+    its backend and scheduler slot straight away. An ID cancelled before
+    its generation started is remembered for ``ttl`` seconds, so a late
+    start is refused rather than run for nobody.
+
+    Speculative generations are answers to a transcript that may still
+    change. Their Ollama context isn't stored in the conversation when they
+    finish but held until ``commit``; uncommitted ones are dropped after
+    ``ttl`` seconds. A commit may arrive before the generation has even
+    started (it's still queued, or was answered from the cache); it is
+    remembered, like a cancel, and applied once the context arrives.
+    """
+
+    def __init__(self, sessions, ttl=60):
+        self.sessions = sessions
+        self.ttl = ttl
+        self._running = {}      # generation_id -> stop callable
+        self._cancelled = {}    # generation_id -> cancelled at
+        self._speculative = {}  # generation_id -> [session_id, context, committed, updated at]
+        self._lock = threading.Lock()
+
+    def start(self, generation_id, stop, speculative=False):
+        """Register a running generation; False if it was cancelled already."""
+        with self._lock:
+            self._expire()
+            if self._cancelled.pop(generation_id, None) is not None:
+                return False
+            self._running[generation_id] = stop
+            if speculative:
+                entry = self._speculative.setdefault(generation_id, [None, None, False, None])
+                entry[3] = time.monotonic()
+            return True
+
+    def end(self, generation_id):
+        with self._lock:
+            self._running.pop(generation_id, None)
+
+    def cancel(self, generation_id):
+        """Stop a generation and forget its held context; False if unknown."""
+        with self._lock:
+            stop = self._running.pop(generation_id, None)
+            held = self._speculative.pop(generation_id, None)
+            if stop is None and held is None:
+                self._cancelled[generation_id] = time.monotonic()
+                return False
+        if stop is not None:
+            stop()
+        return True
+
+    def hold(self, generation_id, session_id, context):
+        """Keep a speculative answer's context until it is committed."""
+        with self._lock:
+            entry = self._speculative.get(generation_id)
+            if entry is None or not entry[2]:
+                self._speculative[generation_id] = [session_id, context, False, time.monotonic()]
+                return
+            del self._speculative[generation_id]
+        self.sessions.update(session_id, context)
+
+    def commit(self, generation_id):
+        """Accept a speculative answer; its context goes into the session.
+
+        Committing before the generation has finished, or before it has
+        started, stores the context as soon as it arrives.
+        """
+        with self._lock:
+            self._expire()
+            entry = self._speculative.setdefault(generation_id, [None, None, False, time.monotonic()])
+            session_id, context, _, _ = entry
+            if context is None:
+                entry[2] = True
+                return
+            del self._speculative[generation_id]
+        self.sessions.update(session_id, context)
+
+    def stats(self):
+        with self._lock:
+            self._expire()
+            return {"running": len(self._running), "speculative": len(self._speculative)}
+
+    def _expire(self):
+        cutoff = time.monotonic() - self.ttl
+        for generation_id, cancelled_at in list(self._cancelled.items()):
+            if cancelled_at < cutoff:
+                del self._cancelled[generation_id]
+        for generation_id, entry in list(self._speculative.items()):
+            # Still generating: it may be committed once it finishes
+            if entry[3] < cutoff and generation_id not in self._running:
+                del self._speculative[generation_id]
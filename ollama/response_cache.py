@@ -0,0 +1,169 @@
+import hashlib
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+
+def normalize(text):
+    """Casefold, drop punctuation and collapse whitespace."""
+    return " ".join(re.sub(r"[^\w\s']", " ", text.casefold()).split())
+
+
+_CONTRACTIONS = [(re.compile(pattern), replacement) for pattern, replacement in (
+    (r"\bcan't\b", "can not"), (r"\bwon't\b", "will not"), (r"n't\b", " not"),
+    (r"'s\b", " is"), (r"'re\b", " are"), (r"'m\b", " am"),
+    (r"'ll\b", " will"), (r"'ve\b", " have"), (r"'d\b", " would"),
+)]
+
+
+def expand(text):
+    """``normalize`` with contractions spelled out ("what's" -> "what is")."""
+    text = normalize(text)
+    for pattern, replacement in _CONTRACTIONS:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+# Filler that doesn't change what's being asked. Numbers, negations and
+# words like "on"/"off" are deliberately not in here.
+STOPWORDS = frozenset(
+    "a an the so please for me can could would tell just um uh hey ok okay well "
+    "to of is are do does".split())
+
+
+def content_words(text):
+    """The words that matter to the answer, in order.
+
+    Order counts: "move 3pm to 4pm" and "move 4pm to 3pm" use the same
+    words but ask for different things.
+    """
+    return tuple(word for word in expand(text).split() if word not in STOPWORDS)
+
+
+def exact_key(model, system_prompt, prompt):
+    material = "\x1f".join([model, system_prompt or "", normalize(prompt)])
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def embed(text, dim=512):
+    """Unit-length bag of hashed character trigrams and words.
+
+    A cheap local stand-in for a sentence embedding: rephrasings that share
+    most of their words and spelling land close together, and it needs no
+    model or network call.
+    """
+    text = expand(text)
+    padded = f" {text} "
+    features = [padded[i:i + 3] for i in range(len(padded) - 2)] + text.split()
+    vector = np.zeros(dim, dtype=np.float32)
+    if not features:
+        return vector
+    indices = np.fromiter((zlib.crc32(f.encode("utf-8")) % dim for f in features), dtype=np.int64)
+    vector += np.bincount(indices, minlength=dim).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+class ResponseCache:
+    """LLM answers by exact prompt, with a nearest-neighbour fallback.
+
+    Lookups first try an exact match on (model, system prompt, normalized
+    prompt). Failing that, the prompt's embedding is compared with all
+    cached prompts for the same model and system prompt at once (a single
+    matrix-vector product). The closest one whose cosine similarity
+    reaches ``threshold`` is used, but only if it has the same content
+    words in the same order: trigrams can't tell "5 minutes" from "15
+    minutes", "on" from "off" or "3pm to 4pm" from "4pm to 3pm", so only
+    filler and contractions may differ. That check decides; the threshold
+    just narrows down the candidates. Entries expire after ``ttl``
+    seconds; past ``max_entries`` the least recently used are evicted.
+    """
+
+    def __init__(self, threshold=0.75, ttl=3600, max_entries=1024, dim=512):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.dim = dim
+        self._entries = OrderedDict()  # exact key -> (slot, value)
+        self._vectors = np.zeros((max_entries, dim), dtype=np.float32)
+        self._scopes = np.zeros(max_entries, dtype=np.int64)
+        self._expires = np.zeros(max_entries)  # 0 marks a free slot
+        self._slot_keys = [None] * max_entries
+        self._slot_words = [None] * max_entries
+        self._lock = threading.Lock()
+        self.hits_exact = 0
+        self.hits_semantic = 0
+        self.misses = 0
+
+    def get(self, model, system_prompt, prompt):
+        """Return (value, "exact" | "semantic"), or (None, None) on a miss."""
+        key = exact_key(model, system_prompt, prompt)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expires[entry[0]] > now:
+                self._entries.move_to_end(key)
+                self.hits_exact += 1
+                return entry[1], "exact"
+
+            live = (self._expires > now) & (self._scopes == self._scope(model, system_prompt))
+            if live.any():
+                similarity = np.where(live, self._vectors @ embed(prompt, self.dim), -1.0)
+                words = content_words(prompt)
+                candidates = np.flatnonzero(similarity >= self.threshold)
+                # Closest first
+                for slot in candidates[np.argsort(-similarity[candidates])]:
+                    if self._slot_words[slot] != words:
+                        continue
+                    key = self._slot_keys[slot]
+                    self._entries.move_to_end(key)
+                    self.hits_semantic += 1
+                    return self._entries[key][1], "semantic"
+
+            self.misses += 1
+            return None, None
+
+    def put(self, model, system_prompt, prompt, value):
+        key = exact_key(model, system_prompt, prompt)
+        vector = embed(prompt, self.dim)
+        with self._lock:
+            if key in self._entries:
+                slot = self._entries.pop(key)[0]
+            else:
+                slot = self._free_slot()
+            self._entries[key] = (slot, value)
+            self._vectors[slot] = vector
+            self._scopes[slot] = self._scope(model, system_prompt)
+            self._expires[slot] = time.monotonic() + self.ttl
+            self._slot_keys[slot] = key
+            self._slot_words[slot] = content_words(prompt)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits_exact + self.hits_semantic + self.misses
+            return {
+                "hits_exact": self.hits_exact,
+                "hits_semantic": self.hits_semantic,
+                "misses": self.misses,
+                "hit_ratio": (self.hits_exact + self.hits_semantic) / lookups if lookups else 0.0,
+                "entries": int((self._expires > time.monotonic()).sum()),
+            }
+
+    def _free_slot(self):
+        free = np.flatnonzero(self._expires <= time.monotonic())
+        if len(free):
+            slot = int(free[0])
+            # Expired entry still holding the slot
+            if self._slot_keys[slot] is not None:
+                self._entries.pop(self._slot_keys[slot], None)
+            return slot
+        _, (slot, _) = self._entries.popitem(last=False)
+        return slot
+
+    @staticmethod
+    def _scope(model, system_prompt):
+        digest = hashlib.blake2b(f"{model}\x1f{system_prompt or ''}".encode("utf-8"), digest_size=8).digest()
+        return int.from_bytes(digest, "little", signed=True)
@@ -0,0 +1,126 @@
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+
+INTERACTIVE = 0
+BACKGROUND = 1
+PRIORITIES = {"interactive": INTERACTIVE, "background": BACKGROUND}
+
+
+class QueueFullError(Exception):
+    """No room in the queue; the caller should back off (HTTP 429)."""
+
+
+class QueueTimeoutError(Exception):
+    """Waited past the deadline without getting a slot (HTTP 503)."""
+
+
+class _Waiter:
+    __slots__ = ("state",)
+
+    def __init__(self):
+        self.state = "waiting"
+
+
+class Scheduler:
+    """Admission control in front of a backend that handles ``concurrency``
+    requests at a time.
+
+    ``acquire`` returns immediately while a slot is free; otherwise the
+    caller waits in a priority queue of at most ``max_queue`` entries,
+    interactive requests ahead of background ones and first come first
+    served within a priority. A full queue makes room for a more urgent
+    request by rejecting its least urgent, most recent entry. Callers that
+    can't get a slot within their deadline give up instead of adding to a
+    backlog the backend will never catch up with.
+    """
+
+    def __init__(self, concurrency=2, max_queue=32, deadline=10.0):
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.deadline = deadline
+        self.running = 0
+        self._queue = []  # (priority, seq, waiter)
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._waits = deque(maxlen=512)  # recent queue times in seconds
+        self.admitted = 0
+        self.rejected_full = 0
+        self.rejected_deadline = 0
+
+    def acquire(self, priority=INTERACTIVE, deadline=None):
+        """Wait for a slot; returns the seconds spent queued."""
+        deadline = self.deadline if deadline is None else deadline
+        started = time.monotonic()
+        with self._cond:
+            if self.running < self.concurrency and not self._queue:
+                self.running += 1
+                self.admitted += 1
+                return self._waited(started)
+
+            if len(self._queue) >= self.max_queue:
+                self._make_room(priority)
+            waiter = _Waiter()
+            heapq.heappush(self._queue, (priority, next(self._seq), waiter))
+
+            while waiter.state == "waiting":
+                remaining = started + deadline - time.monotonic()
+                if remaining <= 0:
+                    self._remove(waiter)
+                    self.rejected_deadline += 1
+                    raise QueueTimeoutError(f"No free slot within {deadline:.1f}s")
+                self._cond.wait(remaining)
+
+            if waiter.state == "evicted":
+                raise QueueFullError("Queue is full")
+            return self._waited(started)
+
+    def release(self):
+        with self._cond:
+            self.running -= 1
+            if self._queue and self.running < self.concurrency:
+                _, _, waiter = heapq.heappop(self._queue)
+                # Counted as running here so no newcomer can take the slot
+                # before the waiter wakes up
+                waiter.state = "granted"
+                self.running += 1
+                self.admitted += 1
+                self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            waits = sorted(self._waits)
+            queued = {name: sum(1 for p, _, _ in self._queue if p == priority)
+                      for name, priority in PRIORITIES.items()}
+            return {
+                "running": self.running,
+                "concurrency": self.concurrency,
+                "queued": len(self._queue),
+                "queued_by_priority": queued,
+                "admitted": self.admitted,
+                "rejected_full": self.rejected_full,
+                "rejected_deadline": self.rejected_deadline,
+                "queue_ms_p50": round(waits[len(waits) // 2] * 1000, 1) if waits else 0.0,
+                "queue_ms_p95": round(waits[int(len(waits) * 0.95)] * 1000, 1) if waits else 0.0,
+            }
+
+    def _waited(self, started):
+        waited = time.monotonic() - started
+        self._waits.append(waited)
+        return waited
+
+    def _make_room(self, priority):
+        victim = max(self._queue, key=lambda entry: (entry[0], entry[1]), default=None)
+        if victim is None or victim[0] <= priority:
+            self.rejected_full += 1
+            raise QueueFullError(f"Queue is full ({self.max_queue} waiting)")
+        self._remove(victim[2])
+        victim[2].state = "evicted"
+        self.rejected_full += 1
+        self._cond.notify_all()
+
+    def _remove(self, waiter):
+        self._queue = [entry for entry in self._queue if entry[2] is not waiter]
+        heapq.heapify(self._queue)
@@ -0,0 +1,68 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class ConversationSessions:
+    """Ollama ``context`` tokens of ongoing conversations, by session ID.
+
+    Passing the stored context back on the next turn lets Ollama reuse
+    its KV cache for everything already said, so a follow-up only pays
+    prefill for the new tokens. Sessions idle for more than ``ttl``
+    seconds are dropped, and once all sessions together hold more than
+    ``max_tokens`` context tokens the least recently used go first.
+    """
+
+    def __init__(self, ttl=900, max_tokens=500_000):
+        self.ttl = ttl
+        self.max_tokens = max_tokens
+        self._sessions = OrderedDict()  # session_id -> (context, last_used)
+        self._tokens = 0
+        self._lock = threading.Lock()
+
+    def get(self, session_id):
+        """Return the stored context, or None for a new or expired session."""
+        with self._lock:
+            self._expire()
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return None
+            self._sessions[session_id] = (entry[0], time.monotonic())
+            self._sessions.move_to_end(session_id)
+            return entry[0]
+
+    def update(self, session_id, context):
+        with self._lock:
+            self._pop(session_id)
+            if len(context) > self.max_tokens:
+                # Conversation outgrew the cap on its own; start it over
+                return
+            self._sessions[session_id] = (context, time.monotonic())
+            self._tokens += len(context)
+            while self._tokens > self.max_tokens:
+                self._pop(next(iter(self._sessions)))
+
+    def drop(self, session_id):
+        with self._lock:
+            return self._pop(session_id)
+
+    def stats(self):
+        with self._lock:
+            self._expire()
+            return {"sessions": len(self._sessions), "context_tokens": self._tokens}
+
+    def _pop(self, session_id):
+        entry = self._sessions.pop(session_id, None)
+        if entry is None:
+            return False
+        self._tokens -= len(entry[0])
+        return True
+
+    def _expire(self):
+        now = time.monotonic()
+        # Least recently used first, so stop at the first live session
+        while self._sessions:
+            session_id, (_, last_used) = next(iter(self._sessions.items()))
+            if now - last_used <= self.ttl:
+                break
+            self._pop(session_id)
@@ -0,0 +1,46 @@
+import json
+import time
+
+
+class GenerationStats:
+    """Latency and throughput of one generation.
+
+    Feed every chunk Ollama returns to ``observe``. Time to first token is
+    measured on the wall clock when streaming; for a single non-streamed
+    reply it falls back to Ollama's own load and prompt-evaluation time.
+    Tokens per second come from the ``eval_count``/``eval_duration``
+    counters in the final chunk.
+    """
+
+    def __init__(self, streamed=True):
+        self.streamed = streamed
+        self.started = time.monotonic()
+        self.first_token_at = None
+        self.final = {}
+
+    def observe(self, chunk):
+        if self.first_token_at is None and chunk.get("response"):
+            self.first_token_at = time.monotonic()
+        if chunk.get("done"):
+            self.final = chunk
+
+    def summary(self):
+        eval_count = self.final.get("eval_count", 0)
+        eval_duration = self.final.get("eval_duration", 0)  # nanoseconds
+        if self.streamed and self.first_token_at is not None:
+            ttft_ms = (self.first_token_at - self.started) * 1000
+        else:
+            ttft_ms = (self.final.get("load_duration", 0) + self.final.get("prompt_eval_duration", 0)) / 1e6
+        return {
+            "ttft_ms": round(ttft_ms, 1),
+            "tokens_per_second": round(eval_count / (eval_duration / 1e9), 2) if eval_duration else 0.0,
+            "eval_count": eval_count,
+            "total_duration": self.final.get("total_duration", 0),
+        }
+
+
+def sse_event(data, event=None):
+    """Encode one server-sent event carrying ``data`` as JSON."""
+    lines = [f"event: {event}"] if event else []
+    lines.append(f"data: {json.dumps(data)}")
+    return ("\n".join(lines) + "\n\n").encode("utf-8")
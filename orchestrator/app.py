@@ -1,71 +1,224 @@
 import os
 import tempfile
-import requests
-import ffmpeg
-from flask import Flask, request, jsonify, send_file
+import time
+from quart import Quart, request, jsonify, send_file, Response, g
+from quart.wrappers.response import FileBody
+import asyncio
+import logging
+import httpx
 import uuid
+from urllib.parse import quote
+import audio
+import audio_frames
+from metrics import CONTENT_TYPE, REQUEST_ID_HEADER, Registry, StageTimer, request_id
+from streaming import SentenceSplitter, aiter_ollama_tokens, wav_stream_header
+from workspace import ScratchSpace
+from service_client import AsyncServiceClient
+from speculation import Speculator
 
-app = Flask(__name__)
+# Files are sent in pieces of PLAY_CHUNK_BYTES however long they are
+class AudioFileBody(FileBody):
+    buffer_size = int(os.environ.get("PLAY_CHUNK_BYTES", "65536"))
+
+class AudioResponse(Response):
+    file_body_class = AudioFileBody
+
+app = Quart(__name__)
+app.response_class = AudioResponse
+# Streamed uploads last as long as the user keeps talking
+app.config["BODY_TIMEOUT"] = int(os.environ.get("UPLOAD_TIMEOUT", "300"))
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
 
 # Service URLs
 TRANSCRIBER_URL = os.environ.get("TRANSCRIBER_URL", "http://transcriber:8001")
 OLLAMA_URL = os.environ.get("OLLAMA_URL", "http://ollama:8002")
 TTS_URL = os.environ.get("TTS_URL", "http://tts:8003")
 
-@app.route('/health', methods=['GET'])
-def health_check():
-    try:
-        transcriber_response = requests.get(f"{TRANSCRIBER_URL}/health", timeout=5)
-        transcriber_healthy = transcriber_response.status_code == 200
+# One pooled keep-alive client per downstream service; read timeouts in seconds.
+# Each answer being streamed holds an Ollama connection for its whole length,
+# so the pools must fit the voice sessions expected at once. A request finding
+# its pool full waits at most POOL_TIMEOUT seconds for a connection.
+POOL_TIMEOUT = float(os.environ.get("POOL_TIMEOUT", "10"))
+transcriber = AsyncServiceClient(TRANSCRIBER_URL, name="transcriber",
+                                 timeout=(3.05, float(os.environ.get("TRANSCRIBER_TIMEOUT", "60"))),
+                                 pool_size=int(os.environ.get("TRANSCRIBER_POOL_SIZE", "100")),
+                                 pool_timeout=POOL_TIMEOUT)
+ollama = AsyncServiceClient(OLLAMA_URL, name="ollama",
+                            timeout=(3.05, float(os.environ.get("OLLAMA_TIMEOUT", "60"))),
+                            pool_size=int(os.environ.get("OLLAMA_POOL_SIZE", "200")),
+                            pool_timeout=POOL_TIMEOUT)
+tts = AsyncServiceClient(TTS_URL, name="tts",
+                         timeout=(3.05, float(os.environ.get("TTS_TIMEOUT", "30"))),
+                         pool_size=int(os.environ.get("TTS_POOL_SIZE", "100")),
+                         pool_timeout=POOL_TIMEOUT)
 
-        ollama_response = requests.get(f"{OLLAMA_URL}/health", timeout=5)
-        ollama_healthy = ollama_response.status_code == 200
+# Per-request scratch files; answers kept for /play_response expire after the TTL
+SCRATCH_DIR = os.environ.get("SCRATCH_DIR", os.path.join(tempfile.gettempdir(), "orchestrator"))
+SCRATCH_TTL_SECONDS = int(os.environ.get("SCRATCH_TTL_SECONDS", "3600"))
+scratch = ScratchSpace(SCRATCH_DIR, ttl=SCRATCH_TTL_SECONDS)
 
-        tts_response = requests.get(f"{TTS_URL}/health", timeout=5)
-        tts_healthy = tts_response.status_code == 200
+# Streamed uploads are passed on to the transcriber in pieces of at least
+# this many bytes (16000 is half a second of 16 kHz PCM)
+UPLOAD_FORWARD_BYTES = int(os.environ.get("UPLOAD_FORWARD_BYTES", "16000"))
 
-        return jsonify({
-            "status": "healthy" if all([transcriber_healthy, ollama_healthy, tts_healthy]) else "degraded",
-            "transcriber_connection": transcriber_healthy,
-            "ollama_connection": ollama_healthy,
-            "tts_connection": tts_healthy,
-            "transcriber_status": transcriber_response.json() if transcriber_healthy else None,
-            "ollama_status": ollama_response.json() if ollama_healthy else None
-        }), 200
+# Audio to the transcriber and from TTS as framed PCM ("pcm") or Opus
+# ("opus", needs opuslib on both ends); empty sends bare s16le
+AUDIO_FRAMES = os.environ.get("AUDIO_FRAMES", "")
+
+# Start the LLM on the partial transcript of a streamed upload once it has
+# stayed the same for SPECULATE_AFTER_FEEDS pieces; the answer is kept if
+# the final transcript has the same words, otherwise it starts over
+SPECULATIVE_LLM = os.environ.get("SPECULATIVE_LLM", "0") == "1"
+SPECULATE_AFTER_FEEDS = int(os.environ.get("SPECULATE_AFTER_FEEDS", "3"))
+
+SYSTEM_PROMPT = "You are a helpful voice assistant. Keep responses concise and conversational."
+
+# Served on /metrics for Prometheus to scrape
+registry = Registry()
+request_seconds = registry.histogram(
+    "http_request_duration_seconds", "Time until the response headers were sent",
+    ("method", "endpoint", "status"))
+stage_seconds = registry.histogram(
+    "stage_duration_seconds", "Time spent in each stage of a voice turn", ("stage",))
+
+@app.before_request
+async def start_request():
+    g.request_id = request_id(request.headers.get(REQUEST_ID_HEADER))
+    g.started = time.perf_counter()
+
+@app.after_request
+async def finish_request(response):
+    endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+    request_seconds.observe(time.perf_counter() - g.started, method=request.method,
+                            endpoint=endpoint, status=response.status_code)
+    response.headers[REQUEST_ID_HEADER] = g.request_id
+    return response
+
+def traced(headers=None):
+    """Headers for a downstream call, carrying this request's ID."""
+    return {**(headers or {}), REQUEST_ID_HEADER: g.request_id}
+
+async def probe(service):
+    """Return (healthy, status JSON) for one downstream service."""
+    try:
+        # Not retried: a hung service would hold /health up three times over
+        response = await service.get("/health", timeout=5, retries=0)
     except Exception as e:
-        return jsonify({"status": "unhealthy", "error": str(e)}), 500
+        logger.warning(f"Health check of {service.name} failed: {e}")
+        return False, None
+    if response.status_code != 200:
+        return False, None
+    return True, response.json()
+
+@app.route('/metrics', methods=['GET'])
+async def prometheus_metrics():
+    return registry.render(), 200, {"Content-Type": CONTENT_TYPE}
+
+@app.route('/health', methods=['GET'])
+async def health_check():
+    # Probe all services at once so the check takes as long as the slowest one
+    (transcriber_healthy, transcriber_status), (ollama_healthy, ollama_status), (tts_healthy, _) = \
+        await asyncio.gather(probe(transcriber), probe(ollama), probe(tts))
+
+    return jsonify({
+        "status": "healthy" if all([transcriber_healthy, ollama_healthy, tts_healthy]) else "degraded",
+        "transcriber_connection": transcriber_healthy,
+        "ollama_connection": ollama_healthy,
+        "tts_connection": tts_healthy,
+        "transcriber_status": transcriber_status,
+        "ollama_status": ollama_status
+    }), 200
+
+async def conversation_id():
+    """Session ID sent by the client, or a new one to continue with."""
+    form = await request.form
+    return request.headers.get("X-Session-ID") or form.get("session_id") or uuid.uuid4().hex
+
+def frame_encoder(rate=audio.TARGET_RATE, channels=1):
+    """Encoder for audio sent to the transcriber, or None to send bare PCM."""
+    if not AUDIO_FRAMES:
+        return None
+    return audio_frames.FrameEncoder(rate, channels, codec=AUDIO_FRAMES)
+
+async def transcribe_upload(audio_file, timer):
+    """Normalize an uploaded file and transcribe it; returns the response."""
+    with timer.stage("conversion"):
+        # Conversion is CPU-bound, keep it off the event loop
+        pcm = await asyncio.to_thread(audio.to_pcm16k, audio_file.read())
+        content_type = f"audio/L16; rate={audio.TARGET_RATE}"
+        encoder = frame_encoder()
+        if encoder is not None:
+            pcm = await asyncio.to_thread(encoder.encode, pcm, True)
+            content_type = audio_frames.CONTENT_TYPE
+    with timer.stage("transcription"):
+        # Raw PCM goes straight into Whisper, no multipart parsing or decoding
+        return await transcriber.post(
+            "/transcribe",
+            content=pcm,
+            headers=traced({"Content-Type": content_type})
+        )
+
+async def transcribe_streamed_upload(timer, on_partial=None):
+    """Transcribe a raw PCM body while it is still being uploaded.
+
+    Pieces of the body are fed to a streaming transcription session as
+    they arrive, so by the time the client stops sending most of the audio
+    has been transcribed already. ``on_partial`` is called with the
+    transcript so far after every piece. Returns the transcriber's final
+    response.
+    """
+    headers = traced({"Content-Type": request.headers["Content-Type"]})
+    params = request.mimetype_params
+    encoder = frame_encoder(int(params.get("rate", audio.TARGET_RATE)), int(params.get("channels", 1)))
+    if encoder is not None:
+        headers["Content-Type"] = audio_frames.CONTENT_TYPE
+    created = await transcriber.post("/transcribe/stream", headers=traced())
+    if created.status_code != 201:
+        return created
+    feed_path = f"/transcribe/stream/{created.json()['session_id']}"
 
-def convert_to_pcm_mono_16k(input_path, output_path):
-    """Convert audio to 16-bit PCM, mono, 16kHz using ffmpeg."""
-    ffmpeg.input(input_path).output(
-        output_path,
-        acodec='pcm_s16le',
-        ar='16000',
-        ac=1
-    ).overwrite_output().run(quiet=True)
+    pending = bytearray()
+    with timer.stage("upload"):
+        async for data in request.body:
+            pending += data
+            if len(pending) >= UPLOAD_FORWARD_BYTES:
+                if encoder is not None:
+                    # The encoder holds back what doesn't fill a frame
+                    piece = encoder.encode(bytes(pending))
+                    pending.clear()
+                else:
+                    # Whole samples only; an odd trailing byte waits for the next piece
+                    usable = len(pending) - len(pending) % 2
+                    piece = bytes(pending[:usable])
+                    del pending[:usable]
+                fed = await transcriber.post(feed_path, content=piece, headers=headers)
+                if fed.status_code != 200:
+                    return fed
+                if on_partial is not None:
+                    on_partial(fed.json().get("text", ""))
+    # Only what was left after the user stopped talking is on the clock here
+    with timer.stage("transcription"):
+        rest = bytes(pending)
+        if encoder is not None:
+            rest = encoder.encode(rest, final=True)
+        return await transcriber.post(feed_path, params={"final": "1"}, content=rest, headers=headers)
 
 @app.route('/process_audio', methods=['POST'])
-def process_audio():
+async def process_audio():
     """Process audio file: transcribe, generate response, and synthesize speech"""
-    if 'file' not in request.files:
+    timer = StageTimer(stage_seconds)
+    with timer.stage("upload"):
+        files = await request.files
+    if 'file' not in files:
         return jsonify({"error": "No file provided"}), 400
 
-    audio_file = request.files['file']
-    temp_dir = tempfile.gettempdir()
-    input_path = os.path.join(temp_dir, "input.wav")
-    converted_path = os.path.join(temp_dir, "converted_input.wav")
-    audio_file.save(input_path)
+    session_id = await conversation_id()
 
     try:
-        # Convert uploaded audio to PCM 16-bit mono 16kHz
-        convert_to_pcm_mono_16k(input_path, converted_path)
-
-        # Step 1: Send to transcriber
-        with open(converted_path, 'rb') as f:
-            transcribe_response = requests.post(
-                f"{TRANSCRIBER_URL}/transcribe", 
-                files={"file": f}
-            )
+        # Step 1: Convert to PCM 16-bit mono 16kHz and send to transcriber
+        transcribe_response = await transcribe_upload(files['file'], timer)
 
         if transcribe_response.status_code != 200:
             return jsonify({"error": "Transcription failed", "details": transcribe_response.text}), 500
@@ -73,69 +226,265 @@ def process_audio():
         transcript = transcribe_response.json().get("text", "")
 
         # Step 2: Generate AI response
-        ollama_response = requests.post(
-            f"{OLLAMA_URL}/generate",
-            json={
-                "prompt": transcript,
-                "system_prompt": "You are a helpful voice assistant. Keep responses concise and conversational."
-            }
-        )
+        with timer.stage("llm"):
+            ollama_response = await ollama.post(
+                "/generate",
+                json={
+                    "prompt": transcript,
+                    "system_prompt": SYSTEM_PROMPT,
+                    "session_id": session_id
+                },
+                headers=traced()
+            )
 
+        if ollama_response.status_code in (429, 503):
+            # The LLM is overloaded; let the caller back off and retry
+            return jsonify({"error": "AI service busy", "details": ollama_response.text}), \
+                ollama_response.status_code, {"Retry-After": ollama_response.headers.get("Retry-After", "1")}
         if ollama_response.status_code != 200:
             return jsonify({"error": "AI response generation failed", "details": ollama_response.text}), 500
 
-        ai_response = ollama_response.json().get("response", "I'm sorry, I couldn't process that.")
-
-        # Step 3: TTS synthesis
-        tts_response = requests.post(
-            f"{TTS_URL}/synthesize",
-            json={"text": ai_response}
-        )
-
-        if tts_response.status_code != 200:
-            return jsonify({"error": "Speech synthesis failed", "details": tts_response.text}), 500
-
-
-# Get audio file name from TTS service
-        audio_file_name = tts_response.json().get("audio_file")
+        generated = ollama_response.json()
+        ai_response = generated.get("response", "I'm sorry, I couldn't process that.")
+        # The wrapper's own measurements of the LLM part
+        timer.record("llm_queue", generated.get("queue_ms", 0) / 1000)
+        timer.record("llm_ttft", generated.get("ttft_ms", 0) / 1000)
 
-# Download the audio from TTS
-        tts_audio_response = requests.get(f"{TTS_URL}/audio/{audio_file_name}", stream=True)
-        raw_tts_path = os.path.join(temp_dir, f"raw_tts_{uuid.uuid4()}.wav")
+        # Step 3: TTS synthesis, streamed sentence by sentence straight to disk
+        converted_tts_path = scratch.unique_path("converted_tts_")
+        tts_request = {"text": ai_response}
+        tts_headers = traced()
+        if AUDIO_FRAMES:
+            tts_request["codec"] = AUDIO_FRAMES
+            tts_headers["Accept"] = audio_frames.CONTENT_TYPE
+        with timer.stage("tts"):
+            async with tts.stream("POST", "/synthesize/stream", json=tts_request,
+                                  headers=tts_headers) as tts_response:
+                if tts_response.status_code != 200:
+                    await tts_response.aread()
+                    return jsonify({"error": "Speech synthesis failed", "details": tts_response.text}), 500
 
-        with open(raw_tts_path, "wb") as f:
-            f.write(tts_audio_response.content)
-
-        # Convert it to PCM 16-bit mono 16kHz
-        converted_tts_path = os.path.join(temp_dir, f"converted_tts_{uuid.uuid4()}.wav")
-        convert_to_pcm_mono_16k(raw_tts_path, converted_tts_path)
+                decoder = None
+                if tts_response.headers.get("Content-Type", "").startswith(audio_frames.CONTENT_TYPE):
+                    decoder = audio_frames.FrameDecoder()
+                try:
+                    with open(converted_tts_path, "wb") as f:
+                        f.write(wav_stream_header())
+                        data_size = 0
+                        async for chunk in tts_response.aiter_bytes():
+                            if decoder is not None:
+                                chunk = b"".join(decoder.decode(frame) for frame in decoder.feed(chunk))
+                            f.write(chunk)
+                            data_size += len(chunk)
+                        if decoder is not None:
+                            decoder.finish()
+                        # Now that the length is known, make it a regular WAV file
+                        f.seek(0)
+                        f.write(wav_stream_header(data_size=data_size))
+                except (httpx.HTTPError, audio_frames.FrameError) as e:
+                    # TTS drops the connection when a sentence fails; don't
+                    # hand out an answer that stops short
+                    os.remove(converted_tts_path)
+                    return jsonify({"error": "Speech synthesis failed", "details": str(e)}), 500
 
+        timer.record("total", timer.elapsed())
+        logger.info(f"[{g.request_id}] process_audio timings (ms): {timer.timings}")
         return jsonify({
             "success": True,
+            "session_id": session_id,
             "transcript": transcript,
             "response_text": ai_response,
             "audio_file": os.path.basename(converted_tts_path),
-            "audio_url": f"/play_response/{os.path.basename(converted_tts_path)}"
+            "audio_url": f"/play_response/{os.path.basename(converted_tts_path)}",
+            "timings": timer.timings
         })
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
-    finally:
-        # Optional cleanup
-        if os.path.exists(input_path): os.remove(input_path)
-        if os.path.exists(converted_path): os.remove(converted_path)
 
-@app.route('/play_response/<filename>', methods=['GET'])
-def play_response(filename):
-    try:
-        response = requests.get(f"{TTS_URL}/audio/{filename}", stream=True)
-        return send_file(
-            response.raw,
-            mimetype=response.headers.get('content-type', 'audio/wav'),
-            as_attachment=False
+@app.route('/process_audio/stream', methods=['POST'])
+async def process_audio_stream():
+    """Process audio like /process_audio, but stream the spoken answer back.
+
+    LLM tokens are cut into sentences as they arrive and each sentence is
+    synthesized while the LLM keeps generating, so playback can start long
+    before the full answer exists. The body is a 16 kHz mono WAV stream.
+
+    Besides a multipart upload, the request body may be raw 16 kHz mono
+    PCM (``audio/L16; rate=16000``) sent with chunked encoding while the
+    user is still speaking; it is transcribed as it arrives. With
+    SPECULATIVE_LLM the answer may be started on a partial transcript; the
+    X-Speculation header says whether it was kept ("hit") or not ("miss").
+    """
+    timer = StageTimer(stage_seconds)
+    if request.mimetype == "audio/l16":
+        session_id = request.headers.get("X-Session-ID") or uuid.uuid4().hex
+        upload = None
+    else:
+        with timer.stage("upload"):
+            files = await request.files
+        if 'file' not in files:
+            return jsonify({"error": "No file provided"}), 400
+        session_id = await conversation_id()
+        upload = files['file']
+
+    speculator = None
+    if upload is None and SPECULATIVE_LLM:
+        speculator = Speculator(
+            lambda text, generation_id: llm_tokens(text, session_id, traced(),
+                                                   generation_id=generation_id, speculative=True),
+            lambda generation_id: ollama.request("DELETE", f"/generate/{generation_id}", headers=traced()),
+            stable_after=SPECULATE_AFTER_FEEDS
         )
+    speculation = None
+    headers = {"X-Session-ID": session_id}
+
+    try:
+        if upload is None:
+            transcribe_response = await transcribe_streamed_upload(
+                timer, speculator.observe if speculator else None)
+        else:
+            transcribe_response = await transcribe_upload(upload, timer)
+
+        if transcribe_response.status_code != 200:
+            return jsonify({"error": "Transcription failed", "details": transcribe_response.text}), 500
+
+        transcript = transcribe_response.json().get("text", "")
+
+        if speculator is not None:
+            speculation = speculator.resolve(transcript)
+            headers["X-Speculation"] = "hit" if speculation else "miss"
+            logger.info(f"[{g.request_id}] Speculative answers started: {speculator.started}, "
+                        f"kept: {speculation is not None}")
+            if speculation is not None:
+                timer.record("speculation_lead", speculation.elapsed())
+                # Only now may the answer continue the conversation
+                committed = await ollama.post(f"/generate/{speculation.generation_id}/commit", headers=traced())
+                if committed.status_code != 200:
+                    logger.warning(f"Committing the speculative answer failed: {committed.text}")
+
     except Exception as e:
-        return jsonify({"error": str(e)}), 404
+        return jsonify({"error": str(e)}), 500
+    finally:
+        if speculator is not None:
+            speculator.discard()
+
+    return Response(
+        stream_spoken_response(transcript, session_id, timer, traced(), speculation),
+        mimetype="audio/wav",
+        headers={"X-Transcript": quote(transcript), **headers}
+    )
+
+async def llm_tokens(transcript, session_id=None, headers=None, **options):
+    """Stream the tokens of the answer to ``transcript`` from the Ollama wrapper.
+
+    ``options`` go into the request, e.g. ``generation_id`` and ``speculative``.
+    """
+    async with ollama.stream(
+        "POST",
+        "/generate",
+        json={
+            "prompt": transcript,
+            "system_prompt": SYSTEM_PROMPT,
+            "session_id": session_id,
+            "stream": True,
+            **options
+        },
+        headers=headers,
+        timeout=(5, None)
+    ) as ollama_response:
+        ollama_response.raise_for_status()
+        async for token in aiter_ollama_tokens(ollama_response):
+            yield token
+
+async def stream_spoken_response(transcript, session_id=None, timer=None, headers=None, speculation=None):
+    """Yield a WAV header followed by PCM audio, one sentence at a time.
+
+    Time to the first token, synthesis, time to the first audio and the
+    whole answer are recorded on ``timer``; ``headers`` go with every
+    downstream call. The answer is taken from ``speculation`` if given.
+    If the answer or a sentence's speech fails, the error is raised once
+    the audio before it has been yielded.
+    """
+    timer = timer or StageTimer(stage_seconds)
+    sentences = asyncio.Queue()
+    stopped = asyncio.Event()
+
+    async def produce_sentences():
+        # Runs as its own task so the LLM keeps generating while TTS works
+        asked = time.perf_counter()
+        if speculation is not None:
+            tokens = speculation.tokens()
+        else:
+            tokens = llm_tokens(transcript, session_id, headers)
+        try:
+            splitter = SentenceSplitter()
+            async for token in tokens:
+                if stopped.is_set():
+                    return
+                if asked is not None:
+                    timer.record("llm_ttft", time.perf_counter() - asked)
+                    asked = None
+                for sentence in splitter.feed(token):
+                    sentences.put_nowait(sentence)
+            for sentence in splitter.flush():
+                sentences.put_nowait(sentence)
+        except Exception as e:
+            logger.error(f"AI response streaming failed: {e}")
+            sentences.put_nowait(e)
+        finally:
+            sentences.put_nowait(None)
+            # Closes the LLM stream at once when we stopped early
+            await tokens.aclose()
+
+    producer = asyncio.create_task(produce_sentences())
+    streaming = time.perf_counter()
+    first_audio = True
+    try:
+        yield wav_stream_header()
+        while True:
+            sentence = await sentences.get()
+            if sentence is None:
+                break
+            # Headers are already sent: raising drops the connection before
+            # the final chunk, so the client sees an error rather than an
+            # answer with a sentence missing
+            if isinstance(sentence, Exception):
+                raise sentence
+
+            with timer.stage("tts"):
+                tts_response = await tts.post("/synthesize", json={"text": sentence}, headers=headers)
+            if tts_response.status_code != 200:
+                logger.error(f"Speech synthesis failed for sentence: {tts_response.text}")
+                raise RuntimeError(f"Speech synthesis failed: {tts_response.text}")
+
+            pcm = await asyncio.to_thread(audio.to_pcm16k, tts_response.content)
+            if first_audio:
+                timer.record("first_audio", timer.elapsed())
+                first_audio = False
+            yield pcm
+    finally:
+        # Client went away or we're done: stop generating. The flag catches
+        # a cancellation that lands while httpx is still sending the request,
+        # which it can swallow
+        stopped.set()
+        producer.cancel()
+        if speculation is not None:
+            speculation.stop()
+        timer.record("download", time.perf_counter() - streaming)
+        timer.record("total", timer.elapsed())
+        request_id = (headers or {}).get(REQUEST_ID_HEADER, "-")
+        logger.info(f"[{request_id}] process_audio/stream timings (ms): {timer.timings}")
+
+@app.route('/play_response/<filename>', methods=['GET'])
+async def play_response(filename):
+    # Answers converted by /process_audio are held locally until they expire.
+    # Range and If-None-Match requests let players seek and replay without
+    # downloading the whole answer again
+    local_path = os.path.join(scratch.root, os.path.basename(filename))
+    if not filename.startswith("converted_tts_") or not os.path.isfile(local_path):
+        return jsonify({"error": "Audio not found or expired"}), 404
+    return await send_file(local_path, mimetype="audio/wav", conditional=True)
 
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=8000)
@@ -0,0 +1,107 @@
+import io
+import subprocess
+import wave
+
+import numpy as np
+
+# Format every service speaks internally: 16-bit PCM, mono, 16 kHz
+TARGET_RATE = 16000
+
+
+def to_pcm16k(data):
+    """Normalize an audio file held in memory to raw 16 kHz mono s16le PCM.
+
+    PCM WAV input is decoded, downmixed and resampled with NumPy; if it is
+    already in the target format the frames are returned untouched.
+    Anything else (MP3, Ogg, float WAV, ...) is piped through ffmpeg.
+    """
+    if data[:4] == b"RIFF" and data[8:12] == b"WAVE":
+        try:
+            return _wav_to_pcm16k(data)
+        except (wave.Error, EOFError, ValueError):
+            pass
+    return ffmpeg_to_pcm16k(data)
+
+
+def to_wav16k(data):
+    """Like :func:`to_pcm16k`, but wrapped in a WAV container."""
+    return pcm_to_wav(to_pcm16k(data))
+
+
+def pcm_to_wav(pcm, sample_rate=TARGET_RATE):
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(sample_rate)
+        wf.writeframes(pcm)
+    return buffer.getvalue()
+
+
+def _wav_to_pcm16k(data):
+    with wave.open(io.BytesIO(data), 'rb') as wf:
+        channels = wf.getnchannels()
+        width = wf.getsampwidth()
+        rate = wf.getframerate()
+        frames = wf.readframes(wf.getnframes())
+
+    # Fast path: nothing to do but drop the header
+    if channels == 1 and width == 2 and rate == TARGET_RATE:
+        return frames
+
+    samples = _decode_samples(frames, width).reshape(-1, channels).mean(axis=1)
+    samples = resample(samples, rate, TARGET_RATE)
+    return np.clip(samples * 32768.0, -32768, 32767).astype('<i2').tobytes()
+
+
+def _decode_samples(frames, width):
+    """Decode little-endian PCM frames to float32 in [-1, 1)."""
+    if width == 1:
+        return (np.frombuffer(frames, dtype=np.uint8).astype(np.float32) - 128) / 128
+    if width == 2:
+        return np.frombuffer(frames, dtype='<i2').astype(np.float32) / 32768
+    if width == 3:
+        raw = np.frombuffer(frames, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        values = raw[:, 0] | (raw[:, 1] << 8) | (raw[:, 2] << 16)
+        values = np.where(values >= 1 << 23, values - (1 << 24), values)
+        return values.astype(np.float32) / (1 << 23)
+    if width == 4:
+        return np.frombuffer(frames, dtype='<i4').astype(np.float32) / (1 << 31)
+    raise ValueError(f"Unsupported sample width: {width}")
+
+
+def resample(samples, src_rate, dst_rate, taps=63):
+    """Resample a mono float signal by linear interpolation.
+
+    When downsampling, a windowed-sinc low-pass filter runs first so that
+    content above the new Nyquist frequency doesn't alias into speech.
+    """
+    if src_rate == dst_rate or len(samples) == 0:
+        return samples
+
+    ratio = dst_rate / src_rate
+    if ratio < 1:
+        n = np.arange(taps) - (taps - 1) / 2
+        kernel = ratio * np.sinc(ratio * n) * np.hamming(taps)
+        samples = np.convolve(samples, kernel / kernel.sum(), mode='same')
+
+    length = int(round(len(samples) * ratio))
+    positions = np.arange(length) / ratio
+    return np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+
+
+def ffmpeg_to_pcm16k(data):
+    """Decode any format ffmpeg understands, entirely through pipes."""
+    result = subprocess.run(
+        [
+            "ffmpeg", "-loglevel", "error",
+            "-i", "pipe:0",
+            "-f", "s16le", "-acodec", "pcm_s16le",
+            "-ar", str(TARGET_RATE), "-ac", "1",
+            "pipe:1",
+        ],
+        input=data,
+        capture_output=True,
+        check=True,
+    )
+    return result.stdout
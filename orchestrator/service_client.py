@@ -0,0 +1,176 @@
+import asyncio
+import contextlib
+import threading
+import time
+
+import httpx
+
+# Statuses worth retrying for idempotent requests
+RETRY_STATUSES = (502, 503, 504)
+IDEMPOTENT_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+class CircuitOpenError(httpx.TransportError):
+    """Raised instead of calling a service that has been failing."""
+
+
+class CircuitBreaker:
+    """Stop calling a service after repeated failures, then probe it again.
+
+    After ``failure_threshold`` consecutive failures the circuit opens and
+    calls fail fast for ``reset_timeout`` seconds. The first call after that
+    is let through as a probe: success closes the circuit, failure opens it
+    for another ``reset_timeout``.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self):
+        return self.opened_at is not None and time.monotonic() - self.opened_at < self.reset_timeout
+
+    def allow(self):
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at >= self.reset_timeout:
+                # Half-open: let one probe through, keep the rest failing fast
+                self.opened_at = time.monotonic()
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+def _timeout(value, pool=None):
+    """Accept the requests-style ``(connect, read)`` tuple or a single number.
+
+    ``pool`` bounds the wait for a free pooled connection on its own, so it
+    holds even when the read timeout is unlimited.
+    """
+    if isinstance(value, tuple):
+        connect, read = value
+        return httpx.Timeout(read, connect=connect, pool=pool)
+    return httpx.Timeout(value, pool=pool)
+
+
+class AsyncServiceClient:
+    """Non-blocking keep-alive HTTP client for one downstream service.
+
+    The asyncio counterpart of the other services' ``ServiceClient``: pooled
+    connections, a default timeout per service, bounded retries with
+    exponential backoff (POSTs only when the connection couldn't be made)
+    and a circuit breaker. At most ``pool_size`` requests are in flight at
+    once; the next waits up to ``pool_timeout`` seconds for a connection and
+    then fails with ``httpx.PoolTimeout``, which isn't held against the
+    service.
+    """
+
+    def __init__(self, base_url, name=None, timeout=(3.05, 30), retries=2,
+                 backoff_factor=0.2, pool_size=100, pool_timeout=10, failure_threshold=5,
+                 reset_timeout=30):
+        self.base_url = base_url.rstrip("/")
+        self.name = name or self.base_url
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.pool_size = pool_size
+        self.pool_timeout = pool_timeout
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self._client = None
+        self._loop = None
+
+    @property
+    def client(self):
+        # Pooled connections belong to the event loop that opened them
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            self._client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=self.pool_size,
+                                    max_keepalive_connections=self.pool_size),
+            )
+            self._loop = loop
+        return self._client
+
+    def _check_circuit(self):
+        if not self.breaker.allow():
+            raise CircuitOpenError(f"{self.name} is unavailable (circuit open)")
+
+    def _record(self, status_code):
+        if status_code >= 500:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+
+    async def request(self, method, path, timeout=None, retries=None, **kwargs):
+        """Send a request; ``retries`` overrides the client's for this call."""
+        self._check_circuit()
+        timeout = _timeout(timeout or self.timeout, self.pool_timeout)
+        idempotent = method.upper() in IDEMPOTENT_METHODS
+        retries = self.retries if retries is None else retries
+
+        for attempt in range(retries + 1):
+            last_attempt = attempt == retries
+            try:
+                response = await self.client.request(
+                    method, f"{self.base_url}{path}", timeout=timeout, **kwargs)
+            except httpx.PoolTimeout:
+                # Our own pool is exhausted; the service may be fine
+                raise
+            except httpx.TransportError as e:
+                retryable = idempotent or isinstance(e, httpx.ConnectError)
+                if last_attempt or not retryable:
+                    self.breaker.record_failure()
+                    raise
+            else:
+                if last_attempt or not idempotent or response.status_code not in RETRY_STATUSES:
+                    self._record(response.status_code)
+                    return response
+                await response.aclose()
+            await asyncio.sleep(self.backoff_factor * (2 ** attempt))
+
+    async def get(self, path, **kwargs):
+        return await self.request("GET", path, **kwargs)
+
+    async def post(self, path, **kwargs):
+        return await self.request("POST", path, **kwargs)
+
+    @contextlib.asynccontextmanager
+    async def stream(self, method, path, timeout=None, **kwargs):
+        """Open a streamed response; it isn't retried once bytes may have flowed."""
+        self._check_circuit()
+        request = self.client.build_request(
+            method, f"{self.base_url}{path}", timeout=_timeout(timeout or self.timeout, self.pool_timeout),
+            **kwargs)
+        try:
+            response = await self.client.send(request, stream=True)
+        except httpx.PoolTimeout:
+            raise
+        except httpx.TransportError:
+            self.breaker.record_failure()
+            raise
+
+        self._record(response.status_code)
+        try:
+            yield response
+        finally:
+            await response.aclose()
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
@@ -0,0 +1,128 @@
+import asyncio
+import logging
+import re
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+_WORDS = re.compile(r"[\w']+")
+
+# Fire-and-forget cancellations, referenced until they're done
+_background = set()
+
+
+def normalize_transcript(text):
+    """The words of a transcript, lowercased, without punctuation or extra spaces."""
+    return " ".join(_WORDS.findall(text.lower()))
+
+
+def _in_background(coroutine):
+    task = asyncio.ensure_future(coroutine)
+    _background.add(task)
+    task.add_done_callback(_background.discard)
+
+
+class Speculation:
+    """An answer started on a partial transcript, buffered as it arrives.
+
+    ``start(transcript, generation_id)`` returns an async generator of the
+    answer's tokens; ``cancel(generation_id)`` is awaited to tell the LLM
+    service to stop once the answer isn't wanted.
+    """
+
+    def __init__(self, transcript, start, cancel):
+        self.transcript = transcript
+        self.key = normalize_transcript(transcript)
+        self.generation_id = uuid.uuid4().hex
+        self.started = time.perf_counter()
+        self.received = 0
+        self.failed = False
+        self._cancel = cancel
+        self._stopped = False
+        self._tokens = asyncio.Queue()
+        self._task = asyncio.ensure_future(self._buffer(start(transcript, self.generation_id)))
+
+    async def _buffer(self, tokens):
+        try:
+            async for token in tokens:
+                # httpx can swallow a cancellation that lands while it sends
+                if self._stopped:
+                    return
+                self.received += 1
+                self._tokens.put_nowait(token)
+        except Exception as e:
+            self.failed = True
+            self._tokens.put_nowait(e)
+        finally:
+            await tokens.aclose()
+            self._tokens.put_nowait(None)
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    async def tokens(self):
+        """The answer's tokens: those buffered so far, then the rest as they come."""
+        while True:
+            token = await self._tokens.get()
+            if token is None:
+                return
+            if isinstance(token, Exception):
+                raise token
+            yield token
+
+    def stop(self):
+        """Drop the answer unless it's complete already."""
+        if self._task.done():
+            return
+        self._stopped = True
+        self._task.cancel()
+        _in_background(self._cancel(self.generation_id))
+
+
+class Speculator:
+    """Start answering while the user is still finishing their sentence.
+
+    ``observe`` gets the interim transcript after every piece of streamed
+    audio. Once it has come back the same ``stable_after`` times in a row
+    (ignoring case and punctuation) a ``Speculation`` is started on it, and
+    dropped again if the transcript moves on. ``resolve`` with the final
+    transcript hands over the speculation if it answers the same words.
+    """
+
+    def __init__(self, start, cancel, stable_after=3):
+        self.start = start
+        self.cancel = cancel
+        self.stable_after = stable_after
+        self.current = None
+        self.started = 0
+        self._last = None
+        self._seen = 0
+
+    def observe(self, transcript):
+        key = normalize_transcript(transcript)
+        if key != self._last:
+            self._last, self._seen = key, 0
+        self._seen += 1
+        if self.current is not None and self.current.key != key:
+            self.discard()
+        if key and self.current is None and self._seen >= self.stable_after:
+            self.current = Speculation(transcript, self.start, self.cancel)
+            self.started += 1
+
+    def resolve(self, transcript):
+        """The speculation answering ``transcript``, or None to start afresh."""
+        speculation, self.current = self.current, None
+        if speculation is None:
+            return None
+        if speculation.key == normalize_transcript(transcript) and not (
+                speculation.failed and not speculation.received):
+            return speculation
+        speculation.stop()
+        return None
+
+    def discard(self):
+        if self.current is not None:
+            logger.info(f"Speculative answer to {self.current.transcript!r} discarded")
+            self.current.stop()
+            self.current = None
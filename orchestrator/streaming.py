@@ -0,0 +1,67 @@
+import json
+import re
+import struct
+
+# Sentence end: terminal punctuation followed by whitespace
+SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+
+
+class SentenceSplitter:
+    """Accumulate LLM tokens and cut them into speakable sentences."""
+
+    def __init__(self, min_chars=20):
+        # Very short fragments ("Hi.", "Ok!") are merged with the next sentence
+        # so TTS isn't called for every interjection
+        self.min_chars = min_chars
+        self.buffer = ""
+
+    def feed(self, token):
+        """Add a token and return any sentences that are now complete."""
+        self.buffer += token
+        parts = SENTENCE_END.split(self.buffer)
+        self.buffer = parts.pop()
+
+        sentences = []
+        pending = ""
+        for part in parts:
+            pending = f"{pending} {part}".strip()
+            if len(pending) >= self.min_chars:
+                sentences.append(pending)
+                pending = ""
+        if pending:
+            self.buffer = f"{pending} {self.buffer}"
+        return sentences
+
+    def flush(self):
+        """Return whatever is left once the LLM has finished."""
+        rest = self.buffer.strip()
+        self.buffer = ""
+        return [rest] if rest else []
+
+
+async def aiter_ollama_tokens(response):
+    """Yield response tokens from an NDJSON stream of the Ollama wrapper."""
+    async for line in response.aiter_lines():
+        if not line:
+            continue
+        chunk = json.loads(line)
+        if chunk.get("error"):
+            raise RuntimeError(chunk["error"])
+        if chunk.get("response"):
+            yield chunk["response"]
+        if chunk.get("done"):
+            break
+
+
+def wav_stream_header(sample_rate=16000, channels=1, sample_width=2, data_size=None):
+    """WAV header, by default for a stream whose length isn't known up front."""
+    # Unknown sizes are set to the maximum, which players treat as "read until EOF"
+    if data_size is None:
+        data_size = 0xFFFFFFFF - 36
+    byte_rate = sample_rate * channels * sample_width
+    return b"".join([
+        b"RIFF", struct.pack("<I", data_size + 36), b"WAVE",
+        b"fmt ", struct.pack("<IHHIIHH", 16, 1, channels, sample_rate,
+                             byte_rate, channels * sample_width, sample_width * 8),
+        b"data", struct.pack("<I", data_size),
+    ])
@@ -0,0 +1,54 @@
+import os
+import threading
+import time
+import uuid
+
+# Everything the scratch space creates starts with one of these prefixes, so
+# garbage collection never touches files it doesn't own
+MANAGED_PREFIXES = ("converted_tts_",)
+
+
+class ScratchSpace:
+    """Hands out paths for files that outlive their request, and expires them.
+
+    Files such as synthesized answers waiting to be played are removed once
+    they are older than ``ttl`` seconds, by a sweep that runs at most every
+    ``sweep_interval`` seconds when a new path is handed out.
+    """
+
+    def __init__(self, root, ttl=3600, sweep_interval=300):
+        self.root = root
+        self.ttl = ttl
+        self.sweep_interval = sweep_interval
+        self._last_sweep = 0.0
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+
+    def unique_path(self, prefix, suffix=".wav"):
+        """Path for a long-lived file, sweeping stale files first if it's due."""
+        self.maybe_collect()
+        return os.path.join(self.root, f"{prefix}{uuid.uuid4().hex}{suffix}")
+
+    def maybe_collect(self):
+        with self._lock:
+            if time.time() - self._last_sweep < self.sweep_interval:
+                return 0
+            self._last_sweep = time.time()
+        return self.collect_garbage()
+
+    def collect_garbage(self, now=None):
+        """Remove managed files older than the TTL and return how many."""
+        now = now or time.time()
+        removed = 0
+        for entry in os.scandir(self.root):
+            if not entry.name.startswith(MANAGED_PREFIXES):
+                continue
+            try:
+                if now - entry.stat().st_mtime < self.ttl:
+                    continue
+                os.remove(entry.path)
+                removed += 1
+            except FileNotFoundError:
+                # Another worker got there first
+                continue
+        return removed
@@ -0,0 +1,57 @@
+import importlib.util
+import os
+import sys
+from contextlib import contextmanager
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+# Keep services from writing to their container paths while under test
+os.environ.setdefault("TTS_CACHE_DIR", "")
+# ...and from polling Ollama servers that aren't there
+os.environ.setdefault("BACKEND_REFRESH_SECONDS", "0")
+
+_loaded = {}
+
+
+@contextmanager
+def _service_imports(service_dir):
+    """Let a service's modules import their siblings by bare name.
+
+    Every service is its own Docker build context with sibling modules
+    imported by bare name, so those siblings are swapped in and out of
+    ``sys.modules`` to keep services from seeing each other's helpers.
+    """
+    siblings = {path.stem for path in service_dir.glob("*.py")}
+    saved = {mod: sys.modules.pop(mod) for mod in siblings if mod in sys.modules}
+    sys.path.insert(0, str(service_dir))
+    try:
+        yield
+    finally:
+        sys.path.remove(str(service_dir))
+        for mod in siblings:
+            sys.modules.pop(mod, None)
+        sys.modules.update(saved)
+
+
+def _import(name, path):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def load_module(service, name):
+    """Import one helper module (``<service>/<name>.py``) and the siblings it uses."""
+    with _service_imports(ROOT / service):
+        return _import(f"{service.lower()}_{name}", ROOT / service / f"{name}.py")
+
+
+def load_service(name):
+    """Import ``<name>/app.py`` as a standalone module."""
+    if name not in _loaded:
+        with _service_imports(ROOT / name):
+            _loaded[name] = _import(f"{name.lower()}_app", ROOT / name / "app.py")
+    return _loaded[name]
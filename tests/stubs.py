@@ -0,0 +1,339 @@
+"""Lightweight stand-ins for the transcriber, Ollama (wrapper and API) and TTS services.
+
+They only use the standard library so the pipeline can be exercised without
+Whisper, a GPU, gTTS or network access.
+"""
+import asyncio
+import io
+import json
+import socket
+import struct
+import threading
+import time
+import wave
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def silence_wav(seconds, sample_rate=16000):
+    """16-bit mono WAV bytes containing ``seconds`` of silence."""
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(sample_rate)
+        wf.writeframes(b"\x00\x00" * int(seconds * sample_rate))
+    return buffer.getvalue()
+
+
+class StubServer:
+    """Run a request handler on a background thread bound to a free port.
+
+    The X-Request-ID header of every request received is kept in
+    ``request_ids``.
+    """
+
+    def __init__(self, handler):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.server.daemon_threads = True
+        self.server.request_ids = self.request_ids = []
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def parse_request(self):
+        if not super().parse_request():
+            return False
+        self.server.request_ids.append(self.headers.get("X-Request-ID"))
+        return True
+
+    def read_body(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return self.rfile.read(length) if length else b""
+
+    def send_json(self, payload, status=200):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def start_chunked(self, content_type):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+    def send_chunk(self, data):
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def end_chunked(self):
+        self.wfile.write(b"0\r\n\r\n")
+
+    def do_GET(self):
+        if self.path == "/health":
+            self.send_json({"status": "healthy"})
+        else:
+            self.send_json({"error": "not found"}, 404)
+
+
+def transcriber_stub(text="What is on my schedule today?", delay=0.0, partial=None):
+    """Transcriber answering every /transcribe with ``text`` after ``delay``.
+
+    ``text`` may also be a callable receiving the raw request body, which
+    lets tests tie each transcript to the audio that was uploaded.
+    Streaming sessions collect their pieces and answer the final call with
+    ``text`` for all of them, and earlier calls with ``partial`` of the
+    audio so far if given; the returned server's ``feeds`` list records
+    (time, size) of every piece.
+    """
+    streams = {}
+    feeds = []
+
+    class Handler(_Handler):
+        def do_POST(self):
+            body = self.read_body()
+            path, _, query = self.path.partition("?")
+            if path == "/transcribe/stream":
+                session_id = f"stub{len(streams)}"
+                streams[session_id] = bytearray()
+                self.send_json({"session_id": session_id}, 201)
+                return
+            if path.startswith("/transcribe/stream/"):
+                feeds.append((time.monotonic(), len(body)))
+                audio = streams[path.rsplit("/", 1)[1]]
+                audio += body
+                if "final=1" not in query:
+                    interim = partial(bytes(audio)) if partial else ""
+                    self.send_json({"final": False, "text": interim, "segments": [], "partial": interim})
+                    return
+                body = bytes(audio)
+
+            time.sleep(delay)
+            transcript = text(body) if callable(text) else text
+            self.send_json({"text": transcript, "segments": []})
+
+    server = StubServer(Handler)
+    server.feeds = feeds
+    return server
+
+
+def ollama_stub(answer, token_delay=0.01, first_token_delay=0.0):
+    """Ollama wrapper emitting ``answer`` word by word on /generate.
+
+    ``answer`` may be a callable mapping the prompt to the answer. How each
+    streamed answer ended ("completed", "cancelled" by DELETE
+    /generate/<generation_id> or "aborted" when the caller hung up) is
+    recorded in the returned server's ``outcomes`` list. Request bodies go
+    in ``requests``, cancelled and committed generation IDs in
+    ``cancelled`` and ``committed``.
+    """
+    outcomes = []
+    received = []
+    cancelled = []
+    committed = []
+
+    class Handler(_Handler):
+        def do_DELETE(self):
+            cancelled.append(self.path.rsplit("/", 1)[1])
+            self.send_json({"cancelled": True})
+
+        def do_POST(self):
+            request = json.loads(self.read_body() or b"{}")
+            if self.path.endswith("/commit"):
+                committed.append(self.path.split("/")[2])
+                self.send_json({"committed": True})
+                return
+            received.append(request)
+            text = answer(request.get("prompt", "")) if callable(answer) else answer
+            tokens = [word + " " for word in text.split()]
+            if not request.get("stream"):
+                time.sleep(first_token_delay + token_delay * len(tokens))
+                self.send_json({"response": text, "model": "stub", "total_duration": 0})
+                return
+
+            try:
+                self.start_chunked("application/x-ndjson")
+                time.sleep(first_token_delay)
+                for token in tokens:
+                    if request.get("generation_id") in cancelled:
+                        break
+                    time.sleep(token_delay)
+                    self.send_chunk(json.dumps({"response": token, "done": False}).encode() + b"\n")
+                self.send_chunk(json.dumps({"response": "", "done": True}).encode() + b"\n")
+                self.end_chunked()
+            except (BrokenPipeError, ConnectionResetError):
+                outcomes.append("aborted")
+                return
+            outcomes.append("cancelled" if request.get("generation_id") in cancelled else "completed")
+
+    server = StubServer(Handler)
+    server.outcomes = outcomes
+    server.requests = received
+    server.cancelled = cancelled
+    server.committed = committed
+    return server
+
+
+def ollama_api_stub(answer, token_delay=0.0, eval_duration_per_token=0.02, models=("stub:latest",)):
+    """Ollama server answering /api/generate like the real one.
+
+    Lists ``models`` on /api/tags and streams ``answer`` word by word,
+    reporting ``eval_count``, ``eval_duration`` (in nanoseconds) and a
+    ``context`` that grows by one token per word on the final chunk. Request
+    bodies are recorded in the returned server's ``requests`` list and how
+    streams ended in ``outcomes``, as for ``ollama_stub``.
+    """
+    received = []
+    outcomes = []
+
+    class Handler(_Handler):
+        def do_GET(self):
+            if self.path == "/api/tags":
+                self.send_json({"models": [{"name": name} for name in models]})
+            else:
+                super().do_GET()
+
+        def do_POST(self):
+            request = json.loads(self.read_body() or b"{}")
+            received.append(request)
+            tokens = [word + " " for word in answer.split()]
+            context = request.get("context", []) + list(range(len(tokens) + 1))
+            final = {
+                "model": request.get("model"),
+                "done": True,
+                "total_duration": 1_500_000_000,
+                "load_duration": 100_000_000,
+                "prompt_eval_duration": 50_000_000,
+                "eval_count": len(tokens),
+                "eval_duration": int(len(tokens) * eval_duration_per_token * 1e9),
+                "context": context,
+            }
+            if not request.get("stream", True):
+                time.sleep(token_delay * len(tokens))
+                self.send_json({**final, "response": answer})
+                return
+
+            try:
+                self.start_chunked("application/x-ndjson")
+                for token in tokens:
+                    time.sleep(token_delay)
+                    chunk = {"model": request.get("model"), "response": token, "done": False}
+                    self.send_chunk(json.dumps(chunk).encode() + b"\n")
+                self.send_chunk(json.dumps({**final, "response": ""}).encode() + b"\n")
+                self.end_chunked()
+            except (BrokenPipeError, ConnectionResetError):
+                outcomes.append("aborted")
+                return
+            outcomes.append("completed")
+
+    server = StubServer(Handler)
+    server.requests = received
+    server.outcomes = outcomes
+    return server
+
+
+def pcm_frames(pcm, sample_rate=16000, frame_bytes=640):
+    """``pcm`` as uncompressed audio frames (application/x-audio-frames)."""
+    return b"".join(
+        struct.pack("<2sBBIII", b"AF", 0, 1, sample_rate, seq, len(pcm[start:start + frame_bytes]))
+        + pcm[start:start + frame_bytes]
+        for seq, start in enumerate(range(0, len(pcm), frame_bytes)))
+
+
+def tts_stub(delay=0.0, seconds_per_char=0.01, break_stream=False):
+    """TTS service returning silence whose length follows the input text.
+
+    /synthesize/stream sends audio frames to callers that accept them. With
+    ``break_stream`` it drops the connection halfway through the body, as
+    the real service does when a sentence fails, and /synthesize fails
+    every sentence after the first.
+    """
+    synthesized = []
+
+    class Handler(_Handler):
+        def do_POST(self):
+            request = json.loads(self.read_body() or b"{}")
+            time.sleep(delay)
+            if break_stream and self.path == "/synthesize/stream":
+                self.start_chunked("audio/L16; rate=16000")
+                self.send_chunk(b"\x00" * 3200)
+                self.close_connection = True
+                return
+            if break_stream and self.path == "/synthesize" and synthesized:
+                self.send_json({"error": "engine crashed"}, 500)
+                return
+            synthesized.append(request.get("text", ""))
+            body = silence_wav(len(request.get("text", "")) * seconds_per_char)
+            content_type = "audio/wav"
+            if self.path == "/synthesize/stream":
+                body, content_type = body[44:], "audio/L16; rate=16000"
+                if self.headers.get("Accept") == "application/x-audio-frames":
+                    body, content_type = pcm_frames(body), "application/x-audio-frames"
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return StubServer(Handler)
+
+
+class AsgiServer:
+    """Serve an ASGI app (the orchestrator) with hypercorn on a free port."""
+
+    def __init__(self, app):
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            self.port = sock.getsockname()[1]
+        self.url = f"http://127.0.0.1:{self.port}"
+        self.app = app
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.started = threading.Event()
+
+    def _run(self):
+        from hypercorn.asyncio import serve
+        from hypercorn.config import Config
+
+        config = Config()
+        config.bind = [f"127.0.0.1:{self.port}"]
+        config.loglevel = "WARNING"
+        self.loop = asyncio.new_event_loop()
+        self.stop = asyncio.Event()
+
+        async def main():
+            self.started.set()
+            await serve(self.app, config, shutdown_trigger=self.stop.wait)
+
+        self.loop.run_until_complete(main())
+
+    def __enter__(self):
+        self.thread.start()
+        self.started.wait()
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            try:
+                socket.create_connection(("127.0.0.1", self.port), timeout=0.1).close()
+                break
+            except OSError:
+                time.sleep(0.02)
+        return self
+
+    def __exit__(self, *exc):
+        self.loop.call_soon_threadsafe(self.stop.set)
+        self.thread.join(timeout=5)
@@ -0,0 +1,63 @@
+import io
+import wave
+
+import pytest
+
+from conftest import load_module
+
+np = pytest.importorskip("numpy")
+audio = load_module("orchestrator", "audio")
+
+
+def make_wav(samples, rate, channels=1, width=2):
+    """Encode float samples shaped (frames, channels) as a PCM WAV."""
+    scale = {1: 127, 2: 32767, 4: 2147483647}[width]
+    ints = np.round(samples * scale).astype({1: np.int16, 2: "<i2", 4: "<i4"}[width])
+    if width == 1:
+        ints = (ints + 128).astype(np.uint8)
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wf:
+        wf.setnchannels(channels)
+        wf.setsampwidth(width)
+        wf.setframerate(rate)
+        wf.writeframes(ints.tobytes())
+    return buffer.getvalue()
+
+
+def tone(frequency, rate, seconds=1.0):
+    t = np.arange(int(rate * seconds)) / rate
+    return 0.5 * np.sin(2 * np.pi * frequency * t)
+
+
+def dominant_frequency(pcm, rate=16000):
+    samples = np.frombuffer(pcm, dtype="<i2").astype(np.float32)
+    spectrum = np.abs(np.fft.rfft(samples))
+    return np.fft.rfftfreq(len(samples), 1 / rate)[spectrum.argmax()]
+
+
+def test_target_format_passes_through_untouched():
+    wav = make_wav(tone(440, 16000)[:, None], 16000)
+    with wave.open(io.BytesIO(wav)) as wf:
+        frames = wf.readframes(wf.getnframes())
+    assert audio.to_pcm16k(wav) == frames
+
+
+def test_stereo_44k_is_downmixed_and_resampled():
+    stereo = np.stack([tone(440, 44100), tone(440, 44100)], axis=1)
+    pcm = audio.to_pcm16k(make_wav(stereo, 44100, channels=2))
+    assert len(pcm) == 2 * 16000
+    assert abs(dominant_frequency(pcm) - 440) < 2
+
+
+@pytest.mark.parametrize("width", [1, 4])
+def test_other_sample_widths_are_decoded(width):
+    pcm = audio.to_pcm16k(make_wav(tone(1000, 8000)[:, None], 8000, width=width))
+    assert len(pcm) == 2 * 16000
+    assert abs(dominant_frequency(pcm) - 1000) < 2
+
+
+def test_wav_wrapper_round_trips():
+    pcm = audio.to_pcm16k(make_wav(tone(300, 22050)[:, None], 22050))
+    with wave.open(io.BytesIO(audio.pcm_to_wav(pcm))) as wf:
+        assert (wf.getnchannels(), wf.getsampwidth(), wf.getframerate()) == (1, 2, 16000)
+        assert wf.readframes(wf.getnframes()) == pcm
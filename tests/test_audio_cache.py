@@ -0,0 +1,46 @@
+import os
+
+from conftest import load_module
+
+cache = load_module("TTS", "cache")
+
+
+def test_key_ignores_case_and_whitespace_but_not_voice():
+    key = cache.cache_key("Hello  there!", "gtts", "en", None)
+    assert key == cache.cache_key(" hello there! ", "gtts", "en", None)
+    assert key != cache.cache_key("Hello there?", "gtts", "en", None)
+    assert key != cache.cache_key("Hello there!", "gtts", "en", "co.uk")
+    assert key != cache.cache_key("Hello there!", "espeak", "en", None)
+
+
+def test_memory_tier_evicts_least_recently_used():
+    audio_cache = cache.AudioCache(None, memory_bytes=10)
+    audio_cache.put("a", b"aaaa")
+    audio_cache.put("b", b"bbbb")
+    audio_cache.get("a")
+    audio_cache.put("c", b"cccc")
+
+    assert audio_cache.get("b") is None
+    assert audio_cache.get("a") == b"aaaa" and audio_cache.get("c") == b"cccc"
+    assert audio_cache.stats()["memory_bytes"] == 8
+
+
+def test_disk_tier_is_shared_between_instances(tmp_path):
+    cache.AudioCache(str(tmp_path)).put("phrase", b"RIFF...")
+    other_worker = cache.AudioCache(str(tmp_path))
+
+    assert other_worker.get("phrase") == b"RIFF..."
+    assert other_worker.get("phrase") == b"RIFF..."
+    stats = other_worker.stats()
+    assert (stats["hits_disk"], stats["hits_memory"], stats["misses"]) == (1, 1, 0)
+
+
+def test_disk_tier_stays_within_its_size_limit(tmp_path):
+    audio_cache = cache.AudioCache(str(tmp_path), memory_bytes=0, disk_bytes=100)
+    for n in range(10):
+        audio_cache.put(f"key{n}", bytes(30))
+        os.utime(tmp_path / f"key{n}.wav", (n, n))
+
+    files = sorted(os.listdir(tmp_path))
+    assert sum(os.path.getsize(tmp_path / name) for name in files) <= 100
+    assert "key9.wav" in files and "key0.wav" not in files
@@ -0,0 +1,80 @@
+import pytest
+
+from conftest import load_module
+
+audio_frames = load_module("orchestrator", "audio_frames")
+FrameDecoder = audio_frames.FrameDecoder
+FrameEncoder = audio_frames.FrameEncoder
+FrameError = audio_frames.FrameError
+
+PCM = bytes(range(256)) * 25  # 6400 bytes, 200 ms of 16 kHz mono
+
+
+def test_pcm_round_trips_however_the_body_is_split():
+    encoder = FrameEncoder(16000)
+    body = encoder.encode(PCM[:1001]) + encoder.encode(PCM[1001:], final=True)
+
+    for size in (1, 7, 16, 661, len(body)):
+        decoder = FrameDecoder()
+        frames = []
+        for start in range(0, len(body), size):
+            frames += decoder.feed(body[start:start + size])
+        decoder.finish()
+        assert b"".join(decoder.decode(frame) for frame in frames) == PCM
+        assert [frame.seq for frame in frames] == list(range(10))
+        assert decoder.missing == 0
+
+
+def test_header_carries_format_and_sequence():
+    encoder = FrameEncoder(24000, channels=2, frame_ms=10)
+    frames = FrameDecoder().feed(encoder.encode(b"\x01\x00" * 960))
+    assert [(f.codec, f.sample_rate, f.channels, f.seq, len(f.payload)) for f in frames] == [
+        ("pcm", 24000, 2, 0, 960), ("pcm", 24000, 2, 1, 960)]
+
+
+def test_partial_frames_wait_until_final():
+    encoder = FrameEncoder(16000)
+    assert encoder.encode(PCM[:639]) == b""
+    assert len(encoder.encode(PCM[639:641])) == 16 + 640
+    # The odd trailing byte isn't a whole sample
+    last = FrameDecoder().feed(encoder.encode(b"\x05\x00", final=True))
+    assert last[0].payload == PCM[640:641] + b"\x05"
+
+
+def test_missing_frames_are_counted():
+    encoder = FrameEncoder(16000)
+    body = encoder.encode(PCM)
+    frame_size = 16 + 640
+    decoder = FrameDecoder()
+    decoder.feed(body[:frame_size] + body[3 * frame_size:])
+    assert decoder.missing == 2
+
+
+def test_garbage_and_truncated_bodies_are_rejected():
+    with pytest.raises(FrameError):
+        FrameDecoder().feed(b"RIFF" + b"\x00" * 40)
+    with pytest.raises(FrameError):
+        FrameDecoder(max_payload=100).feed(FrameEncoder(16000).encode(PCM))
+
+    decoder = FrameDecoder()
+    decoder.feed(FrameEncoder(16000).encode(PCM)[:700])
+    with pytest.raises(FrameError):
+        decoder.finish()
+
+    with pytest.raises(FrameError):
+        FrameEncoder(16000, codec="mp3")
+    with pytest.raises(FrameError):
+        FrameEncoder(44100, codec="opus")
+
+
+def test_opus_frames_are_much_smaller():
+    pytest.importorskip("opuslib")
+    pcm = b"".join(int(8000 * ((i // 20) % 2 * 2 - 1)).to_bytes(2, "little", signed=True)
+                   for i in range(16000))
+    body = FrameEncoder(16000, codec="opus").encode(pcm, final=True)
+    decoder = FrameDecoder()
+    frames = decoder.feed(body)
+
+    assert len(body) < len(pcm) / 4
+    assert all(frame.codec == "opus" for frame in frames)
+    assert len(b"".join(decoder.decode(frame) for frame in frames)) == len(pcm)
@@ -0,0 +1,45 @@
+import pytest
+
+from conftest import load_module
+from stubs import silence_wav
+
+np = pytest.importorskip("numpy")
+audio_input = load_module("transcriber", "audio_input")
+
+
+def test_raw_pcm_is_scaled_to_float32():
+    pcm = np.array([0, 16384, -32768, 32767], dtype="<i2").tobytes()
+    samples = audio_input.pcm16_to_float32(pcm)
+    assert samples.dtype == np.float32
+    assert samples.tolist() == pytest.approx([0.0, 0.5, -1.0, 32767 / 32768])
+
+
+def test_target_format_wav_is_decoded_without_ffmpeg(monkeypatch):
+    monkeypatch.setattr(audio_input, "ffmpeg_decode", lambda data: pytest.fail("ffmpeg was called"))
+    samples = audio_input.decode(silence_wav(0.5))
+    assert samples.shape == (8000,) and not samples.any()
+
+
+def test_other_formats_go_through_ffmpeg(monkeypatch):
+    monkeypatch.setattr(audio_input, "ffmpeg_decode", lambda data: "decoded")
+    assert audio_input.decode(b"ID3\x04 not a wav") == "decoded"
+    assert audio_input.decode(silence_wav(0.5, sample_rate=44100)) == "decoded"
+
+
+def test_pcm_parameters_are_validated():
+    assert audio_input.check_pcm_params({}) is None
+    assert audio_input.check_pcm_params({"rate": "16000", "channels": "1"}) is None
+    assert "16000 Hz mono" in audio_input.check_pcm_params({"rate": "8000"})
+    assert audio_input.check_pcm_params({"channels": "2"})
+
+
+def test_framed_pcm_is_decoded():
+    frames = load_module("transcriber", "audio_frames")
+    pcm = np.array([0, 16384, -32768], dtype="<i2").tobytes()
+    samples, error = audio_input.frames_to_float32(frames.FrameEncoder(16000).encode(pcm, final=True))
+    assert error is None and samples.tolist() == pytest.approx([0.0, 0.5, -1.0])
+
+    _, error = audio_input.frames_to_float32(frames.FrameEncoder(8000).encode(pcm, final=True))
+    assert "16000 Hz mono" in error
+    _, error = audio_input.frames_to_float32(b"not frames at all")
+    assert error
@@ -0,0 +1,57 @@
+import pytest
+
+from conftest import load_module
+
+backends = load_module("ollama", "backends")
+
+
+class FakeBreaker:
+    is_open = False
+
+
+class FakeClient:
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self.breaker = FakeBreaker()
+
+
+@pytest.fixture
+def pool():
+    return backends.BackendPool([FakeClient("a"), FakeClient("b"), FakeClient("c")])
+
+
+def test_least_outstanding_backend_is_chosen(pool):
+    a, b, c = pool.backends
+    assert pool.acquire("llama3.2") is a
+    assert pool.acquire("llama3.2") is b
+    pool.release(a)
+
+    # Ties go to the backend that has been given the fewest requests so far
+    assert pool.acquire("llama3.2") is c
+    assert pool.acquire("llama3.2") is a
+    assert [backend["outstanding"] for backend in pool.stats()] == [1, 1, 1]
+
+
+def test_model_names_default_to_the_latest_tag(pool):
+    a, b, c = pool.backends
+    a.models, b.models, c.models = {"mistral:7b"}, {"llama3.2:latest"}, {"mistral:7b"}
+
+    assert pool.acquire("llama3.2") is b
+    assert pool.acquire("llama3.2:latest") is b
+
+
+def test_ejected_backends_and_lost_affinity(pool):
+    a, b, c = pool.backends
+    assert pool.acquire("m", session_id="s") is a
+    a.client.breaker.is_open = True
+
+    # The session moves to a live backend and stays there
+    moved = pool.acquire("m", session_id="s")
+    assert moved is not a
+    a.client.breaker.is_open = False
+    assert pool.acquire("m", session_id="s") is moved
+
+    for backend in pool.backends:
+        backend.client.breaker.is_open = True
+    with pytest.raises(backends.NoBackendError):
+        pool.acquire("m")
@@ -0,0 +1,60 @@
+import threading
+import time
+
+import pytest
+
+from conftest import load_module
+
+batcher = load_module("transcriber", "batcher")
+
+
+def test_concurrent_submissions_share_a_batch():
+    batches = []
+
+    def run_batch(items):
+        batches.append(list(items))
+        return [item * 2 for item in items]
+
+    micro = batcher.MicroBatcher(run_batch, max_batch_size=8, max_wait_ms=100)
+    futures = [micro.submit(n) for n in range(5)]
+
+    assert [future.result(timeout=2) for future in futures] == [0, 2, 4, 6, 8]
+    assert batches == [[0, 1, 2, 3, 4]]
+
+
+def test_batches_are_capped_at_max_size():
+    batches = []
+    release = threading.Event()
+
+    def run_batch(items):
+        release.wait()
+        batches.append(len(items))
+        return items
+
+    micro = batcher.MicroBatcher(run_batch, max_batch_size=3, max_wait_ms=50)
+    futures = [micro.submit(n) for n in range(7)]
+    release.set()
+
+    assert [future.result(timeout=2) for future in futures] == list(range(7))
+    assert max(batches) == 3 and sum(batches) == 7
+
+
+def test_lone_request_waits_at_most_max_wait():
+    micro = batcher.MicroBatcher(lambda items: items, max_batch_size=8, max_wait_ms=20)
+    start = time.monotonic()
+    assert micro.submit("hello").result(timeout=2) == "hello"
+    assert time.monotonic() - start < 0.5
+
+
+def test_errors_reach_every_caller_in_the_batch():
+    def run_batch(items):
+        raise RuntimeError("model exploded")
+
+    micro = batcher.MicroBatcher(run_batch, max_wait_ms=50)
+    futures = [micro.submit(n) for n in range(3)]
+    for future in futures:
+        with pytest.raises(RuntimeError, match="model exploded"):
+            future.result(timeout=2)
+    # The worker keeps running after a failed batch
+    micro.run_batch = lambda items: items
+    assert micro.submit(1).result(timeout=2) == 1
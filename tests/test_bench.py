@@ -0,0 +1,47 @@
+import pytest
+
+from conftest import load_module, load_service
+from stubs import AsgiServer, ollama_stub, silence_wav, transcriber_stub, tts_stub
+
+requests = pytest.importorskip("requests")
+bench = load_module("bench", "bench")
+
+
+def test_percentiles_use_the_nearest_rank():
+    values = list(range(1, 101))
+    assert [bench.percentile(values, q) for q in (50, 95, 99)] == [50, 95, 99]
+    assert bench.percentile([7.0], 99) == 7.0
+    assert bench.percentile([], 50) == 0.0
+
+
+def test_slower_or_failing_runs_are_regressions():
+    baseline = {"latency_ms_p95": 1000.0, "ttfa_ms_p50": 500.0, "requests_per_second": 4.0, "errors": 0}
+    report = {key: 0 for key in bench.LATENCY_KEYS}
+    report.update({"latency_ms_p95": 1100.0, "ttfa_ms_p50": 500.0, "requests_per_second": 3.5, "errors": 0})
+    assert bench.compare(report, baseline, tolerance=0.2) == []
+
+    report.update({"latency_ms_p95": 1300.0, "requests_per_second": 3.0, "errors": 1})
+    regressions = bench.compare(report, baseline, tolerance=0.2)
+    assert [regression.split(":")[0] for regression in regressions] == \
+        ["latency_ms_p95", "requests_per_second", "errors"]
+
+
+def test_streamed_turns_report_time_to_first_audio():
+    pytest.importorskip("quart")
+    pytest.importorskip("hypercorn")
+    orchestrator = load_service("orchestrator")
+    answer = "First sentence comes quickly. " + "Then it goes on and on. " * 5
+
+    with transcriber_stub() as transcriber, ollama_stub(answer, token_delay=0.02) as ollama, \
+            tts_stub() as tts:
+        orchestrator.transcriber.base_url = transcriber.url
+        orchestrator.ollama.base_url = ollama.url
+        orchestrator.tts.base_url = tts.url
+
+        with AsgiServer(orchestrator.app) as server:
+            report = bench.run(server.url, [("turn.wav", silence_wav(0.5))], count=4, concurrency=2,
+                               endpoint="stream")
+
+    assert report["errors"] == 0 and report["requests_per_second"] > 0
+    # The first sentence is spoken while the rest is still being generated
+    assert report["ttfa_ms_p50"] < report["latency_ms_p50"] - 300
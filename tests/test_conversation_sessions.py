@@ -0,0 +1,46 @@
+import time
+
+from conftest import load_module
+
+sessions = load_module("ollama", "sessions")
+
+
+def test_context_is_kept_per_session():
+    store = sessions.ConversationSessions()
+    store.update("a", [1, 2, 3])
+    store.update("b", [4])
+
+    assert store.get("a") == [1, 2, 3]
+    assert store.get("b") == [4]
+    assert store.get("missing") is None
+    assert store.stats() == {"sessions": 2, "context_tokens": 4}
+
+
+def test_idle_sessions_expire():
+    store = sessions.ConversationSessions(ttl=0.05)
+    store.update("a", [1])
+    time.sleep(0.1)
+
+    assert store.get("a") is None
+    assert store.stats()["context_tokens"] == 0
+
+
+def test_token_cap_evicts_least_recently_used():
+    store = sessions.ConversationSessions(max_tokens=10)
+    store.update("old", [0] * 4)
+    store.update("new", [0] * 4)
+    store.get("old")
+    store.update("newest", [0] * 4)
+
+    assert store.get("new") is None
+    assert store.get("old") is not None
+    assert store.stats()["context_tokens"] == 8
+
+
+def test_oversized_context_starts_over():
+    store = sessions.ConversationSessions(max_tokens=10)
+    store.update("a", [0] * 5)
+    store.update("a", [0] * 11)
+
+    assert store.get("a") is None
+    assert store.stats()["context_tokens"] == 0
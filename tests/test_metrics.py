@@ -0,0 +1,44 @@
+import time
+
+from conftest import load_module
+
+metrics = load_module("orchestrator", "metrics")
+
+
+def test_histogram_renders_cumulative_buckets_per_label():
+    registry = metrics.Registry()
+    histogram = registry.histogram("stage_duration_seconds", "Stages", ("stage",), buckets=(0.1, 1.0))
+    histogram.observe(0.05, stage="tts")
+    histogram.observe(0.5, stage="tts")
+    histogram.observe(5.0, stage="tts")
+    histogram.observe(1.0, stage="llm")
+
+    lines = registry.render().splitlines()
+    assert lines[:2] == ["# HELP stage_duration_seconds Stages", "# TYPE stage_duration_seconds histogram"]
+    assert 'stage_duration_seconds_bucket{stage="tts",le="0.1"} 1' in lines
+    assert 'stage_duration_seconds_bucket{stage="tts",le="1"} 2' in lines
+    assert 'stage_duration_seconds_bucket{stage="tts",le="+Inf"} 3' in lines
+    assert 'stage_duration_seconds_sum{stage="tts"} 5.550000' in lines
+    assert 'stage_duration_seconds_count{stage="tts"} 3' in lines
+    # Upper bounds are inclusive
+    assert 'stage_duration_seconds_bucket{stage="llm",le="1"} 1' in lines
+
+
+def test_stage_timer_accumulates_milliseconds_and_observes_each_stage():
+    histogram = metrics.Histogram("stage_duration_seconds", "Stages", ("stage",))
+    timer = metrics.StageTimer(histogram)
+    for _ in range(2):
+        with timer.stage("tts"):
+            time.sleep(0.01)
+    timer.record("llm_ttft", 0.25)
+
+    assert timer.timings["tts"] >= 20
+    assert timer.timings["llm_ttft"] == 250.0
+    assert timer.elapsed() * 1000 >= timer.timings["tts"]
+    assert 'stage_duration_seconds_count{stage="tts"} 2' in histogram.render()
+
+
+def test_request_ids_are_passed_on_or_made_up():
+    assert metrics.request_id("turn-42") == "turn-42"
+    made_up = {metrics.request_id(value) for value in (None, "", "bad id\r\nX-Evil: 1", "x" * 65)}
+    assert len(made_up) == 4 and all(len(value) == 32 for value in made_up)
@@ -0,0 +1,91 @@
+import threading
+import time
+
+import pytest
+
+from conftest import load_module
+
+models = load_module("transcriber", "models")
+
+
+class FakeModel:
+    def __init__(self, name):
+        self.name = name
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def test_models_load_lazily_once_and_unknown_sizes_are_rejected():
+    loads = []
+
+    def loader(name):
+        loads.append(name)
+        time.sleep(0.05)
+        return FakeModel(name)
+
+    manager = models.ModelManager(loader, default="base", allowed=("tiny", "base", "small"))
+    assert not manager.is_ready()
+
+    threads = [threading.Thread(target=manager.get) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert loads == ["base"]
+    assert manager.is_ready() and manager.get().name == "base"
+    with pytest.raises(models.UnknownModelError):
+        manager.get("large")
+
+
+def test_least_recently_used_model_is_evicted_but_never_the_default():
+    manager = models.ModelManager(FakeModel, default="base", allowed=("tiny", "base", "small"),
+                                  max_resident=2)
+    base = manager.get("base")
+    tiny = manager.get("tiny")
+    small = manager.get("small")
+
+    assert manager.status()["resident"] == ["base", "small"]
+    assert tiny.closed and not base.closed and not small.closed
+    assert manager.is_ready()
+
+    manager.get("tiny")
+    assert small.closed and manager.status()["resident"] == ["base", "tiny"]
+
+
+def test_with_room_for_the_default_only_other_models_are_not_kept():
+    manager = models.ModelManager(FakeModel, default="base", allowed=("tiny", "base"), max_resident=1)
+    base = manager.get("base")
+    tiny = manager.get("tiny")
+
+    assert tiny.name == "tiny" and tiny.closed and not base.closed
+    assert manager.status()["resident"] == ["base"]
+
+
+def test_preload_runs_in_background_and_reports_errors():
+    started = threading.Event()
+    release = threading.Event()
+
+    def loader(name):
+        started.set()
+        release.wait(2)
+        if name == "small":
+            raise RuntimeError("out of memory")
+        return FakeModel(name)
+
+    manager = models.ModelManager(loader, default="base", allowed=("base", "small"))
+    manager.preload(["base"])
+    started.wait(2)
+    assert manager.status()["loading"] == ["base"] and not manager.is_ready()
+
+    release.set()
+    deadline = time.monotonic() + 2
+    while not manager.is_ready() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert manager.is_ready()
+
+    with pytest.raises(RuntimeError):
+        manager.get("small")
+    assert manager.status()["errors"] == {"small": "out of memory"}
@@ -0,0 +1,279 @@
+import json
+import threading
+import time
+
+import pytest
+
+from conftest import load_module, load_service
+from stubs import ollama_api_stub
+
+pytest.importorskip("flask")
+pytest.importorskip("requests")
+
+ANSWER = "Sure, here is a short answer for you."
+
+
+@pytest.fixture
+def wrapper():
+    return load_service("ollama")
+
+
+def use_backends(wrapper, *urls):
+    wrapper.pool = wrapper.BackendPool([wrapper.ServiceClient(url, failure_threshold=1) for url in urls])
+    return wrapper.pool
+
+
+def test_stream_passes_tokens_through_and_reports_speed(wrapper):
+    with ollama_api_stub(ANSWER, eval_duration_per_token=0.05) as api:
+        use_backends(wrapper, api.url)
+        response = wrapper.app.test_client().post("/generate", json={"prompt": "hi", "stream": True})
+        lines = [json.loads(line) for line in response.get_data().splitlines()]
+
+    assert response.mimetype == "application/x-ndjson"
+    assert "".join(chunk["response"] for chunk in lines).split() == ANSWER.split()
+    final = lines[-1]
+    assert final["done"] is True
+    assert final["eval_count"] == len(ANSWER.split())
+    assert final["tokens_per_second"] == pytest.approx(20.0)
+    assert final["ttft_ms"] >= 0
+
+
+def test_stream_as_server_sent_events(wrapper):
+    with ollama_api_stub(ANSWER) as api:
+        use_backends(wrapper, api.url)
+        response = wrapper.app.test_client().post(
+            "/generate", json={"prompt": "hi", "stream": True},
+            headers={"Accept": "text/event-stream"})
+        events = response.get_data(as_text=True).strip().split("\n\n")
+
+    assert response.mimetype == "text/event-stream"
+    assert all(event.startswith("data: ") for event in events[:-1])
+    assert events[-1].startswith("event: done\ndata: ")
+    assert "tokens_per_second" in json.loads(events[-1].split("data: ", 1)[1])
+
+
+def test_non_streamed_reply_reports_ollama_timings(wrapper):
+    with ollama_api_stub(ANSWER, eval_duration_per_token=0.1) as api:
+        use_backends(wrapper, api.url)
+        result = wrapper.app.test_client().post("/generate", json={"prompt": "hi"}).get_json()
+
+    assert result["response"] == ANSWER
+    assert result["total_duration"] == 1_500_000_000
+    # load_duration + prompt_eval_duration
+    assert result["ttft_ms"] == 150.0
+    assert result["tokens_per_second"] == pytest.approx(10.0)
+
+
+def test_sse_event_encoding():
+    streaming = load_module("ollama", "streaming")
+    assert streaming.sse_event({"a": 1}) == b'data: {"a": 1}\n\n'
+    assert streaming.sse_event({}, "done") == b"event: done\ndata: {}\n\n"
+
+
+def test_session_sends_context_back_instead_of_system_prompt(wrapper):
+    client = wrapper.app.test_client()
+    with ollama_api_stub(ANSWER) as api:
+        use_backends(wrapper, api.url)
+        first = client.post("/generate", json={"prompt": "hi", "session_id": "s1"}).get_json()
+        second = client.post("/generate", json={"prompt": "and then?", "session_id": "s1", "stream": True})
+        second_final = json.loads(second.get_data().splitlines()[-1])
+        client.delete("/sessions/s1")
+        third = client.post("/generate", json={"prompt": "hello again", "session_id": "s1"})
+
+    first_request, second_request, third_request = api.requests
+    assert first["session_id"] == "s1" and "context" not in first
+    assert "system" in first_request and "context" not in first_request
+    assert "system" not in second_request
+    assert second_request["context"] == list(range(len(ANSWER.split()) + 1))
+    assert second_final["session_id"] == "s1" and "context" not in second_final
+    assert "context" not in third_request and third.status_code == 200
+
+
+def test_requests_without_session_stay_stateless(wrapper):
+    client = wrapper.app.test_client()
+    with ollama_api_stub(ANSWER) as api:
+        use_backends(wrapper, api.url)
+        client.post("/generate", json={"prompt": "hi"})
+        client.post("/generate", json={"prompt": "hi"})
+
+    assert all("context" not in request and "system" in request for request in api.requests)
+
+
+def test_repeated_question_is_answered_from_the_cache(wrapper, monkeypatch):
+    monkeypatch.setattr(wrapper, "response_cache", wrapper.ResponseCache(threshold=0.8))
+    client = wrapper.app.test_client()
+    with ollama_api_stub(ANSWER) as api:
+        use_backends(wrapper, api.url)
+        first = client.post("/generate", json={"prompt": "What's on my schedule today?", "stream": True})
+        first.get_data()
+        exact = client.post("/generate", json={"prompt": "what's on my schedule today"})
+        similar = client.post("/generate", json={"prompt": "so what's on my schedule for today?", "stream": True})
+        uncached = client.post("/generate", json={"prompt": "What's on my schedule today?", "cache": False})
+
+    assert len(api.requests) == 2
+    assert first.headers["X-Cache"] == "miss"
+    # The stub streams every word followed by a space
+    assert exact.headers["X-Cache"] == "exact" and exact.get_json()["response"] == ANSWER + " "
+    assert similar.headers["X-Cache"] == "semantic"
+    assert "".join(json.loads(line)["response"] for line in similar.get_data().splitlines()) == ANSWER + " "
+    assert "X-Cache" not in uncached.headers
+
+
+def test_only_exact_cache_hits_seed_the_conversation(wrapper, monkeypatch):
+    monkeypatch.setattr(wrapper, "response_cache", wrapper.ResponseCache(threshold=0.8))
+    client = wrapper.app.test_client()
+    with ollama_api_stub(ANSWER) as api:
+        use_backends(wrapper, api.url)
+        client.post("/generate", json={"prompt": "What's on my schedule today?"})
+        exact = client.post("/generate", json={"prompt": "what's on my schedule today", "session_id": "c-exact"})
+        similar = client.post("/generate", json={"prompt": "so what's on my schedule for today?",
+                                                 "session_id": "c-similar"})
+
+    assert exact.headers["X-Cache"] == "exact" and similar.headers["X-Cache"] == "semantic"
+    assert wrapper.sessions.get("c-exact") == list(range(len(ANSWER.split()) + 1))
+    assert wrapper.sessions.get("c-similar") is None
+
+
+def test_requests_beyond_the_queue_are_turned_away(wrapper, monkeypatch):
+    monkeypatch.setattr(wrapper, "scheduler", wrapper.Scheduler(concurrency=1, max_queue=0, deadline=1))
+    with ollama_api_stub(ANSWER, token_delay=0.1) as api:
+        use_backends(wrapper, api.url)
+        client = wrapper.app.test_client()
+        results = []
+        busy = threading.Thread(target=lambda: results.append(
+            client.post("/generate", json={"prompt": "hi"}).status_code))
+        busy.start()
+        time.sleep(0.2)
+        rejected = client.post("/generate", json={"prompt": "hi"})
+        busy.join()
+        stats = client.get("/queue/stats").get_json()
+
+    assert results == [200]
+    assert rejected.status_code == 429 and rejected.headers["Retry-After"] == "1"
+    assert stats["admitted"] == 1 and stats["rejected_full"] == 1 and stats["running"] == 0
+
+
+def test_generations_are_spread_over_backends_with_session_affinity(wrapper, monkeypatch):
+    monkeypatch.setattr(wrapper, "scheduler", wrapper.Scheduler(concurrency=8))
+    client = wrapper.app.test_client()
+    with ollama_api_stub(ANSWER, token_delay=0.05) as first, ollama_api_stub(ANSWER, token_delay=0.05) as second:
+        use_backends(wrapper, first.url, second.url)
+        threads = [threading.Thread(target=client.post, args=("/generate",), kwargs={"json": {"prompt": "hi"}})
+                   for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for _ in range(3):
+            client.post("/generate", json={"prompt": "turn", "session_id": "affinity", "stream": True}).get_data()
+
+    assert len(first.requests) + len(second.requests) == 7
+    assert min(len(first.requests), len(second.requests)) >= 2
+    # Every turn went to the backend holding the conversation's KV cache
+    turns = [[r for r in stub.requests if r["prompt"] == "turn"] for stub in (first, second)]
+    assert sorted(len(t) for t in turns) == [0, 3]
+    assert all(backend["outstanding"] == 0 for backend in wrapper.pool.stats())
+
+
+def test_requests_are_routed_to_backends_serving_the_model(wrapper):
+    with ollama_api_stub(ANSWER) as first, ollama_api_stub(ANSWER, models=["mistral:7b"]) as second:
+        pool = use_backends(wrapper, first.url, second.url)
+        pool.refresh()
+        client = wrapper.app.test_client()
+        for _ in range(3):
+            client.post("/generate", json={"prompt": "hi", "model": "mistral:7b"})
+
+    assert len(first.requests) == 0 and len(second.requests) == 3
+
+
+def test_unreachable_backend_is_ejected(wrapper):
+    with ollama_api_stub(ANSWER) as healthy:
+        pool = use_backends(wrapper, "http://127.0.0.1:9", healthy.url)
+        client = wrapper.app.test_client()
+        replies = [client.post("/generate", json={"prompt": "hi"}) for _ in range(4)]
+        health = client.get("/health").get_json()
+
+    assert all(reply.status_code == 200 for reply in replies)
+    assert len(healthy.requests) == 4
+    assert [backend["available"] for backend in pool.stats()] == [False, True]
+    assert health["ollama_connection"] is True
+
+
+def test_hanging_up_aborts_the_generation_and_frees_its_slot(wrapper, monkeypatch):
+    monkeypatch.setattr(wrapper, "scheduler", wrapper.Scheduler(concurrency=1))
+    long_answer = " ".join(["This goes on and on."] * 100)
+    with ollama_api_stub(long_answer, token_delay=0.02) as api:
+        use_backends(wrapper, api.url)
+        response = wrapper.app.test_client().post(
+            "/generate", json={"prompt": "hi", "stream": True}, buffered=False)
+        next(iter(response.response))
+        response.close()
+
+        deadline = time.monotonic() + 3
+        while not api.outcomes and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+    assert api.outcomes == ["aborted"]
+    assert wrapper.scheduler.stats()["running"] == 0
+    assert wrapper.pool.stats()[0]["outstanding"] == 0
+
+
+def test_generation_can_be_cancelled_by_id(wrapper, monkeypatch):
+    monkeypatch.setattr(wrapper, "scheduler", wrapper.Scheduler(concurrency=1))
+    long_answer = " ".join(["This goes on and on."] * 100)
+    client = wrapper.app.test_client()
+    with ollama_api_stub(long_answer, token_delay=0.02) as api:
+        use_backends(wrapper, api.url)
+        response = client.post("/generate", json={"prompt": "hi", "stream": True, "generation_id": "g1"},
+                               buffered=False)
+        chunks = iter(response.response)
+        next(chunks)
+        cancelled = client.delete("/generate/g1").get_json()
+        lines = [json.loads(line) for line in b"".join(chunks).splitlines()]
+
+        deadline = time.monotonic() + 3
+        while not api.outcomes and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+        # Cancelled before it started: refused once it gets to run
+        assert client.delete("/generate/g2").get_json()["cancelled"] is False
+        refused = client.post("/generate", json={"prompt": "hi", "stream": True, "generation_id": "g2"})
+
+    assert response.headers["X-Generation-ID"] == "g1"
+    assert cancelled == {"generation_id": "g1", "cancelled": True}
+    assert lines[-1]["done"] is True and lines[-1]["done_reason"] == "cancelled"
+    assert api.outcomes[0] == "aborted"
+    assert refused.status_code == 409
+    assert wrapper.scheduler.stats()["running"] == 0
+    assert wrapper.pool.stats()[0]["outstanding"] == 0
+
+
+def test_speculative_answer_joins_the_conversation_once_committed(wrapper):
+    client = wrapper.app.test_client()
+    turn = {"prompt": "hi", "session_id": "spec", "stream": True, "speculative": True}
+    with ollama_api_stub(ANSWER) as api:
+        use_backends(wrapper, api.url)
+        client.post("/generate", json={**turn, "generation_id": "wrong"}).get_data()
+        client.post("/generate", json={**turn, "generation_id": "right"}).get_data()
+        before_commit = wrapper.sessions.get("spec")
+        client.delete("/generate/wrong")
+        committed = client.post("/generate/right/commit")
+        client.post("/generate", json={"prompt": "next", "session_id": "spec"})
+
+    after_commit = api.requests[-1]
+    assert before_commit is None
+    assert committed.get_json() == {"generation_id": "right", "committed": True}
+    assert after_commit["context"] == list(range(len(ANSWER.split()) + 1))
+
+
+def test_commit_before_the_speculative_answer_starts_is_kept(wrapper):
+    client = wrapper.app.test_client()
+    turn = {"prompt": "hi", "session_id": "spec-early", "stream": True, "speculative": True}
+    with ollama_api_stub(ANSWER) as api:
+        use_backends(wrapper, api.url)
+        # Still queued, say: the commit gets there first
+        committed = client.post("/generate/early/commit")
+        client.post("/generate", json={**turn, "generation_id": "early"}).get_data()
+
+    assert committed.get_json() == {"generation_id": "early", "committed": True}
+    assert wrapper.sessions.get("spec-early") == list(range(len(ANSWER.split()) + 1))
@@ -0,0 +1,66 @@
+import threading
+import time
+
+from conftest import load_module
+
+playback = load_module("client", "playback")
+
+
+def test_wav_header_is_stripped_across_chunks():
+    chunks = [b"R" * 10, b"H" * 30, b"H" * 4 + b"pcm", b"more"]
+    assert b"".join(playback.strip_wav_header(chunks)) == b"pcmmore"
+
+
+def test_playback_waits_for_the_prebuffer():
+    buffer = playback.JitterBuffer(prebuffer_bytes=8)
+    buffer.put(b"\x01" * 4)
+    assert buffer.read(4, timeout=0.05) is None
+
+    buffer.put(b"\x02" * 4)
+    assert buffer.read(6) == b"\x01" * 4 + b"\x02" * 2
+
+
+def test_running_dry_rebuffers_and_reads_whole_frames():
+    buffer = playback.JitterBuffer(prebuffer_bytes=4)
+    buffer.put(b"abcde")
+    assert buffer.read(100) == b"abcd"
+    # One byte left: not a whole sample, so it's buffering again
+    assert buffer.read(100, timeout=0.05) is None
+    assert buffer.underruns == 1
+
+    buffer.finish()
+    assert buffer.read(100) == b"e"
+    assert buffer.read(100) == b""
+
+
+def test_short_stream_plays_without_filling_the_prebuffer():
+    buffer = playback.JitterBuffer(prebuffer_bytes=1000)
+    buffer.put(b"ab")
+    buffer.finish()
+    assert buffer.read(100) == b"ab"
+
+
+def test_player_plays_everything_in_order_while_it_arrives():
+    buffer = playback.JitterBuffer(prebuffer_bytes=4)
+    written = []
+    player = playback.Player(buffer, written.append, chunk_bytes=4)
+    player.start()
+
+    def produce():
+        for i in range(10):
+            buffer.put(bytes([i]) * 6)
+            time.sleep(0.01)
+        buffer.finish()
+
+    threading.Thread(target=produce).start()
+    player.join(2)
+
+    assert not player.is_alive()
+    assert b"".join(written) == b"".join(bytes([i]) * 6 for i in range(10))
+
+
+def test_clear_stops_playback():
+    buffer = playback.JitterBuffer(prebuffer_bytes=2)
+    buffer.put(b"\x00" * 100)
+    buffer.clear()
+    assert buffer.read(10) == b""
@@ -0,0 +1,83 @@
+import time
+
+import pytest
+
+from conftest import load_module
+
+pytest.importorskip("numpy")
+response_cache = load_module("ollama", "response_cache")
+
+MODEL, SYSTEM = "llama3.2", "You are a helpful voice assistant."
+
+
+@pytest.fixture
+def cache():
+    return response_cache.ResponseCache(threshold=0.8, max_entries=4)
+
+
+def test_exact_match_ignores_case_and_punctuation(cache):
+    cache.put(MODEL, SYSTEM, "What's on my schedule today?", "Two meetings.")
+
+    assert cache.get(MODEL, SYSTEM, "what's on my schedule today") == ("Two meetings.", "exact")
+
+
+def test_similar_prompt_hits_the_semantic_tier(cache):
+    cache.put(MODEL, SYSTEM, "What's on my schedule today?", "Two meetings.")
+    cache.put(MODEL, SYSTEM, "Tell me a joke about cats", "Meow.")
+
+    assert cache.get(MODEL, SYSTEM, "so what's on my schedule for today") == ("Two meetings.", "semantic")
+    assert cache.get(MODEL, SYSTEM, "How far away is the moon?") == (None, None)
+    assert cache.stats()["hits_semantic"] == 1
+
+
+def test_entries_are_scoped_to_model_and_system_prompt(cache):
+    cache.put(MODEL, SYSTEM, "What's on my schedule today?", "Two meetings.")
+
+    assert cache.get("mistral", SYSTEM, "What's on my schedule today?") == (None, None)
+    assert cache.get(MODEL, "Be a pirate.", "What's on my schedule today") == (None, None)
+
+
+def test_entries_expire():
+    cache = response_cache.ResponseCache(ttl=0.05)
+    cache.put(MODEL, SYSTEM, "hello there", "Hi!")
+    time.sleep(0.1)
+
+    assert cache.get(MODEL, SYSTEM, "hello there") == (None, None)
+    assert cache.stats()["entries"] == 0
+
+
+def test_least_recently_used_entry_is_evicted(cache):
+    for i in range(4):
+        cache.put(MODEL, SYSTEM, f"question number {i}", i)
+    cache.get(MODEL, SYSTEM, "question number 0")
+    cache.put(MODEL, SYSTEM, "something else entirely", "new")
+
+    assert cache.get(MODEL, SYSTEM, "question number 0") == (0, "exact")
+    assert cache.get(MODEL, SYSTEM, "question number 1")[1] != "exact"
+    assert cache.stats()["entries"] == 4
+
+
+def test_prompts_differing_in_numbers_or_negation_never_share_an_answer(cache):
+    cache.put(MODEL, SYSTEM, "Set a timer for 5 minutes", "Timer set for 5 minutes.")
+    cache.put(MODEL, SYSTEM, "Turn on the lights", "Lights on.")
+    cache.put(MODEL, SYSTEM, "Is it going to rain today?", "Yes.")
+
+    assert cache.get(MODEL, SYSTEM, "Set a timer for 15 minutes") == (None, None)
+    assert cache.get(MODEL, SYSTEM, "Turn off the lights") == (None, None)
+    assert cache.get(MODEL, SYSTEM, "Is it not going to rain today?") == (None, None)
+    assert cache.get(MODEL, SYSTEM, "please turn on the lights") == ("Lights on.", "semantic")
+
+
+def test_swapped_operands_miss():
+    cache = response_cache.ResponseCache()
+    cache.put(MODEL, SYSTEM, "move my 3pm meeting to 4pm", "Moved to 4pm.")
+
+    assert cache.get(MODEL, SYSTEM, "move my 4pm meeting to 3pm") == (None, None)
+
+
+def test_paraphrases_differing_only_in_filler_hit():
+    cache = response_cache.ResponseCache()
+    cache.put(MODEL, SYSTEM, "what is on my schedule today", "Two meetings.")
+
+    assert cache.get(MODEL, SYSTEM, "what's on my schedule for today") == ("Two meetings.", "semantic")
+    assert cache.get(MODEL, SYSTEM, "What's on my schedule for today, please?") == ("Two meetings.", "semantic")
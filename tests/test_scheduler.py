@@ -0,0 +1,81 @@
+import threading
+import time
+
+import pytest
+
+from conftest import load_module
+
+scheduler = load_module("ollama", "scheduler")
+
+
+def queue_up(sched, priority, results, deadline=None):
+    def run():
+        try:
+            sched.acquire(priority, deadline=deadline)
+            results.append(priority)
+        except Exception as e:
+            results.append(type(e).__name__)
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    # Let it reach the queue before the next one
+    time.sleep(0.05)
+    return thread
+
+
+def test_admits_up_to_concurrency_without_waiting():
+    sched = scheduler.Scheduler(concurrency=2)
+    assert sched.acquire() < 0.01
+    assert sched.acquire() < 0.01
+    assert sched.stats()["running"] == 2
+
+
+def test_interactive_requests_overtake_background_ones():
+    sched = scheduler.Scheduler(concurrency=1)
+    sched.acquire()
+    results = []
+    threads = [queue_up(sched, scheduler.BACKGROUND, results),
+               queue_up(sched, scheduler.INTERACTIVE, results)]
+    assert sched.stats()["queued_by_priority"] == {"interactive": 1, "background": 1}
+
+    sched.release()
+    time.sleep(0.05)
+    sched.release()
+    for thread in threads:
+        thread.join(1)
+
+    assert results == [scheduler.INTERACTIVE, scheduler.BACKGROUND]
+
+
+def test_full_queue_rejects_or_sheds_background_work():
+    sched = scheduler.Scheduler(concurrency=1, max_queue=1)
+    sched.acquire()
+    results = []
+    threads = [queue_up(sched, scheduler.BACKGROUND, results)]
+
+    with pytest.raises(scheduler.QueueFullError):
+        sched.acquire(scheduler.BACKGROUND)
+
+    # An interactive request takes the background request's place
+    threads.append(queue_up(sched, scheduler.INTERACTIVE, results))
+    assert results == ["QueueFullError"]
+    sched.release()
+    for thread in threads:
+        thread.join(1)
+
+    assert results == ["QueueFullError", scheduler.INTERACTIVE]
+    assert sched.stats()["rejected_full"] == 2
+
+
+def test_waiting_past_the_deadline_gives_up():
+    sched = scheduler.Scheduler(concurrency=1, deadline=0.1)
+    sched.acquire()
+
+    start = time.monotonic()
+    with pytest.raises(scheduler.QueueTimeoutError):
+        sched.acquire()
+
+    assert 0.1 <= time.monotonic() - start < 0.5
+    assert sched.stats()["queued"] == 0
+    assert sched.stats()["rejected_deadline"] == 1
+
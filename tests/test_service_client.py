@@ -0,0 +1,173 @@
+import asyncio
+import time
+
+import pytest
+
+from conftest import load_module, load_service
+from stubs import AsgiServer, StubServer, _Handler
+
+pytest.importorskip("requests")
+service_client = load_module("ollama", "service_client")
+
+
+def counting_stub(failures=0, status=503, delay=0.0):
+    """Stub that fails the first ``failures`` requests and counts connections."""
+    stats = {"requests": 0, "connections": 0}
+
+    class Handler(_Handler):
+        def setup(self):
+            super().setup()
+            stats["connections"] += 1
+
+        def do_GET(self):
+            self.read_body()
+            stats["requests"] += 1
+            time.sleep(delay)
+            if stats["requests"] <= failures:
+                self.send_json({"error": "busy"}, status)
+            else:
+                self.send_json({"status": "healthy"})
+
+        do_POST = do_GET
+
+    return StubServer(Handler), stats
+
+
+def test_connections_are_reused():
+    server, stats = counting_stub()
+    with server:
+        client = service_client.ServiceClient(server.url)
+        for _ in range(5):
+            assert client.get("/health").status_code == 200
+    assert stats == {"requests": 5, "connections": 1}
+
+
+def test_idempotent_requests_are_retried():
+    server, stats = counting_stub(failures=2)
+    with server:
+        client = service_client.ServiceClient(server.url, retries=2, backoff_factor=0)
+        assert client.get("/health").status_code == 200
+    assert stats["requests"] == 3
+
+
+def test_posts_are_not_retried_after_reaching_the_service():
+    server, stats = counting_stub(failures=1)
+    with server:
+        client = service_client.ServiceClient(server.url, retries=2, backoff_factor=0)
+        assert client.post("/generate", json={}).status_code == 503
+    assert stats["requests"] == 1
+
+
+def test_circuit_opens_after_repeated_failures():
+    server, stats = counting_stub(failures=100, status=500)
+    with server:
+        client = service_client.ServiceClient(server.url, retries=0, failure_threshold=3, reset_timeout=60)
+        for _ in range(3):
+            assert client.get("/health").status_code == 500
+        with pytest.raises(service_client.CircuitOpenError):
+            client.get("/health")
+    assert stats["requests"] == 3
+
+
+def test_half_open_probe_closes_the_circuit():
+    server, stats = counting_stub(failures=2, status=500)
+    with server:
+        client = service_client.ServiceClient(server.url, retries=0, failure_threshold=2, reset_timeout=0)
+        client.get("/health")
+        client.get("/health")
+        assert client.breaker.failures == 2
+        assert client.get("/health").status_code == 200
+        assert client.breaker.failures == 0 and not client.breaker.is_open
+
+
+def test_async_client_retries_and_reuses_connections():
+    pytest.importorskip("httpx")
+    async_client = load_module("orchestrator", "service_client")
+    server, stats = counting_stub(failures=2)
+
+    async def run():
+        client = async_client.AsyncServiceClient(server.url, retries=2, backoff_factor=0)
+        statuses = [(await client.get("/health")).status_code for _ in range(3)]
+        await client.aclose()
+        return statuses
+
+    with server:
+        assert asyncio.run(run()) == [200, 200, 200]
+    assert stats == {"requests": 5, "connections": 1}
+
+
+def test_health_probe_is_not_retried():
+    pytest.importorskip("quart")
+    pytest.importorskip("httpx")
+    orchestrator = load_service("orchestrator")
+    server, stats = counting_stub(failures=100)
+
+    async def run():
+        client = orchestrator.AsyncServiceClient(server.url, retries=2, backoff_factor=0)
+        healthy, _ = await orchestrator.probe(client)
+        await client.aclose()
+        return healthy
+
+    with server:
+        assert asyncio.run(run()) is False
+    assert stats["requests"] == 1
+
+
+def test_async_client_circuit_fails_fast():
+    pytest.importorskip("httpx")
+    async_client = load_module("orchestrator", "service_client")
+    server, stats = counting_stub(failures=100, status=500)
+
+    async def run():
+        client = async_client.AsyncServiceClient(server.url, retries=0, failure_threshold=2)
+        await client.post("/generate", json={})
+        await client.post("/generate", json={})
+        with pytest.raises(async_client.CircuitOpenError):
+            await client.post("/generate", json={})
+        await client.aclose()
+
+    with server:
+        asyncio.run(run())
+    assert stats["requests"] == 2
+
+
+def test_orchestrator_health_probes_run_in_parallel():
+    pytest.importorskip("quart")
+    pytest.importorskip("hypercorn")
+    requests = pytest.importorskip("requests")
+    orchestrator = load_service("orchestrator")
+    servers = [counting_stub(delay=0.3)[0] for _ in range(3)]
+
+    with servers[0] as transcriber, servers[1] as ollama, servers[2] as tts:
+        orchestrator.transcriber.base_url = transcriber.url
+        orchestrator.ollama.base_url = ollama.url
+        orchestrator.tts.base_url = tts.url
+        with AsgiServer(orchestrator.app) as server:
+            start = time.monotonic()
+            health = requests.get(f"{server.url}/health").json()
+            elapsed = time.monotonic() - start
+
+    assert health["status"] == "healthy"
+    assert elapsed < 0.6
+
+
+def test_async_client_pool_wait_is_bounded_and_not_a_service_failure():
+    httpx = pytest.importorskip("httpx")
+    async_client = load_module("orchestrator", "service_client")
+    server, stats = counting_stub(delay=0.5)
+
+    async def run():
+        client = async_client.AsyncServiceClient(server.url, retries=0, pool_size=1, pool_timeout=0.1,
+                                                 failure_threshold=1)
+        busy = asyncio.ensure_future(client.post("/generate", json={}))
+        await asyncio.sleep(0.05)
+        with pytest.raises(httpx.PoolTimeout):
+            async with client.stream("POST", "/generate", json={}, timeout=(5, None)):
+                pass
+        assert (await busy).status_code == 200
+        assert not client.breaker.is_open
+        await client.aclose()
+
+    with server:
+        asyncio.run(run())
+    assert stats["requests"] == 1
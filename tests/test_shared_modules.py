@@ -0,0 +1,24 @@
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Helper modules copied into every service that uses them (each service is
+# its own build context): the source copy, then the services it goes to. The
+# orchestrator has its own async service_client.py, so the blocking one
+# lives in ollama
+SHARED = {
+    "metrics.py": ("orchestrator", ("ollama", "transcriber", "TTS")),
+    "audio_frames.py": ("orchestrator", ("transcriber", "TTS")),
+    "audio.py": ("orchestrator", ("TTS",)),
+    "service_client.py": ("ollama", ("client",)),
+}
+
+
+@pytest.mark.parametrize("module", sorted(SHARED))
+def test_copies_of_shared_modules_are_identical(module):
+    origin, services = SHARED[module]
+    source = (ROOT / origin / module).read_bytes()
+    drifted = [service for service in services if (ROOT / service / module).read_bytes() != source]
+    assert not drifted, f"{module} differs from {origin}/{module} in {drifted}; run make sync-shared"
@@ -0,0 +1,70 @@
+import asyncio
+
+from conftest import load_module
+
+speculation = load_module("orchestrator", "speculation")
+
+
+class FakeLLM:
+    def __init__(self, token_delay=0.0):
+        self.started = []
+        self.cancelled = []
+        self.token_delay = token_delay
+
+    async def start(self, transcript, generation_id):
+        self.started.append(transcript)
+        for word in ("Sure,", "here", "it", "is."):
+            await asyncio.sleep(self.token_delay)
+            yield word + " "
+
+    async def cancel(self, generation_id):
+        self.cancelled.append(generation_id)
+
+
+async def collect(tokens):
+    return "".join([token async for token in tokens])
+
+
+def test_transcripts_are_compared_by_their_words():
+    normalize = speculation.normalize_transcript
+    assert normalize("What's on my  schedule today?") == normalize("what's on my schedule, today")
+    assert normalize("What's on my schedule today?") != normalize("What's on my schedule tomorrow?")
+
+
+def test_stable_partial_starts_an_answer_that_is_kept():
+    llm = FakeLLM()
+
+    async def turn():
+        speculator = speculation.Speculator(llm.start, llm.cancel, stable_after=2)
+        speculator.observe("What is")
+        speculator.observe("What is on my schedule")
+        assert speculator.current is None
+        speculator.observe("what is on my schedule")
+        kept = speculator.resolve("What is on my schedule?")
+        return kept, await collect(kept.tokens())
+
+    kept, answer = asyncio.run(turn())
+    assert llm.started == ["what is on my schedule"]
+    assert answer == "Sure, here it is. "
+    assert llm.cancelled == []
+
+
+def test_answer_is_dropped_when_the_transcript_moves_on():
+    llm = FakeLLM(token_delay=0.05)
+
+    async def turn():
+        speculator = speculation.Speculator(llm.start, llm.cancel, stable_after=1)
+        speculator.observe("What is on my schedule")
+        first = speculator.current
+        await asyncio.sleep(0.01)
+        speculator.observe("What is on my schedule tomorrow")
+        second = speculator.current
+        await asyncio.sleep(0.01)
+        kept = speculator.resolve("What is on my schedule tomorrow morning?")
+        await asyncio.sleep(0.01)
+        return first, second, kept
+
+    first, second, kept = asyncio.run(turn())
+    assert kept is None
+    assert llm.started == ["What is on my schedule", "What is on my schedule tomorrow"]
+    assert llm.cancelled == [first.generation_id, second.generation_id]
@@ -0,0 +1,366 @@
+import io
+import time
+import wave
+
+import pytest
+
+from conftest import load_module, load_service
+from stubs import AsgiServer, ollama_stub, silence_wav, transcriber_stub, tts_stub
+
+streaming = load_module("orchestrator", "streaming")
+SentenceSplitter = streaming.SentenceSplitter
+wav_stream_header = streaming.wav_stream_header
+
+ANSWER = (
+    "Sure, let's look at your day together. You have a standup at nine and a "
+    "design review after lunch. Try to block an hour for focused work this "
+    "afternoon. Good luck, you've got this!"
+)
+
+
+def test_splitter_cuts_on_sentence_boundaries():
+    splitter = SentenceSplitter()
+    sentences = []
+    for word in ANSWER.split():
+        sentences += splitter.feed(word + " ")
+    sentences += splitter.flush()
+
+    assert sentences[0] == "Sure, let's look at your day together."
+    assert len(sentences) == 4
+    assert " ".join(sentences) == ANSWER
+
+
+def test_splitter_merges_short_fragments():
+    splitter = SentenceSplitter(min_chars=20)
+    assert splitter.feed("Hi. ") == []
+    assert splitter.feed("How can I help you today? ") == ["Hi. How can I help you today?"]
+    assert splitter.flush() == []
+
+
+def test_stream_header_is_a_valid_wav_prefix():
+    header = wav_stream_header()
+    assert len(header) == 44
+    assert header[:4] == b"RIFF" and header[8:12] == b"WAVE" and header[36:40] == b"data"
+
+
+def test_first_audio_arrives_before_llm_finishes():
+    pytest.importorskip("quart")
+    pytest.importorskip("hypercorn")
+    requests = pytest.importorskip("requests")
+    orchestrator = load_service("orchestrator")
+
+    token_delay = 0.03
+    generation_time = token_delay * len(ANSWER.split())
+
+    with transcriber_stub() as transcriber, ollama_stub(ANSWER, token_delay) as ollama, tts_stub() as tts:
+        orchestrator.transcriber.base_url = transcriber.url
+        orchestrator.ollama.base_url = ollama.url
+        orchestrator.tts.base_url = tts.url
+
+        with AsgiServer(orchestrator.app) as server:
+            start = time.monotonic()
+            response = requests.post(
+                f"{server.url}/process_audio/stream",
+                files={"file": ("input.wav", silence_wav(1.0), "audio/wav")},
+                stream=True,
+            )
+            body = b""
+            chunks = response.iter_content(chunk_size=None)
+            while len(body) <= 44:
+                body += next(chunks)
+            time_to_first_audio = time.monotonic() - start
+            body += b"".join(chunks)
+
+    assert response.status_code == 200
+    assert body[:44] == wav_stream_header()
+    assert time_to_first_audio < generation_time / 2
+    assert len(body) > 44 + 2 * 16000 * 0.5
+
+
+def test_process_audio_saves_answer_for_play_response():
+    pytest.importorskip("quart")
+    pytest.importorskip("hypercorn")
+    requests = pytest.importorskip("requests")
+    orchestrator = load_service("orchestrator")
+    seconds_per_char = 0.01
+
+    with transcriber_stub() as transcriber, ollama_stub(ANSWER) as ollama, \
+            tts_stub(seconds_per_char=seconds_per_char) as tts:
+        orchestrator.transcriber.base_url = transcriber.url
+        orchestrator.ollama.base_url = ollama.url
+        orchestrator.tts.base_url = tts.url
+
+        with AsgiServer(orchestrator.app) as server:
+            result = requests.post(
+                f"{server.url}/process_audio",
+                files={"file": ("input.wav", silence_wav(1.0), "audio/wav")},
+            ).json()
+            played = requests.get(f"{server.url}{result['audio_url']}")
+            seeked = requests.get(f"{server.url}{result['audio_url']}", headers={"Range": "bytes=44-1043"})
+            replayed = requests.get(f"{server.url}{result['audio_url']}",
+                                    headers={"If-None-Match": played.headers["ETag"]})
+            missing = requests.get(f"{server.url}/play_response/converted_tts_unknown.wav")
+
+    assert result["response_text"] == ANSWER
+    assert result["session_id"]
+    assert played.status_code == 200
+    with wave.open(io.BytesIO(played.content)) as wf:
+        assert wf.getframerate() == 16000
+        assert wf.getnframes() == int(len(ANSWER) * seconds_per_char * 16000)
+    assert seeked.status_code == 206 and seeked.content == played.content[44:1044]
+    assert seeked.headers["Content-Range"] == f"bytes 44-1043/{len(played.content)}"
+    assert replayed.status_code == 304 and not replayed.content
+    assert missing.status_code == 404
+
+
+def test_process_audio_fails_when_the_spoken_answer_breaks_off(tmp_path):
+    pytest.importorskip("quart")
+    pytest.importorskip("hypercorn")
+    requests = pytest.importorskip("requests")
+    orchestrator = load_service("orchestrator")
+    workspace = load_module("orchestrator", "workspace")
+    orchestrator.scratch = workspace.ScratchSpace(str(tmp_path))
+
+    with transcriber_stub() as transcriber, ollama_stub(ANSWER) as ollama, tts_stub(break_stream=True) as tts:
+        orchestrator.transcriber.base_url = transcriber.url
+        orchestrator.ollama.base_url = ollama.url
+        orchestrator.tts.base_url = tts.url
+
+        with AsgiServer(orchestrator.app) as server:
+            response = requests.post(
+                f"{server.url}/process_audio",
+                files={"file": ("input.wav", silence_wav(1.0), "audio/wav")},
+            )
+
+    assert response.status_code == 500
+    assert response.json()["error"] == "Speech synthesis failed"
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_process_audio_stream_breaks_off_when_a_sentence_fails():
+    pytest.importorskip("quart")
+    pytest.importorskip("hypercorn")
+    requests = pytest.importorskip("requests")
+    orchestrator = load_service("orchestrator")
+
+    with transcriber_stub() as transcriber, ollama_stub(ANSWER) as ollama, tts_stub(break_stream=True) as tts:
+        orchestrator.transcriber.base_url = transcriber.url
+        orchestrator.ollama.base_url = ollama.url
+        orchestrator.tts.base_url = tts.url
+
+        with AsgiServer(orchestrator.app) as server:
+            response = requests.post(
+                f"{server.url}/process_audio/stream",
+                files={"file": ("input.wav", silence_wav(1.0), "audio/wav")},
+                stream=True,
+            )
+            # The first sentence is played, then the body ends without its final chunk
+            with pytest.raises(requests.exceptions.ChunkedEncodingError):
+                b"".join(response.iter_content(chunk_size=None))
+
+    assert response.status_code == 200
+
+
+def test_process_audio_reports_stage_timings_and_passes_the_request_id_on():
+    pytest.importorskip("quart")
+    pytest.importorskip("hypercorn")
+    requests = pytest.importorskip("requests")
+    orchestrator = load_service("orchestrator")
+
+    with transcriber_stub(delay=0.05) as transcriber, ollama_stub(ANSWER) as ollama, tts_stub() as tts:
+        orchestrator.transcriber.base_url = transcriber.url
+        orchestrator.ollama.base_url = ollama.url
+        orchestrator.tts.base_url = tts.url
+
+        with AsgiServer(orchestrator.app) as server:
+            response = requests.post(
+                f"{server.url}/process_audio",
+                files={"file": ("input.wav", silence_wav(1.0), "audio/wav")},
+                headers={"X-Request-ID": "turn-42"},
+            )
+            metrics = requests.get(f"{server.url}/metrics").text
+
+    timings = response.json()["timings"]
+    assert {"upload", "conversion", "transcription", "llm", "tts", "total"} <= set(timings)
+    assert timings["transcription"] >= 50
+    assert timings["total"] >= timings["transcription"] + timings["llm"] + timings["tts"]
+    assert response.headers["X-Request-ID"] == "turn-42"
+    assert transcriber.request_ids == ollama.request_ids == tts.request_ids == ["turn-42"]
+    assert 'stage_duration_seconds_count{stage="transcription"}' in metrics
+    assert 'http_request_duration_seconds_count{method="POST",endpoint="/process_audio",status="200"}' in metrics
+
+
+def test_audio_travels_between_services_as_frames(monkeypatch):
+    pytest.importorskip("quart")
+    pytest.importorskip("hypercorn")
+    requests = pytest.importorskip("requests")
+    orchestrator = load_service("orchestrator")
+    monkeypatch.setattr(orchestrator, "AUDIO_FRAMES", "pcm")
+    uploads = []
+    seconds_per_char = 0.01
+
+    def transcribe(body):
+        uploads.append(body)
+        return "What is on my schedule today?"
+
+    with transcriber_stub(transcribe) as transcriber, ollama_stub(ANSWER) as ollama, \
+            tts_stub(seconds_per_char=seconds_per_char) as tts:
+        orchestrator.transcriber.base_url = transcriber.url
+        orchestrator.ollama.base_url = ollama.url
+        orchestrator.tts.base_url = tts.url
+
+        with AsgiServer(orchestrator.app) as server:
+            result = requests.post(
+                f"{server.url}/process_audio",
+                files={"file": ("input.wav", silence_wav(1.0), "audio/wav")},
+            ).json()
+            played = requests.get(f"{server.url}{result['audio_url']}")
+
+    # One second of 16 kHz PCM in 20 ms frames with a 16 byte header each
+    assert uploads[0][:2] == b"AF" and len(uploads[0]) == 32000 + 50 * 16
+    with wave.open(io.BytesIO(played.content)) as wf:
+        assert wf.getnframes() == int(len(ANSWER) * seconds_per_char * 16000)
+
+
+def test_audio_is_transcribed_while_it_is_still_being_uploaded():
+    pytest.importorskip("quart")
+    pytest.importorskip("hypercorn")
+    requests = pytest.importorskip("requests")
+    orchestrator = load_service("orchestrator")
+    piece = b"\x01\x00" * 1600  # 100 ms
+    received = []
+
+    def recording():
+        for _ in range(20):
+            yield piece
+            time.sleep(0.05)
+        received.append(time.monotonic())
+
+    with transcriber_stub(lambda body: f"{len(body)} bytes") as transcriber, ollama_stub(ANSWER) as ollama, \
+            tts_stub() as tts:
+        orchestrator.transcriber.base_url = transcriber.url
+        orchestrator.ollama.base_url = ollama.url
+        orchestrator.tts.base_url = tts.url
+
+        with AsgiServer(orchestrator.app) as server:
+            response = requests.post(
+                f"{server.url}/process_audio/stream",
+                data=recording(),
+                headers={"Content-Type": "audio/L16; rate=16000", "X-Session-ID": "abc"},
+            )
+
+    upload_done = received[0]
+    assert response.status_code == 200
+    assert response.headers["X-Transcript"] == f"{20 * len(piece)}%20bytes"
+    assert response.headers["X-Session-ID"] == "abc"
+    assert len(response.content) > 44
+    # Pieces reached the transcriber before the client had finished sending
+    assert transcriber.feeds[0][0] < upload_done
+    assert sum(size for _, size in transcriber.feeds) == 20 * len(piece)
+
+
+def speak(orchestrator, transcriber, ollama, tts, requests):
+    """Upload two seconds of PCM in 100 ms pieces to /process_audio/stream."""
+    piece = b"\x01\x00" * 1600
+
+    def recording():
+        for _ in range(20):
+            yield piece
+            time.sleep(0.05)
+
+    orchestrator.transcriber.base_url = transcriber.url
+    orchestrator.ollama.base_url = ollama.url
+    orchestrator.tts.base_url = tts.url
+    with AsgiServer(orchestrator.app) as server:
+        return requests.post(
+            f"{server.url}/process_audio/stream",
+            data=recording(),
+            headers={"Content-Type": "audio/L16; rate=16000", "X-Session-ID": "abc"},
+        )
+
+
+def test_answer_started_on_a_stable_partial_transcript_is_kept(monkeypatch):
+    pytest.importorskip("quart")
+    pytest.importorskip("hypercorn")
+    requests = pytest.importorskip("requests")
+    orchestrator = load_service("orchestrator")
+    monkeypatch.setattr(orchestrator, "SPECULATIVE_LLM", True)
+    monkeypatch.setattr(orchestrator, "SPECULATE_AFTER_FEEDS", 2)
+
+    def partial(audio):
+        return "what is on my schedule today" if len(audio) >= 32000 else "what is on"
+
+    with transcriber_stub("What is on my schedule today?", partial=partial) as transcriber, \
+            ollama_stub(ANSWER) as ollama, tts_stub() as tts:
+        response = speak(orchestrator, transcriber, ollama, tts, requests)
+
+    assert response.status_code == 200
+    assert response.headers["X-Speculation"] == "hit"
+    assert len(response.content) > 44 + 2 * 16000
+    # One generation, started before the final transcript and then committed
+    [generation] = ollama.requests
+    assert generation["speculative"] is True
+    assert generation["prompt"] == "what is on my schedule today"
+    assert ollama.committed == [generation["generation_id"]]
+    assert ollama.cancelled == []
+
+
+def test_answer_to_a_partial_transcript_is_dropped_when_the_user_goes_on(monkeypatch):
+    pytest.importorskip("quart")
+    pytest.importorskip("hypercorn")
+    requests = pytest.importorskip("requests")
+    orchestrator = load_service("orchestrator")
+    monkeypatch.setattr(orchestrator, "SPECULATIVE_LLM", True)
+    monkeypatch.setattr(orchestrator, "SPECULATE_AFTER_FEEDS", 2)
+
+    with transcriber_stub("What is on my schedule tomorrow?", partial=lambda audio: "What is on my schedule") \
+            as transcriber, ollama_stub(ANSWER, token_delay=0.05) as ollama, tts_stub() as tts:
+        response = speak(orchestrator, transcriber, ollama, tts, requests)
+        deadline = time.monotonic() + 3
+        while len(ollama.outcomes) < 2 and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+    assert response.status_code == 200
+    assert response.headers["X-Speculation"] == "miss"
+    speculative, fresh = ollama.requests
+    assert speculative["speculative"] is True and "speculative" not in fresh
+    assert fresh["prompt"] == "What is on my schedule tomorrow?"
+    assert ollama.cancelled == [speculative["generation_id"]]
+    # Stopped by the DELETE or by hanging up, whichever got there first
+    assert len(ollama.outcomes) == 2 and ollama.outcomes.count("completed") == 1
+    assert ollama.committed == []
+
+
+def test_hanging_up_stops_generation_downstream():
+    pytest.importorskip("quart")
+    pytest.importorskip("hypercorn")
+    requests = pytest.importorskip("requests")
+    orchestrator = load_service("orchestrator")
+    long_answer = " ".join(["This goes on and on."] * 100)
+
+    with transcriber_stub() as transcriber, ollama_stub(long_answer, token_delay=0.02) as ollama, \
+            tts_stub() as tts:
+        orchestrator.transcriber.base_url = transcriber.url
+        orchestrator.ollama.base_url = ollama.url
+        orchestrator.tts.base_url = tts.url
+
+        with AsgiServer(orchestrator.app) as server:
+            response = requests.post(
+                f"{server.url}/process_audio/stream",
+                files={"file": ("input.wav", silence_wav(1.0), "audio/wav")},
+                stream=True,
+            )
+            received = 0
+            for chunk in response.iter_content(chunk_size=None):
+                received += len(chunk)
+                if received > 44:  # past the WAV header: the answer is being spoken
+                    break
+            # The user started talking over the answer
+            response.close()
+
+            deadline = time.monotonic() + 3
+            while not ollama.outcomes and time.monotonic() < deadline:
+                time.sleep(0.05)
+
+    # 500 tokens would take 10 s; the stream was abandoned long before that
+    assert ollama.outcomes == ["aborted"]
@@ -0,0 +1,82 @@
+import pytest
+
+from conftest import load_module
+
+np = pytest.importorskip("numpy")
+streaming = load_module("transcriber", "streaming")
+
+RATE = 16000
+
+
+def spoken_seconds(first, count):
+    """Audio where every second carries its own index as the sample value."""
+    return np.repeat(np.arange(first, first + count, dtype=np.float32) / 100, RATE)
+
+
+def fake_whisper(window):
+    """One segment per whole second, named after the index encoded in it."""
+    segments = []
+    for second in range(len(window) // RATE):
+        word = int(round(window[second * RATE] * 100))
+        segments.append({"start": float(second), "end": float(second + 1), "text": f" w{word}"})
+    return {"segments": segments}
+
+
+def test_stable_segments_are_committed_and_tail_stays_partial():
+    stream = streaming.StreamingTranscriber(fake_whisper, step_seconds=1.0, commit_margin=1.0)
+    result = stream.feed(spoken_seconds(0, 3))
+
+    assert [s["text"] for s in result["segments"]] == ["w0", "w1"]
+    assert result["partial"] == "w2"
+    assert result["text"] == "w0 w1 w2" and not result["final"]
+    # Committed audio left the window, so it isn't decoded again
+    assert len(stream.window) == RATE and stream.offset == 2.0
+
+
+def test_timestamps_stay_absolute_across_windows():
+    stream = streaming.StreamingTranscriber(fake_whisper, step_seconds=1.0, commit_margin=1.0)
+    stream.feed(spoken_seconds(0, 3))
+    result = stream.feed(spoken_seconds(3, 2))
+
+    assert [s["text"] for s in result["segments"]] == ["w0", "w1", "w2", "w3"]
+    assert result["segments"][-1] == {"start": 3.0, "end": 4.0, "text": "w3"}
+
+
+def test_no_decode_until_a_step_of_new_audio():
+    calls = []
+
+    def counting(window):
+        calls.append(len(window))
+        return fake_whisper(window)
+
+    stream = streaming.StreamingTranscriber(counting, step_seconds=1.0)
+    for _ in range(3):
+        stream.feed(np.zeros(RATE // 4, dtype=np.float32))
+    assert calls == []
+    stream.feed(np.zeros(RATE // 4, dtype=np.float32))
+    assert calls == [RATE]
+
+
+def test_finish_commits_everything():
+    stream = streaming.StreamingTranscriber(fake_whisper, step_seconds=10.0)
+    stream.feed(spoken_seconds(0, 3))
+    result = stream.finish()
+
+    assert result["final"] and result["partial"] == ""
+    assert result["text"] == "w0 w1 w2"
+
+
+def test_window_stays_bounded_without_speech():
+    stream = streaming.StreamingTranscriber(lambda window: {"segments": []},
+                                            step_seconds=1.0, max_window_seconds=5.0)
+    for _ in range(10):
+        stream.feed(np.zeros(RATE, dtype=np.float32))
+    assert len(stream.window) <= 5 * RATE
+    assert stream.offset == 5.0
+
+
+def test_idle_sessions_expire():
+    sessions = streaming.StreamSessions(lambda: "transcriber", ttl=0)
+    first = sessions.create()
+    sessions.create()
+    assert sessions.get(first) is None
@@ -0,0 +1,153 @@
+import io
+import shutil
+import time
+import wave
+
+import pytest
+
+from conftest import load_service
+
+pytest.importorskip("flask")
+pytest.importorskip("numpy")
+
+
+@pytest.fixture
+def tts():
+    return load_service("TTS")
+
+
+class ToneEngine:
+    """Offline stand-in engine: 10 ms of PCM per character."""
+
+    name = "tone"
+    calls = 0
+
+    def synthesize(self, text, lang="en", voice=None):
+        ToneEngine.calls += 1
+        return b"\x01\x00" * 160 * len(text)
+
+
+@pytest.fixture
+def tone_engine(tts, monkeypatch):
+    ToneEngine.calls = 0
+    monkeypatch.setattr(tts, "audio_cache", tts.AudioCache(None))
+    monkeypatch.setitem(tts.engines.ENGINES, "tone", ToneEngine)
+    monkeypatch.setattr(tts.engines, "_instances", {})
+    monkeypatch.setattr(tts, "TTS_ENGINE", "tone")
+    return ToneEngine
+
+
+def test_synthesize_wraps_engine_pcm_in_a_16k_wav(tts, tone_engine):
+    response = tts.app.test_client().post("/synthesize", json={"text": "hello there"})
+    assert response.status_code == 200
+    with wave.open(io.BytesIO(response.data)) as wf:
+        assert (wf.getnchannels(), wf.getsampwidth(), wf.getframerate()) == (1, 2, 16000)
+        assert wf.getnframes() == 160 * len("hello there")
+
+
+def test_repeated_phrases_are_served_from_cache(tts, tone_engine):
+    client = tts.app.test_client()
+    first = client.post("/synthesize", json={"text": "I'm sorry, I couldn't process that."})
+    second = client.post("/synthesize", json={"text": "i'm sorry,  I couldn't process that. "})
+
+    assert first.headers["X-Cache"] == "miss" and second.headers["X-Cache"] == "hit"
+    assert first.data == second.data
+    assert tone_engine.calls == 1
+    stats = client.get("/cache/stats").get_json()
+    assert (stats["hits_memory"], stats["misses"]) == (1, 1)
+
+
+def test_metrics_tell_synthesis_from_cache_hits(tts, tone_engine):
+    client = tts.app.test_client()
+    for _ in range(3):
+        response = client.post("/synthesize", json={"text": "Same again."}, headers={"X-Request-ID": "abc-1"})
+    metrics = client.get("/metrics")
+
+    assert response.headers["X-Request-ID"] == "abc-1"
+    assert metrics.mimetype == "text/plain"
+    assert 'stage_duration_seconds_count{stage="synthesis"}' in metrics.get_data(as_text=True)
+    assert 'stage_duration_seconds_count{stage="cache_hit"}' in metrics.get_data(as_text=True)
+
+
+def test_unknown_engine_is_rejected(tts):
+    response = tts.app.test_client().post("/synthesize", json={"text": "hi", "engine": "nope"})
+    assert response.status_code == 400
+    assert "Unknown TTS engine" in response.get_json()["error"]
+
+
+@pytest.mark.skipif(shutil.which("espeak-ng") is None, reason="espeak-ng not installed")
+def test_espeak_engine_runs_offline(tts):
+    pcm = tts.engines.EspeakEngine().synthesize("Testing one two three.")
+    assert len(pcm) > 16000
+
+
+class SlowEngine:
+    """Takes 200 ms per sentence and encodes the sentence's first letter."""
+
+    name = "slow"
+
+    def synthesize(self, text, lang="en", voice=None):
+        time.sleep(0.2)
+        return text[0].encode() * 2 * 1600
+
+
+def test_stream_returns_sentences_in_order_and_in_parallel(tts, monkeypatch):
+    monkeypatch.setitem(tts.engines.ENGINES, "slow", SlowEngine)
+    monkeypatch.setattr(tts.engines, "_instances", {})
+    monkeypatch.setattr(tts, "audio_cache", tts.AudioCache(None))
+    text = "Alpha one. Bravo two! Charlie three? Delta four."
+
+    start = time.monotonic()
+    response = tts.app.test_client().post("/synthesize/stream", json={"text": text, "engine": "slow"})
+    body = response.get_data()
+    elapsed = time.monotonic() - start
+
+    assert response.status_code == 200
+    assert response.headers["Content-Type"].startswith("audio/L16")
+    assert response.headers["X-Sentences"] == "4"
+    assert body == b"".join(letter * 3200 for letter in (b"A", b"B", b"C", b"D"))
+    assert elapsed < 0.6
+
+
+def test_stream_sends_audio_frames_when_asked(tts, monkeypatch):
+    monkeypatch.setitem(tts.engines.ENGINES, "slow", SlowEngine)
+    monkeypatch.setattr(tts.engines, "_instances", {})
+    monkeypatch.setattr(tts, "audio_cache", tts.AudioCache(None))
+    client = tts.app.test_client()
+    text = "Alpha one. Bravo two!"
+    accept = {"Accept": tts.audio_frames.CONTENT_TYPE}
+
+    response = client.post("/synthesize/stream", json={"text": text, "engine": "slow"}, headers=accept)
+    decoder = tts.audio_frames.FrameDecoder()
+    frames = decoder.feed(response.get_data())
+    decoder.finish()
+
+    assert response.headers["Content-Type"] == tts.audio_frames.CONTENT_TYPE
+    assert b"".join(frame.payload for frame in frames) == b"A" * 3200 + b"B" * 3200
+    assert [frame.seq for frame in frames] == list(range(10))
+
+    unknown = client.post("/synthesize/stream", json={"text": text, "codec": "mp3"}, headers=accept)
+    assert unknown.status_code == 400
+
+
+class BrokenEngine(SlowEngine):
+    """Fails on sentences starting with "B"."""
+
+    name = "broken"
+
+    def synthesize(self, text, lang="en", voice=None):
+        if text.startswith("B"):
+            raise RuntimeError("engine crashed")
+        return super().synthesize(text, lang, voice)
+
+
+def test_stream_breaks_off_when_a_sentence_fails(tts, monkeypatch):
+    monkeypatch.setitem(tts.engines.ENGINES, "broken", BrokenEngine)
+    monkeypatch.setattr(tts.engines, "_instances", {})
+    monkeypatch.setattr(tts, "audio_cache", tts.AudioCache(None))
+
+    response = tts.app.test_client().post("/synthesize/stream", json={"text": "Alpha one. Bravo two.",
+                                                                      "engine": "broken"})
+    # The server drops the connection instead of ending the body cleanly
+    with pytest.raises(RuntimeError, match="engine crashed"):
+        response.get_data()
@@ -0,0 +1,59 @@
+import threading
+
+from conftest import load_module
+
+turn = load_module("client", "turn")
+
+
+class EndlessAnswer:
+    """Streamed response that keeps speaking until it's closed."""
+
+    status_code = 200
+    headers = {"X-Transcript": "Tell%20me%20a%20story"}
+
+    def __init__(self):
+        self.closed = threading.Event()
+
+    def iter_content(self, chunk_size):
+        yield b"\x00" * 44
+        while not self.closed.wait(0.01):
+            yield b"\x01\x00" * 160
+
+    def close(self):
+        self.closed.set()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class FakeConversation:
+    def __init__(self):
+        self.uploaded = []
+        self.response = EndlessAnswer()
+
+    def stream_turn(self, chunks, rate):
+        self.uploaded.extend(chunks)
+        return self.response
+
+
+def test_turn_uploads_then_plays_until_cancelled():
+    conversation = FakeConversation()
+    played = threading.Event()
+    t = turn.Turn(conversation, write=lambda pcm: played.set(), jitter_bytes=640)
+    t.start()
+
+    t.send(b"speech")
+    assert not t.answering
+    t.end_of_speech()
+    assert played.wait(2)
+    assert t.answering and t.transcript == "Tell me a story"
+
+    # Barge-in: playback stops and the connection is dropped
+    t.cancel()
+    t.join(2)
+    assert not t.is_alive()
+    assert conversation.uploaded == [b"speech"]
+    assert conversation.response.closed.is_set()
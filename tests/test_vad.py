@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from conftest import load_module
+
+pytest.importorskip("numpy")
+vad = load_module("client", "vad")
+
+RATE = 16000
+
+
+def noise(seconds, level_db, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.normal(0, 10 ** (level_db / 20), int(seconds * RATE))
+
+
+def tone(seconds, level_db, frequency=220):
+    t = np.arange(int(seconds * RATE)) / RATE
+    return np.sqrt(2) * 10 ** (level_db / 20) * np.sin(2 * np.pi * frequency * t)
+
+
+def pcm(*parts):
+    return (np.clip(np.concatenate(parts), -1, 1) * 32767).astype(np.int16).tobytes()
+
+
+def run(detector, data, chunk=2048):
+    """Feed ``data`` in microphone-sized chunks; return (event, byte offset, pcm)."""
+    events = []
+    for offset in range(0, len(data), chunk):
+        for event, audio in detector.feed(data[offset:offset + chunk]):
+            events.append((event, offset + chunk, audio))
+    return events
+
+
+def test_frame_features_are_computed_per_frame():
+    samples = np.frombuffer(pcm(tone(0.02, -20), np.zeros(320)), dtype=np.int16)
+    energy, zcr = vad.frame_features(samples, 320)
+
+    assert energy[0] == pytest.approx(-20, abs=0.5)
+    assert energy[1] == pytest.approx(-90)
+    assert zcr[0] == pytest.approx(2 * 220 / RATE, abs=0.005)
+
+
+def test_utterance_ends_within_the_hangover():
+    data = pcm(noise(1.0, -60), tone(1.0, -20) + noise(1.0, -60, 1), noise(1.0, -60, 2))
+    events = run(vad.VoiceActivityDetector(), data)
+
+    kinds = [event for event, _, _ in events]
+    assert kinds[0] == "start" and kinds[-1] == "end" and kinds.count("end") == 1
+    speech_end = 2.0 * RATE * 2
+    end_at = events[-1][1]
+    # Detected by the end of the chunk in which 300 ms of silence completes
+    assert speech_end + 0.3 * RATE * 2 <= end_at <= speech_end + (0.3 * RATE + 2048) * 2
+
+
+def test_pre_roll_and_quiet_frames_are_kept():
+    data = pcm(noise(1.0, -60), tone(0.5, -20), noise(0.2, -60, 1), tone(0.5, -20), noise(1.0, -60, 2))
+    events = run(vad.VoiceActivityDetector(pre_roll_ms=300), data)
+
+    assert [event for event, _, _ in events].count("start") == 1
+    start_audio = events[0][2]
+    utterance = b"".join(audio for _, _, audio in events)
+    # Pre-roll reaches back before the onset, and the 200 ms pause is not dropped
+    assert len(start_audio) >= 0.3 * RATE * 2
+    assert len(utterance) >= (0.3 + 0.5 + 0.2 + 0.5) * RATE * 2
+
+
+def test_hiss_and_steady_background_do_not_trigger():
+    hiss = noise(2.0, -25)
+    events = run(vad.VoiceActivityDetector(), pcm(noise(0.5, -60), hiss))
+
+    assert events == []
+
+
+def test_noise_floor_adapts_to_louder_rooms():
+    detector = vad.VoiceActivityDetector(max_zcr=1.0)
+    run(detector, pcm(noise(0.5, -60), noise(4.0, -35, 1)))
+
+    assert detector.noise_floor == pytest.approx(-35, abs=2)
+    assert not detector.in_speech
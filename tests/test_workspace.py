@@ -0,0 +1,109 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import unquote
+
+import pytest
+
+from conftest import load_module, load_service
+from stubs import AsgiServer, ollama_stub, silence_wav, transcriber_stub, tts_stub
+
+workspace = load_module("orchestrator", "workspace")
+
+FRAMES_PER_STEP = 1600
+
+
+def test_unique_paths_differ_and_are_not_created(tmp_path):
+    scratch = workspace.ScratchSpace(str(tmp_path))
+    first, second = scratch.unique_path("converted_tts_"), scratch.unique_path("converted_tts_")
+    assert first != second
+    assert os.path.dirname(first) == str(tmp_path)
+    assert os.path.basename(first).startswith("converted_tts_") and first.endswith(".wav")
+    assert os.listdir(tmp_path) == []
+
+
+def test_garbage_collection_only_expires_managed_files(tmp_path):
+    scratch = workspace.ScratchSpace(str(tmp_path), ttl=60)
+    stale = scratch.unique_path("converted_tts_")
+    fresh = scratch.unique_path("converted_tts_")
+    foreign = str(tmp_path / "someone_elses.wav")
+    for path in (stale, fresh, foreign):
+        open(path, "wb").close()
+
+    old = time.time() - 120
+    for path in (stale, foreign):
+        os.utime(path, (old, old))
+
+    assert scratch.collect_garbage() == 1
+    assert not os.path.exists(stale)
+    assert os.path.exists(fresh) and os.path.exists(foreign)
+
+
+def _transcript_for_upload(body):
+    # Each client uploads a different number of frames (raw s16le); echo that back
+    return f"request {len(body) // 2 // FRAMES_PER_STEP}"
+
+
+def _answer_for(prompt):
+    return "okay " * int(prompt.split()[-1]) + "done."
+
+
+def test_concurrent_requests_do_not_cross_talk(tmp_path):
+    pytest.importorskip("quart")
+    pytest.importorskip("hypercorn")
+    requests = pytest.importorskip("requests")
+    orchestrator = load_service("orchestrator")
+    orchestrator.scratch = workspace.ScratchSpace(str(tmp_path))
+    seconds_per_char = 0.01
+
+    def run(n):
+        upload = silence_wav(n * FRAMES_PER_STEP / 16000)
+        response = requests.post(
+            f"{server.url}/process_audio/stream",
+            files={"file": ("input.wav", upload, "audio/wav")},
+        )
+        return n, unquote(response.headers["X-Transcript"]), len(response.content) - 44
+
+    with transcriber_stub(_transcript_for_upload, delay=0.05) as transcriber, \
+            ollama_stub(_answer_for, token_delay=0.002) as ollama, \
+            tts_stub(seconds_per_char=seconds_per_char) as tts:
+        orchestrator.transcriber.base_url = transcriber.url
+        orchestrator.ollama.base_url = ollama.url
+        orchestrator.tts.base_url = tts.url
+        with AsgiServer(orchestrator.app) as server, ThreadPoolExecutor(max_workers=16) as pool:
+            results = list(pool.map(run, range(1, 33)))
+
+    for n, transcript, pcm_bytes in results:
+        assert transcript == f"request {n}"
+        answer = _answer_for(transcript)
+        assert pcm_bytes == 2 * int(len(answer) * seconds_per_char * 16000)
+    assert os.listdir(tmp_path) == []
+
+
+def test_answers_kept_for_play_response_expire(tmp_path):
+    pytest.importorskip("quart")
+    pytest.importorskip("hypercorn")
+    requests = pytest.importorskip("requests")
+    orchestrator = load_service("orchestrator")
+    orchestrator.scratch = workspace.ScratchSpace(str(tmp_path), ttl=60, sweep_interval=0)
+
+    def process():
+        return requests.post(
+            f"{server.url}/process_audio",
+            files={"file": ("input.wav", silence_wav(0.2), "audio/wav")},
+        ).json()["audio_file"]
+
+    with transcriber_stub() as transcriber, ollama_stub("Sure.", token_delay=0) as ollama, tts_stub() as tts:
+        orchestrator.transcriber.base_url = transcriber.url
+        orchestrator.ollama.base_url = ollama.url
+        orchestrator.tts.base_url = tts.url
+        with AsgiServer(orchestrator.app) as server:
+            old = [process() for _ in range(10)]
+            # Let the first answers age past the TTL
+            expired = time.time() - 120
+            for name in old:
+                os.utime(tmp_path / name, (expired, expired))
+            new = [process() for _ in range(10)]
+
+    assert sorted(os.listdir(tmp_path)) == sorted(new)
+    assert not set(old) & set(os.listdir(tmp_path))
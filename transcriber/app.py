@@ -1,61 +1,246 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, g
 import whisper
+import torch
+import numpy as np
 import os
-import tempfile
+import threading
+import time
+import audio_frames
+import audio_input
+from batcher import MicroBatcher
+from metrics import CONTENT_TYPE, REQUEST_ID_HEADER, Registry, StageTimer, request_id
+from models import ModelManager, UnknownModelError
+from streaming import StreamingTranscriber, StreamSessions
 
 app = Flask(__name__)
 
-# Load the Whisper model at startup
-try:
-    print("Loading Whisper model...")
-    model = whisper.load_model("base")  # Make sure this line doesn't conflict with local file names
-    print("Model loaded successfully!")
-except Exception as e:
-    print(f"Error loading model: {e}")
-    # Continue anyway so Flask can start - we'll handle the error in the endpoint
-# Add this route to your transcriber/app.py
+# Requests arriving within BATCH_MAX_WAIT_MS of each other are decoded together
+BATCH_MAX_SIZE = int(os.environ.get("BATCH_MAX_SIZE", "8"))
+BATCH_MAX_WAIT_MS = int(os.environ.get("BATCH_MAX_WAIT_MS", "30"))
+
+# Streaming sessions re-transcribe every STREAM_STEP_SECONDS of new audio
+STREAM_STEP_SECONDS = float(os.environ.get("STREAM_STEP_SECONDS", "1.0"))
+STREAM_SESSION_TTL = int(os.environ.get("STREAM_SESSION_TTL", "60"))
+
+# Whisper sizes a request may pick with ?model=; at most WHISPER_MAX_RESIDENT
+# stay in memory, and WHISPER_PRELOAD are loaded in the background at startup
+WHISPER_MODEL = os.environ.get("WHISPER_MODEL", "base")
+WHISPER_MODELS = os.environ.get("WHISPER_MODELS", "tiny,base,small").split(",")
+WHISPER_MAX_RESIDENT = int(os.environ.get("WHISPER_MAX_RESIDENT", "2"))
+WHISPER_PRELOAD = os.environ.get("WHISPER_PRELOAD", WHISPER_MODEL).split(",")
+
+class WhisperRunner:
+    """A loaded Whisper model with its own lock and request batcher."""
+
+    def __init__(self, name):
+        print(f"Loading Whisper model {name}...")
+        self.name = name
+        self.model = whisper.load_model(name)
+        # The model is shared by the batch worker and long-audio requests
+        self.lock = threading.Lock()
+        self.batcher = MicroBatcher(self.transcribe_batch, max_batch_size=BATCH_MAX_SIZE,
+                                    max_wait_ms=BATCH_MAX_WAIT_MS, name=f"whisper-{name}")
+        self.warm_up()
+        print(f"Model {name} loaded successfully!")
+
+    def warm_up(self):
+        # Pay one-off allocation costs now instead of on the first request
+        self.transcribe_batch([np.zeros(audio_input.SAMPLE_RATE, dtype=np.float32)])
+
+    def transcribe_batch(self, audios):
+        """Decode up to 30 s clips (float32, 16 kHz) in a single batched forward pass."""
+        model = self.model
+        mels = torch.stack([
+            whisper.log_mel_spectrogram(whisper.pad_or_trim(audio), n_mels=model.dims.n_mels)
+            for audio in audios
+        ]).to(model.device)
+        options = whisper.DecodingOptions(fp16=model.device.type != "cpu")
+
+        with self.lock:
+            results = whisper.decode(model, mels, options)
+
+        return [{
+            "text": result.text,
+            "language": result.language,
+            # Batched decoding yields one segment spanning the clip
+            "segments": [{
+                "id": 0,
+                "start": 0.0,
+                "end": len(audio) / whisper.audio.SAMPLE_RATE,
+                "text": result.text,
+                "avg_logprob": result.avg_logprob,
+                "no_speech_prob": result.no_speech_prob,
+            }],
+        } for audio, result in zip(audios, results)]
+
+    def transcribe(self, audio):
+        if len(audio) <= whisper.audio.N_SAMPLES:
+            # Short utterances share a batched decode with concurrent requests
+            return self.batcher.submit(audio).result()
+        # Longer audio needs Whisper's sliding 30 s window
+        with self.lock:
+            return self.model.transcribe(audio)
+
+    def transcribe_window(self, audio):
+        with self.lock:
+            return self.model.transcribe(audio, condition_on_previous_text=False)
+
+    def close(self):
+        self.batcher.close()
+
+models = ModelManager(WhisperRunner, default=WHISPER_MODEL, allowed=WHISPER_MODELS,
+                      max_resident=WHISPER_MAX_RESIDENT)
+models.preload(WHISPER_PRELOAD)
+
+# Served on /metrics for Prometheus to scrape
+registry = Registry()
+request_seconds = registry.histogram(
+    "http_request_duration_seconds", "Time until the response headers were sent",
+    ("method", "endpoint", "status"))
+stage_seconds = registry.histogram(
+    "stage_duration_seconds", "Time spent decoding and transcribing audio", ("stage",))
+
+@app.before_request
+def start_request():
+    g.request_id = request_id(request.headers.get(REQUEST_ID_HEADER))
+    g.started = time.perf_counter()
+
+@app.after_request
+def finish_request(response):
+    endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+    request_seconds.observe(time.perf_counter() - g.started, method=request.method,
+                            endpoint=endpoint, status=response.status_code)
+    response.headers[REQUEST_ID_HEADER] = g.request_id
+    return response
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    return registry.render(), 200, {"Content-Type": CONTENT_TYPE}
+
+def requested_model():
+    return request.args.get('model') or request.headers.get('X-Whisper-Model')
 
 @app.route('/health', methods=['GET'])
 def health_check():
-    # Check if model is loaded successfully
-    if 'model' in globals():
-        return jsonify({"status": "healthy", "model_loaded": True}), 200
-    else:
-        return jsonify({"status": "unhealthy", "model_loaded": False}), 500
-    
+    # Liveness: the process is up, models may still be loading
+    return jsonify({"status": "healthy", "model_loaded": models.is_ready(), **models.status()}), 200
+
+@app.route('/ready', methods=['GET'])
+def readiness_check():
+    # Readiness: the default model is loaded and warmed up
+    if models.is_ready():
+        return jsonify({"status": "ready", **models.status()}), 200
+    return jsonify({"status": "loading", **models.status()}), 503
+
+def read_audio():
+    """Decode the request body to float32 samples; returns (audio, error).
+
+    Accepts raw PCM (``audio/L16; rate=16000``, ``audio/pcm`` or
+    ``application/octet-stream``), 16 kHz mono audio frames
+    (``application/x-audio-frames``), a WAV body (``audio/wav``) or a
+    multipart upload in the ``audio`` or ``file`` field.
+    """
+    mimetype = request.mimetype
+    if mimetype in audio_input.PCM_CONTENT_TYPES or mimetype == audio_frames.CONTENT_TYPE:
+        return read_pcm_body()
+
+    if mimetype in audio_input.WAV_CONTENT_TYPES:
+        return audio_input.decode(request.get_data()), None
+
+    audio_file = request.files.get('audio') or request.files.get('file')
+    if audio_file is None:
+        return None, "No audio file provided"
+    return audio_input.decode(audio_file.read()), None
+
+def read_pcm_body():
+    """Samples of a raw PCM or framed body; returns (audio, error)."""
+    if request.mimetype == audio_frames.CONTENT_TYPE:
+        return audio_input.frames_to_float32(request.get_data())
+    error = audio_input.check_pcm_params(request.mimetype_params)
+    if error:
+        return None, error
+    return audio_input.pcm16_to_float32(request.get_data()), None
+
 @app.route('/transcribe', methods=['POST'])
 def transcribe_audio():
     try:
-        # Check if model is loaded
-        if 'model' not in globals():
-            return jsonify({"error": "Whisper model is not loaded"}), 500
+        # Loads the model first if this size isn't resident yet
+        runner = models.get(requested_model())
             
-        # Check if the post request has the file part
-        if 'audio' not in request.files:
-            return jsonify({"error": "No audio file provided"}), 400
-        
-        audio_file = request.files['audio']
+        timer = StageTimer(stage_seconds)
+        # Decode the upload in memory, no temp file or ffmpeg for PCM/WAV
+        with timer.stage("decode"):
+            audio, error = read_audio()
+        if error:
+            return jsonify({"error": error}), 400
         
-        # Save the uploaded file to a temporary file
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.wav') as temp:
-            temp_path = temp.name
-            audio_file.save(temp_path)
-        
-        # Transcribe the audio file
-        print(f"Transcribing file: {temp_path}")
-        result = model.transcribe(temp_path)
-        
-        # Clean up
-        os.unlink(temp_path)
+        print(f"[{g.request_id}] Transcribing {len(audio) / audio_input.SAMPLE_RATE:.2f}s of audio")
+
+        with timer.stage("transcribe"):
+            result = runner.transcribe(audio)
+        print(f"[{g.request_id}] Transcribed in {timer.timings['transcribe']:.0f} ms")
         
         # Return the transcription result
         return jsonify({
             "text": result["text"],
             "segments": result.get("segments", []),
+            "model": runner.name,
         })
         
+    except UnknownModelError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        print(f"[{g.request_id}] Error in transcribe_audio: {e}")
+        return jsonify({"error": str(e)}), 500
+
+stream_sessions = StreamSessions(
+    lambda runner: StreamingTranscriber(runner.transcribe_window, step_seconds=STREAM_STEP_SECONDS),
+    ttl=STREAM_SESSION_TTL
+)
+
+@app.route('/transcribe/stream', methods=['POST'])
+def start_stream():
+    """Open a streaming transcription session.
+
+    POST raw 16 kHz mono s16le (or audio frames) to
+    /transcribe/stream/<session_id> as it is captured; each call returns committed segments plus a partial
+    transcript of the audio still in the window. Add ``?final=1`` to the
+    last call (its body may be empty) to get the final transcript.
+    """
+    try:
+        runner = models.get(requested_model())
+    except UnknownModelError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": f"Whisper model is not loaded: {e}"}), 500
+    return jsonify({"session_id": stream_sessions.create(runner), "model": runner.name}), 201
+
+@app.route('/transcribe/stream/<session_id>', methods=['POST'])
+def feed_stream(session_id):
+    session = stream_sessions.get(session_id)
+    if session is None:
+        return jsonify({"error": "Unknown or expired session"}), 404
+    transcriber, lock = session
+
+    final = request.args.get('final', '').lower() in ('1', 'true', 'yes')
+
+    try:
+        samples, error = read_pcm_body()
+        if error:
+            return jsonify({"error": error}), 400
+        timer = StageTimer(stage_seconds)
+        # Frames of one session must be applied in order
+        with lock:
+            with timer.stage("stream_feed"):
+                result = transcriber.feed(samples) if len(samples) else transcriber.result(final=False)
+            if final:
+                with timer.stage("stream_finish"):
+                    result = transcriber.finish()
+                stream_sessions.close(session_id)
+        return jsonify(result)
+
     except Exception as e:
-        print(f"Error in transcribe_audio: {e}")
+        print(f"[{g.request_id}] Error in feed_stream: {e}")
         return jsonify({"error": str(e)}), 500
 
 if __name__ == '__main__':
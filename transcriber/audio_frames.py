@@ -0,0 +1,133 @@
+"""Framed audio for passing PCM or Opus between services.
+
+Each frame is a 16-byte little-endian header followed by its payload:
+
+    magic "AF" | codec (1 byte) | channels (1 byte) | sample rate (uint32)
+    | sequence number (uint32) | payload length (uint32)
+
+Frames delimit themselves, so any number of them can be concatenated in
+an HTTP body (chunked or not) or sent as WebSocket messages, and a reader
+can tell the format of every piece without a side channel. The sequence
+number shows frames that went missing.
+"""
+import struct
+from collections import namedtuple
+
+CONTENT_TYPE = "application/x-audio-frames"
+MAGIC = b"AF"
+HEADER = struct.Struct("<2sBBIII")
+CODECS = {"pcm": 0, "opus": 1}
+_CODEC_NAMES = {number: name for name, number in CODECS.items()}
+MAX_PAYLOAD = 1 << 20
+OPUS_RATES = (8000, 12000, 16000, 24000, 48000)
+
+Frame = namedtuple("Frame", "codec sample_rate channels seq payload")
+
+
+class FrameError(ValueError):
+    """The body isn't a valid stream of audio frames."""
+
+
+def _opus():
+    # Imported here so services run without opuslib unless Opus is used
+    import opuslib
+    return opuslib
+
+
+class FrameEncoder:
+    """Cut a stream of s16le PCM into frames of ``frame_ms`` each.
+
+    With the ``opus`` codec every frame carries one Opus packet. PCM that
+    doesn't fill a whole frame waits for the next ``encode`` call; pass
+    ``final=True`` with the last one to send it too (Opus pads it with
+    silence to a full frame).
+    """
+
+    def __init__(self, sample_rate=16000, channels=1, codec="pcm", frame_ms=20):
+        if codec not in CODECS:
+            raise FrameError(f"Unknown codec {codec!r}, choose one of {', '.join(CODECS)}")
+        if codec == "opus" and sample_rate not in OPUS_RATES:
+            raise FrameError(f"Opus can't encode {sample_rate} Hz audio")
+        self.codec = codec
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.frame_samples = sample_rate * frame_ms // 1000
+        self.frame_bytes = self.frame_samples * channels * 2
+        self.seq = 0
+        self._pending = b""
+        self._opus_encoder = None
+        if codec == "opus":
+            opuslib = _opus()
+            self._opus_encoder = opuslib.Encoder(sample_rate, channels, opuslib.APPLICATION_VOIP)
+
+    def encode(self, pcm, final=False):
+        data = self._pending + pcm
+        usable = len(data) - len(data) % self.frame_bytes
+        if final and usable < len(data):
+            if self.codec == "opus":
+                data += b"\x00" * (self.frame_bytes - len(data) % self.frame_bytes)
+            usable = len(data) - len(data) % (2 * self.channels)
+        data, self._pending = data[:usable], data[usable:]
+        return b"".join(self._frame(data[start:start + self.frame_bytes])
+                        for start in range(0, usable, self.frame_bytes))
+
+    def _frame(self, pcm):
+        payload = pcm
+        if self._opus_encoder is not None:
+            payload = self._opus_encoder.encode(pcm, self.frame_samples)
+        header = HEADER.pack(MAGIC, CODECS[self.codec], self.channels, self.sample_rate, self.seq, len(payload))
+        self.seq += 1
+        return header + payload
+
+
+class FrameDecoder:
+    """Reassemble frames from a body arriving in arbitrary pieces.
+
+    ``feed`` returns the frames completed by a piece, ``decode`` turns a
+    frame back into s16le PCM. Sequence numbers skipped since the
+    previous frame are added up in ``missing``.
+    """
+
+    def __init__(self, max_payload=MAX_PAYLOAD):
+        self.max_payload = max_payload
+        self.missing = 0
+        self._buffer = bytearray()
+        self._next_seq = None
+        self._opus_decoders = {}
+
+    def feed(self, data):
+        self._buffer += data
+        frames = []
+        while len(self._buffer) >= HEADER.size:
+            magic, codec, channels, sample_rate, seq, length = HEADER.unpack_from(self._buffer)
+            if magic != MAGIC:
+                raise FrameError("Not an audio frame (bad magic)")
+            if codec not in _CODEC_NAMES:
+                raise FrameError(f"Unknown codec number {codec}")
+            if length > self.max_payload:
+                raise FrameError(f"Frame of {length} bytes exceeds the {self.max_payload} byte limit")
+            end = HEADER.size + length
+            if len(self._buffer) < end:
+                break
+            payload = bytes(self._buffer[HEADER.size:end])
+            del self._buffer[:end]
+
+            if self._next_seq is not None and seq > self._next_seq:
+                self.missing += seq - self._next_seq
+            self._next_seq = seq + 1
+            frames.append(Frame(_CODEC_NAMES[codec], sample_rate, channels, seq, payload))
+        return frames
+
+    def decode(self, frame):
+        if frame.codec == "pcm":
+            return frame.payload
+        key = (frame.sample_rate, frame.channels)
+        if key not in self._opus_decoders:
+            self._opus_decoders[key] = _opus().Decoder(frame.sample_rate, frame.channels)
+        # Opus packets hold at most 120 ms
+        return self._opus_decoders[key].decode(frame.payload, frame.sample_rate * 120 // 1000)
+
+    def finish(self):
+        """Raise if the body ended in the middle of a frame."""
+        if self._buffer:
+            raise FrameError(f"Body ended inside a frame ({len(self._buffer)} bytes left over)")
@@ -0,0 +1,75 @@
+import io
+import subprocess
+import wave
+
+import numpy as np
+
+from audio_frames import FrameDecoder, FrameError
+
+SAMPLE_RATE = 16000
+
+# Content types treated as headerless 16-bit little-endian mono PCM
+PCM_CONTENT_TYPES = ("audio/l16", "audio/pcm", "application/octet-stream")
+WAV_CONTENT_TYPES = ("audio/wav", "audio/x-wav", "audio/wave")
+
+
+def pcm16_to_float32(data):
+    """Convert s16le PCM bytes to the float32 array Whisper expects."""
+    return np.frombuffer(data, dtype='<i2').astype(np.float32) / 32768.0
+
+
+def frames_to_float32(data):
+    """Decode a body of audio frames; returns (samples, error)."""
+    decoder = FrameDecoder()
+    try:
+        frames = decoder.feed(data)
+        decoder.finish()
+        if any((frame.sample_rate, frame.channels) != (SAMPLE_RATE, 1) for frame in frames):
+            return None, f"Audio frames must be {SAMPLE_RATE} Hz mono"
+        return pcm16_to_float32(b"".join(decoder.decode(frame) for frame in frames)), None
+    except (FrameError, ImportError) as e:
+        return None, f"Invalid audio frames: {e}"
+
+
+def decode(data):
+    """Decode an uploaded file to 16 kHz mono float32 without touching disk.
+
+    16-bit mono 16 kHz WAV is read directly; anything else is decoded by
+    ffmpeg over a pipe.
+    """
+    if data[:4] == b"RIFF" and data[8:12] == b"WAVE":
+        try:
+            with wave.open(io.BytesIO(data), 'rb') as wf:
+                if (wf.getnchannels(), wf.getsampwidth(), wf.getframerate()) == (1, 2, SAMPLE_RATE):
+                    return pcm16_to_float32(wf.readframes(wf.getnframes()))
+        except (wave.Error, EOFError):
+            pass
+    return ffmpeg_decode(data)
+
+
+def ffmpeg_decode(data):
+    result = subprocess.run(
+        [
+            "ffmpeg", "-loglevel", "error",
+            "-i", "pipe:0",
+            "-f", "s16le", "-acodec", "pcm_s16le",
+            "-ar", str(SAMPLE_RATE), "-ac", "1",
+            "pipe:1",
+        ],
+        input=data,
+        capture_output=True,
+        check=True,
+    )
+    return pcm16_to_float32(result.stdout)
+
+
+def check_pcm_params(params):
+    """Validate ``rate``/``channels`` of a raw PCM content type.
+
+    Returns an error message, or None if the body can be used as is.
+    """
+    rate = int(params.get("rate", SAMPLE_RATE))
+    channels = int(params.get("channels", 1))
+    if rate != SAMPLE_RATE or channels != 1:
+        return f"Raw PCM must be {SAMPLE_RATE} Hz mono, got {rate} Hz x {channels}"
+    return None
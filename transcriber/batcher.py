@@ -0,0 +1,76 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+_CLOSE = object()
+
+
+class MicroBatcher:
+    """Group concurrent requests into batches for a single model thread.
+
+    Callers ``submit`` one item and get a Future back. A worker thread
+    waits for the first item, keeps collecting for up to ``max_wait_ms``
+    (or until ``max_batch_size`` items are queued), then hands the whole
+    list to ``run_batch``, which must return one result per item.
+    """
+
+    def __init__(self, run_batch, max_batch_size=8, max_wait_ms=20, name="micro-batcher"):
+        self.run_batch = run_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._loop, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, item):
+        future = Future()
+        if self._closed:
+            # Straggler after close(): run it on the caller's thread
+            self._run([(item, future)])
+        else:
+            self._queue.put((item, future))
+        return future
+
+    def close(self):
+        """Stop the worker once everything already queued has run."""
+        self._closed = True
+        self._queue.put(_CLOSE)
+
+    def _collect(self):
+        entry = self._queue.get()
+        if entry is _CLOSE:
+            return [], True
+        batch = [entry]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                entry = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if entry is _CLOSE:
+                return batch, True
+            batch.append(entry)
+        return batch, False
+
+    def _loop(self):
+        closing = False
+        while not closing:
+            batch, closing = self._collect()
+            if batch:
+                self._run(batch)
+
+    def _run(self, batch):
+        items = [item for item, _ in batch]
+        try:
+            results = self.run_batch(items)
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
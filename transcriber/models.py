@@ -0,0 +1,103 @@
+import threading
+from collections import OrderedDict
+
+
+class UnknownModelError(ValueError):
+    pass
+
+
+class ModelManager:
+    """Load models on demand and keep at most ``max_resident`` of them.
+
+    ``loader(name)`` builds a ready-to-use (warmed-up) model; it runs once
+    per name even when several requests ask for it at the same time.
+    Least-recently-used models are evicted past the cap, calling their
+    ``close()`` if they have one. The default model counts against the
+    cap but is never evicted, so ``/ready`` holds and default requests
+    never pay a cold load; with room for the default only, other models
+    are loaded for the request that asked and closed straight away (a
+    closed runner still serves that request, on the caller's thread). ``preload``
+    starts loading in the background so startup isn't blocked.
+    """
+
+    def __init__(self, loader, default, allowed, max_resident=2):
+        if default not in allowed:
+            raise UnknownModelError(f"Default model {default!r} is not in {allowed}")
+        self.loader = loader
+        self.default = default
+        self.allowed = tuple(allowed)
+        self.max_resident = max_resident
+        self._models = OrderedDict()
+        self._loading = {}
+        self._errors = {}
+        self._lock = threading.Lock()
+
+    def preload(self, names):
+        for name in names:
+            threading.Thread(target=self._preload_one, args=(name,), daemon=True).start()
+
+    def _preload_one(self, name):
+        try:
+            self.get(name)
+        except Exception:
+            # Recorded in _errors and reported by status()
+            pass
+
+    def get(self, name=None):
+        """Return the model, loading it first if it isn't resident."""
+        name = name or self.default
+        if name not in self.allowed:
+            raise UnknownModelError(f"Unknown model {name!r}, choose one of {', '.join(self.allowed)}")
+
+        with self._lock:
+            if name in self._models:
+                self._models.move_to_end(name)
+                return self._models[name]
+            load_lock = self._loading.setdefault(name, threading.Lock())
+
+        with load_lock:
+            # Someone else may have finished loading while we waited
+            with self._lock:
+                if name in self._models:
+                    self._models.move_to_end(name)
+                    return self._models[name]
+            try:
+                model = self.loader(name)
+            except Exception as e:
+                with self._lock:
+                    self._errors[name] = str(e)
+                    self._loading.pop(name, None)
+                raise
+
+            with self._lock:
+                self._errors.pop(name, None)
+                self._loading.pop(name, None)
+                self._models[name] = model
+                evicted = []
+                while len(self._models) > self.max_resident:
+                    # Least recently used first, skipping the pinned default
+                    victim = next((old for old in self._models if old != self.default and old != name), None)
+                    if victim is None:
+                        evicted.append(self._models.pop(name))
+                        break
+                    evicted.append(self._models.pop(victim))
+
+        for old in evicted:
+            close = getattr(old, "close", None)
+            if close:
+                close()
+        return model
+
+    def is_ready(self, name=None):
+        with self._lock:
+            return (name or self.default) in self._models
+
+    def status(self):
+        with self._lock:
+            return {
+                "default": self.default,
+                "available": list(self.allowed),
+                "resident": list(self._models),
+                "loading": [name for name in self._loading if name not in self._models],
+                "errors": dict(self._errors),
+            }
@@ -0,0 +1,127 @@
+import threading
+import time
+import uuid
+
+import numpy as np
+
+
+class StreamingTranscriber:
+    """Sliding-window transcription of audio that is still being recorded.
+
+    Audio is appended as it arrives and re-transcribed every
+    ``step_seconds``. Segments that end at least ``commit_margin`` seconds
+    before the end of the window won't change any more: they are committed
+    and their audio dropped from the window. The rest is reported as a
+    partial result that may still be revised. ``transcribe`` takes a float32
+    array and returns a Whisper-style result with timed ``segments``.
+    """
+
+    def __init__(self, transcribe, sample_rate=16000, step_seconds=1.0,
+                 commit_margin=1.0, max_window_seconds=25.0):
+        self.transcribe = transcribe
+        self.sample_rate = sample_rate
+        self.step = int(step_seconds * sample_rate)
+        self.commit_margin = commit_margin
+        self.max_window = int(max_window_seconds * sample_rate)
+        self.window = np.zeros(0, dtype=np.float32)
+        self.offset = 0.0  # seconds of audio already committed and dropped
+        self.pending = 0  # samples received since the last decode
+        self.segments = []
+        self.partial = []
+
+    def feed(self, samples):
+        """Append samples; re-transcribe if a step's worth has arrived."""
+        self.window = np.concatenate([self.window, samples.astype(np.float32)])
+        self.pending += len(samples)
+        if self.pending >= self.step:
+            self._decode(final=False)
+        return self.result(final=False)
+
+    def finish(self):
+        """Transcribe whatever is left and commit everything."""
+        if len(self.window):
+            self._decode(final=True)
+        return self.result(final=True)
+
+    def result(self, final):
+        partial = " ".join(segment["text"] for segment in self.partial)
+        committed = " ".join(segment["text"] for segment in self.segments)
+        return {
+            "final": final,
+            "text": " ".join(part for part in (committed, partial) if part),
+            "segments": self.segments,
+            "partial": partial,
+        }
+
+    def _decode(self, final):
+        self.pending = 0
+        duration = len(self.window) / self.sample_rate
+        segments = self.transcribe(self.window).get("segments", [])
+
+        stable = 0
+        for segment in segments:
+            if not final and segment["end"] > duration - self.commit_margin:
+                break
+            stable += 1
+        if not final and stable == 0 and len(self.window) > self.max_window:
+            # Window is full but nothing looks settled: commit all but the tail
+            stable = max(len(segments) - 1, 0)
+
+        for segment in segments[:stable]:
+            self.segments.append(self._absolute(segment))
+        self.partial = [self._absolute(segment) for segment in segments[stable:]]
+
+        if stable:
+            cut = int(segments[stable - 1]["end"] * self.sample_rate)
+            self._drop(cut)
+        if len(self.window) > self.max_window:
+            # Nothing recognisable (e.g. silence); keep the window bounded
+            self._drop(len(self.window) - self.max_window)
+
+    def _drop(self, samples):
+        self.window = self.window[samples:]
+        self.offset += samples / self.sample_rate
+
+    def _absolute(self, segment):
+        return {
+            "start": round(self.offset + segment["start"], 3),
+            "end": round(self.offset + segment["end"], 3),
+            "text": segment["text"].strip(),
+        }
+
+
+class StreamSessions:
+    """Open streaming transcriptions, expired after ``ttl`` idle seconds."""
+
+    def __init__(self, factory, ttl=60):
+        self.factory = factory
+        self.ttl = ttl
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def create(self, *args):
+        """Start a session; ``args`` are passed on to the factory."""
+        transcriber = self.factory(*args)
+        session_id = uuid.uuid4().hex
+        with self._lock:
+            self._expire()
+            self._sessions[session_id] = [transcriber, threading.Lock(), time.monotonic()]
+        return session_id
+
+    def get(self, session_id):
+        """Return (transcriber, lock) for a live session, or None."""
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return None
+            entry[2] = time.monotonic()
+            return entry[0], entry[1]
+
+    def close(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def _expire(self):
+        now = time.monotonic()
+        for session_id in [sid for sid, entry in self._sessions.items() if now - entry[2] > self.ttl]:
+            del self._sessions[session_id]